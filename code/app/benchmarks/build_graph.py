@@ -0,0 +1,104 @@
+"""
+Benchmark da construção do grafo de trânsito (GraphRoute.build_graph).
+
+Compara a implementação original (iterrows + groupby por aresta) com a
+versão vetorizada, sobre o feed do Metro incluído no repositório.
+
+Uso:
+    cd app
+    python -m benchmarks.build_graph
+"""
+
+import os
+import sys
+module_path = os.path.abspath(os.path.join('..'))
+if module_path not in sys.path:
+    sys.path.append(module_path)
+
+import networkx as nx
+from shapely.geometry import Point
+
+from app.benchmarks.common import get_metro_graph_route, timeit
+from app.utils.co2 import get_co2
+from app.utils.geo import get_m_distance
+from app.utils.time import time_to_seconds
+
+
+def legacy_build_graph(gtfs_feed):
+    """Implementação original de build_graph, mantida apenas para comparação."""
+    G_transport = nx.MultiDiGraph(crs="epsg:4326")
+    for _, row in gtfs_feed.stops.iterrows():
+        G_transport.add_node(
+            row['stop_id'],
+            y=row['stop_lat'],
+            x=row['stop_lon'],
+            name=row['stop_name'],
+            modo=row['stop_id'].split("_")[0],
+        )
+
+    st = gtfs_feed.stop_times[['trip_id', 'arrival_time', 'departure_time', 'stop_id', 'stop_sequence']]
+    st = st.merge(gtfs_feed.trips[['trip_id', 'route_id']], on='trip_id')
+
+    st['arrival_sec'] = st['arrival_time'].apply(time_to_seconds)
+    st['departure_sec'] = st['departure_time'].apply(time_to_seconds)
+
+    st = st.sort_values(['trip_id', 'stop_sequence'])
+
+    segments = st.copy()
+    segments['next_stop_id'] = segments.groupby('trip_id')['stop_id'].shift(-1)
+    segments['next_arrival_sec'] = segments.groupby('trip_id')['arrival_sec'].shift(-1)
+
+    segments = segments.dropna(subset=['next_stop_id'])
+    segments['travel_time_sec'] = segments['next_arrival_sec'] - segments['departure_sec']
+    segments = segments[segments['travel_time_sec'] >= 0]
+
+    for (u, v), group in segments.groupby(['stop_id', 'next_stop_id']):
+        data_u, data_v = G_transport.nodes[u], G_transport.nodes[v]
+        distance_m = get_m_distance(
+            Point(data_u['x'], data_u['y']),
+            Point(data_v['x'], data_v['y'])
+        )
+
+        group = group.sort_values(by="departure_sec", ascending=True)
+
+        connections = []
+        for _, row in group.iterrows():
+            co2_cost_g = (distance_m/1000) * get_co2(row['stop_id'].split("_")[0])
+            connections.append({
+                'departure_sec': row['departure_sec'],
+                'travel_time_sec': row['travel_time_sec'],
+                'trip_id': row['trip_id'],
+                'route_id': row['route_id'],
+                'co2_cost_g': co2_cost_g,
+                'distance_m': distance_m
+            })
+
+        G_transport.add_edge(u, v, type='transit', connections=connections,
+                             avg_travel_time=group['travel_time_sec'].mean())
+
+    return G_transport
+
+
+if __name__ == "__main__":
+    graph = get_metro_graph_route()
+    n_stop_times = len(graph.gtfs_feed.stop_times)
+
+    print(f"Feed Metro: {len(graph.gtfs_feed.stops)} paragens, {n_stop_times} stop_times\n")
+
+    legacy_sec, G_legacy = timeit(lambda: legacy_build_graph(graph.gtfs_feed), repeat=1)
+    print(f"build_graph original:   {legacy_sec:.3f}s")
+
+    def run_vectorized():
+        graph.build_graph()
+        return graph.G
+
+    vectorized_sec, G_new = timeit(run_vectorized)
+    print(f"build_graph vetorizado: {vectorized_sec:.3f}s")
+    print(f"Speedup: {legacy_sec / vectorized_sec:.1f}x\n")
+
+    # Validação: mesmas arestas e o mesmo número de ligações por aresta
+    same_edges = set(G_legacy.edges()) == set(G_new.edges())
+    n_legacy = sum(len(d['connections']) for _, _, d in G_legacy.edges(data=True))
+    n_new = sum(len(d['connections']) for _, _, d in G_new.edges(data=True))
+    print(f"Arestas: {G_new.number_of_edges()} (iguais: {same_edges})")
+    print(f"Ligações: {n_new} (original: {n_legacy})")
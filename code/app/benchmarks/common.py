@@ -0,0 +1,52 @@
+"""
+Utilitários partilhados pelos benchmarks.
+
+Os benchmarks usam apenas o feed do Metro incluído no repositório e não fazem
+chamadas de rede (sem geocodificação nem download da rede pedonal).
+"""
+
+import time
+
+import gtfs_kit as gk
+
+from app.services.graph import GraphRoute
+from app.utils.feed import FEED_METRO, prepare_sub_df
+
+
+def get_metro_feed(service_date=None):
+    """Feed do Metro com os IDs prefixados, tal como sai de get_filtered_multimodal_feed."""
+    data_metro = prepare_sub_df(FEED_METRO, "METRO", service_date=service_date)
+
+    return gk.Feed(
+        dist_units=FEED_METRO.dist_units,
+        agency=FEED_METRO.agency,
+        stops=data_metro['stops'],
+        routes=data_metro['routes'],
+        trips=data_metro['trips'],
+        stop_times=data_metro['stop_times'],
+        calendar=FEED_METRO.calendar,
+        calendar_dates=FEED_METRO.calendar_dates,
+    )
+
+
+def get_metro_graph_route(service_date=None):
+    """GraphRoute sem origem/destino e sem rede pedonal, apenas com o feed do Metro."""
+    graph = GraphRoute.__new__(GraphRoute)
+    graph.origem = None
+    graph.destino = None
+    graph.gtfs_feed = get_metro_feed(service_date)
+    graph.G_walk = None
+
+    return graph
+
+
+def timeit(func, repeat=3):
+    """Executa func várias vezes e devolve (melhor tempo em segundos, último resultado)."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
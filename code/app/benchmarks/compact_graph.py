@@ -0,0 +1,91 @@
+"""
+Benchmark do grafo compacto (CSR) face ao MultiDiGraph do networkx.
+
+Mede a memória por aresta e o número de expansões de arestas por segundo
+(vizinhos + custo dependente do tempo), que é a operação do ciclo interno
+do A*, Dijkstra e ACO.
+
+Uso:
+    cd app
+    python -m benchmarks.compact_graph
+"""
+
+import os
+import sys
+module_path = os.path.abspath(os.path.join('..'))
+if module_path not in sys.path:
+    sys.path.append(module_path)
+
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.benchmarks.common import get_metro_graph_route
+from app.services.compact_graph import CompactGraph
+from app.utils.route import get_edge_costs
+
+N_QUERIES = 20000
+
+
+def measure_allocation(func):
+    """Memória retida (bytes) pelo resultado de func."""
+    tracemalloc.start()
+    result = func()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return retained, result
+
+
+def expand_networkx(G, nodes, times):
+    expansions = 0
+    for u, t in zip(nodes, times):
+        for v in G.neighbors(u):
+            get_edge_costs(G.get_edge_data(u, v).get(0), t)
+            expansions += 1
+    return expansions
+
+
+def expand_compact(cg, nodes, times):
+    expansions = 0
+    for u, t in zip(nodes, times):
+        for e in cg.edges_from(u):
+            cg.target(e)
+            cg.edge_costs(e, t)
+            expansions += 1
+    return expansions
+
+
+if __name__ == "__main__":
+    graph = get_metro_graph_route()
+
+    def build_networkx():
+        graph.build_graph()
+        return graph.G
+
+    nx_bytes, G = measure_allocation(build_networkx)
+    cg_bytes, cg = measure_allocation(lambda: CompactGraph.from_networkx(G))
+
+    n_edges = G.number_of_edges()
+    print(f"Grafo Metro: {G.number_of_nodes()} nós, {n_edges} arestas\n")
+    print("Memória por aresta (inclui as partidas de cada aresta):")
+    print(f"  networkx: {nx_bytes / n_edges:,.0f} B")
+    print(f"  CSR:      {cg_bytes / n_edges:,.0f} B  (arrays: {cg.nbytes() / n_edges:,.0f} B)\n")
+
+    rng = np.random.default_rng(0)
+    node_idx = rng.integers(0, cg.number_of_nodes, N_QUERIES)
+    times = rng.integers(6 * 3600, 22 * 3600, N_QUERIES).tolist()
+    nx_nodes = [cg.node_ids[i] for i in node_idx]
+
+    start = time.perf_counter()
+    expansions = expand_networkx(G, nx_nodes, times)
+    nx_rate = expansions / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    expand_compact(cg, node_idx.tolist(), times)
+    cg_rate = expansions / (time.perf_counter() - start)
+
+    print("Expansões de arestas por segundo:")
+    print(f"  networkx: {nx_rate:,.0f}")
+    print(f"  CSR:      {cg_rate:,.0f}  ({cg_rate / nx_rate:.1f}x)")
@@ -0,0 +1,85 @@
+"""
+Benchmark da pesquisa da próxima partida numa aresta de trânsito.
+
+Compara a pesquisa linear sobre uma lista de dicionários (formato original)
+com a pesquisa binária sobre os arrays de Connections, e a versão em lote,
+para arestas com diferentes números de partidas.
+
+Uso:
+    cd app
+    python -m benchmarks.connections
+"""
+
+import os
+import sys
+module_path = os.path.abspath(os.path.join('..'))
+if module_path not in sys.path:
+    sys.path.append(module_path)
+
+import time
+
+import numpy as np
+
+from app.utils.route import Connections, find_next_departure_cost, find_next_departures
+
+
+def legacy_find_next_departure_cost(current_time_sec, connections):
+    """Pesquisa linear original sobre a lista de dicionários."""
+    for conn in connections:
+        if conn['departure_sec'] >= current_time_sec:
+            wait_time = conn['departure_sec'] - current_time_sec
+            travel_time = conn['travel_time_sec']
+            return wait_time + travel_time, travel_time, conn['co2_cost_g'], conn['trip_id']
+
+    return float('inf'), 0, 0.0, None
+
+
+def make_edge(n_departures, rng):
+    """Aresta sintética com partidas entre as 05:00 e a 01:00."""
+    departure = np.sort(rng.integers(5 * 3600, 25 * 3600, n_departures)).astype(np.int32)
+    travel_time = np.full(n_departures, 120, dtype=np.int32)
+    trip_ids = np.array([f"T{i}" for i in range(n_departures)], dtype=object)
+
+    connections = Connections(
+        departure_sec=departure,
+        travel_time_sec=travel_time,
+        trip_idx=np.arange(n_departures, dtype=np.int32),
+        co2_cost_g=np.full(n_departures, 50.0),
+        distance_m=450.0,
+        trip_ids=trip_ids,
+        route_ids=trip_ids,
+    )
+    legacy = [
+        {'departure_sec': int(d), 'travel_time_sec': 120, 'trip_id': t, 'co2_cost_g': 50.0}
+        for d, t in zip(departure, trip_ids)
+    ]
+
+    return connections, legacy
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(42)
+    queries = rng.integers(5 * 3600, 25 * 3600, 20000)
+    queries_list = queries.tolist()
+
+    print(f"{'Partidas':>9} | {'Linear (µs)':>11} | {'Binária (µs)':>12} | {'Lote (µs)':>9}")
+    print("-" * 52)
+
+    for n_departures in [10, 50, 200, 500, 1000]:
+        connections, legacy = make_edge(n_departures, rng)
+
+        start = time.perf_counter()
+        for t in queries_list:
+            legacy_find_next_departure_cost(t, legacy)
+        linear_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+        start = time.perf_counter()
+        for t in queries_list:
+            find_next_departure_cost(t, connections)
+        binary_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+        start = time.perf_counter()
+        find_next_departures(queries, connections)
+        batch_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+        print(f"{n_departures:>9} | {linear_us:>11.2f} | {binary_us:>12.2f} | {batch_us:>9.3f}")
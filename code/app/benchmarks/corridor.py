@@ -0,0 +1,186 @@
+"""
+Benchmark da forma do corredor da consulta: retângulo vs elipse vs linha.
+
+O retângulo origem-destino (filtro original de get_filtered_multimodal_feed)
+cresce com o quadrado da distância em viagens diagonais. Para os casos de
+test_cases.py cujas moradas o gazetteer offline resolve (nomes de paragens),
+mais a viagem diagonal Casa da Música -> Póvoa de Varzim, compara por
+corredor (app.utils.corridor):
+- paragens selecionadas do Metro e da STCP;
+- nós e arestas do grafo do Metro (dia útil, com os pontos do utilizador);
+- tempo da consulta A* e se a fronteira de Pareto (tempo, caminhada) é a
+  mesma do retângulo. O CO2 não entra na comparação: os segmentos de uma
+  viagem que sai do corredor e volta a entrar ligam paragens não consecutivas,
+  e o CO2 estimado pela distância em linha reta muda com o recorte;
+- nós e arestas da rede pedonal recortada (clip_region do corredor alargado
+  por STREET_CORRIDOR_MARGIN_KM). Sem a rede local, usa uma rede sintética
+  pequena (grelha de SYNTHETIC_STREET_STEP_DEG sobre as paragens do Metro),
+  suficiente para exercitar o recorte sem pedidos ao Overpass.
+
+Uso:
+    cd app
+    python -m benchmarks.corridor
+"""
+
+import os
+import sys
+module_path = os.path.abspath(os.path.join('..'))
+if module_path not in sys.path:
+    sys.path.append(module_path)
+
+import gtfs_kit as gk
+import networkx as nx
+import numpy as np
+from shapely.geometry import Point
+
+from app.benchmarks.common import timeit
+from app.services.algoritms.a_star import optimized_multi_objective_routing
+from app.services.graph import GraphRoute, SOURCE_NODE_ID, DESTINATION_NODE_ID, STREET_CORRIDOR_BUFFER_M, STREET_CORRIDOR_MARGIN_KM
+from app.test_cases import TEST_CASES
+from app.utils.corridor import KM_PER_DEG, BoxCorridor, EllipseCorridor, LineCorridor
+from app.utils.feed import load_feed, prepare_sub_df, get_stop_grid
+from app.utils.geocode import get_gazetteer
+from app.utils.street import STREET_GRAPH_PATH, StreetGraphStore
+from app.utils.time import time_to_seconds
+
+CORRIDORS = {
+    "retângulo": BoxCorridor,
+    "elipse": EllipseCorridor,
+    "linha": LineCorridor,
+}
+
+SERVICE_DATE = "20260310"  # dia útil dentro do calendário do feed do Metro
+
+# Viagem diagonal longa (paragens do Metro), fora de test_cases.py
+DIAGONAL_CASE = {'id': 'CM-POV', 'start_time': '08:00:00'}
+DIAGONAL_STOPS = ("METRO_5706", "METRO_5746")  # Casa da Música, Póvoa de Varzim
+
+# Passo (graus) da grelha da rede pedonal sintética, usada sem a rede local
+SYNTHETIC_STREET_STEP_DEG = 0.004
+WALK_SPEED_MPS = 1.39
+
+
+def resolve(address):
+    """Coordenadas pelo gazetteer offline (morada completa ou só o nome antes da vírgula)."""
+    gazetteer = get_gazetteer()
+    place = gazetteer.lookup(address) or gazetteer.lookup(address.split(',')[0])
+    return Point(place[1], place[0]) if place is not None else None
+
+
+def metro_graph(origin, destination, corridor):
+    """GraphRoute do Metro (sem rede pedonal) restrito ao corredor, com os pontos do utilizador."""
+    feed = load_feed("METRO")
+    data = prepare_sub_df(feed, "METRO", service_date=SERVICE_DATE, corridor=corridor)
+
+    graph = GraphRoute.__new__(GraphRoute)
+    graph.origem, graph.destino = None, None
+    graph.geo_origem, graph.geo_destino = origin, destination
+    graph.G_walk = None
+    graph.gtfs_feed = gk.Feed(
+        dist_units=feed.dist_units, agency=feed.agency, stops=data['stops'], routes=data['routes'],
+        trips=data['trips'], stop_times=data['stop_times'], calendar=feed.calendar,
+    )
+    graph.build_graph()
+    graph.add_user_points_to_graph()
+    return graph
+
+
+def synthetic_street_store(stops, step_deg=SYNTHETIC_STREET_STEP_DEG, margin_deg=0.02):
+    """
+    StreetGraphStore de uma grelha regular (ruas nos dois sentidos, com length
+    e travel_time) que cobre as paragens com uma margem de margin_deg.
+    """
+    lats = np.arange(stops['stop_lat'].min() - margin_deg, stops['stop_lat'].max() + margin_deg, step_deg)
+    lons = np.arange(stops['stop_lon'].min() - margin_deg, stops['stop_lon'].max() + margin_deg, step_deg)
+    node_ids = np.arange(len(lats) * len(lons)).reshape(len(lats), len(lons))
+
+    G = nx.MultiDiGraph(crs="epsg:4326")
+    for i, lat in enumerate(lats):
+        G.add_nodes_from((int(node_ids[i, j]), {'y': float(lat), 'x': float(lon)}) for j, lon in enumerate(lons))
+
+    length_ns = step_deg * KM_PER_DEG * 1000
+    length_ew = length_ns * np.cos(np.radians(lats.mean()))
+    for a, b, length in [
+        (node_ids[:-1, :], node_ids[1:, :], length_ns),
+        (node_ids[:, :-1], node_ids[:, 1:], length_ew),
+    ]:
+        data = {'length': length, 'travel_time': length / WALK_SPEED_MPS}
+        for u, v in zip(a.ravel().tolist(), b.ravel().tolist()):
+            G.add_edge(u, v, **data)
+            G.add_edge(v, u, **data)
+
+    return StreetGraphStore(G)
+
+
+def stop_point(feed, stop_id):
+    stop = feed.stops.loc[feed.stops['stop_id'] == stop_id].iloc[0]
+    return Point(stop['stop_lon'], stop['stop_lat'])
+
+
+def front(solutions):
+    return sorted((s.total_time, round(s.total_walk_km, 6)) for s in solutions)
+
+
+if __name__ == "__main__":
+    if os.path.exists(STREET_GRAPH_PATH):
+        street, street_source = StreetGraphStore.load(STREET_GRAPH_PATH), f"rede local {STREET_GRAPH_PATH}"
+    else:
+        street = synthetic_street_store(load_feed("METRO").stops)
+        street_source = f"rede sintética, grelha de {SYNTHETIC_STREET_STEP_DEG}°"
+    print(f"Rede pedonal: {street_source} ({street.G.number_of_nodes()} nós, {street.G.number_of_edges()} arestas)\n")
+    stcp_grid = get_stop_grid(load_feed("STCP"))
+
+    cases, skipped = [], []
+    for case in TEST_CASES:
+        origin, destination = resolve(case['origem']), resolve(case['destino'])
+        if origin is None or destination is None or origin.equals(destination):
+            skipped.append(case['id'])
+        else:
+            cases.append((case, origin, destination))
+    metro = load_feed("METRO")
+    cases.append((DIAGONAL_CASE, stop_point(metro, DIAGONAL_STOPS[0]), stop_point(metro, DIAGONAL_STOPS[1])))
+
+    totals = {name: [0, 0, 0, 0.0, 0, 0, 0] for name in CORRIDORS}
+    print(f"{'Caso':7s} {'Corredor':10s} {'STCP':>5s} {'nós':>4s} {'arestas':>8s} {'A*':>9s}  fronteira  {'rede pedonal':>14s}")
+    for case, origin, destination in cases:
+        start_sec = time_to_seconds(case['start_time'])
+        reference = None
+        for name, factory in CORRIDORS.items():
+            corridor = factory(origin, destination)
+            n_stcp = len(corridor.select(stcp_grid))
+
+            graph = metro_graph(origin, destination, corridor)
+            cg = graph.compact_graph
+            query_sec, solutions = timeit(
+                lambda: optimized_multi_objective_routing(cg, SOURCE_NODE_ID, DESTINATION_NODE_ID, start_sec)
+            )
+            if reference is None:
+                reference = front(solutions)
+            same = front(solutions) == reference
+
+            if factory is BoxCorridor:
+                G_walk = street.clip_corridor(origin, destination, buffer_m=STREET_CORRIDOR_BUFFER_M)
+            else:
+                G_walk = street.clip_region(corridor.grow(STREET_CORRIDOR_MARGIN_KM))
+            walk = f"{G_walk.number_of_nodes():6d}/{G_walk.number_of_edges():<7d}"
+            totals[name][5] += G_walk.number_of_nodes()
+            totals[name][6] += G_walk.number_of_edges()
+
+            n_nodes, n_edges = graph.G.number_of_nodes(), graph.G.number_of_edges()
+            t = totals[name]
+            t[0] += n_stcp
+            t[1] += n_nodes
+            t[2] += n_edges
+            t[3] += query_sec
+            t[4] += same
+            print(f"{case['id']:7s} {name:10s} {n_stcp:5d} {n_nodes:4d} {n_edges:8d} {query_sec * 1000:6.2f} ms  "
+                  f"{'igual' if same else 'DIFERENTE':9s}  {walk:>14s}")
+
+    print(f"\nTotal ({len(cases)} casos; sem coordenadas offline: {', '.join(skipped)}):")
+    box = totals["retângulo"]
+    for name, (n_stcp, n_nodes, n_edges, query_sec, n_same, walk_nodes, walk_edges) in totals.items():
+        line = (f"  {name:10s} STCP {n_stcp:5d} ({n_stcp / max(box[0], 1) - 1:+.0%})  nós {n_nodes:4d} ({n_nodes / max(box[1], 1) - 1:+.0%})"
+                f"  arestas {n_edges:5d} ({n_edges / max(box[2], 1) - 1:+.0%})  A* {query_sec * 1000:7.2f} ms"
+                f"  fronteira igual em {n_same}/{len(cases)}"
+                f"  rede pedonal {walk_nodes} nós ({walk_nodes / max(box[5], 1) - 1:+.0%})")
+        print(line)
@@ -0,0 +1,79 @@
+"""
+Benchmark da extração do corredor (paragens + stop_times de uma bbox).
+
+Compara a seleção original (quatro máscaras sobre todas as paragens e um
+isin sobre a tabela stop_times completa) com a seleção indexada de
+prepare_sub_df: índice em grelha das paragens (GridIndex) e stop_times
+pré-agrupados por paragem (StopTimesByStop), para bboxes de vários tamanhos
+centradas na Trindade, nos feeds do Metro e da STCP.
+
+Uso:
+    cd app
+    python -m benchmarks.corridor_index
+"""
+
+import os
+import sys
+module_path = os.path.abspath(os.path.join('..'))
+if module_path not in sys.path:
+    sys.path.append(module_path)
+
+import numpy as np
+
+from app.benchmarks.common import timeit
+from app.utils.feed import load_feed, get_stop_grid, get_stop_times_by_stop
+
+CENTER = (41.1527, -8.6093)  # Trindade
+HALF_SIZES_KM = [0.5, 1, 2, 5, 10, 20]
+
+
+def legacy_extract(feed, bbox):
+    """Seleção original de prepare_sub_df (máscaras + isin sobre as tabelas completas)."""
+    lat_min, lat_max, lon_min, lon_max = bbox
+    m_stops = (feed.stops.stop_lat >= lat_min) & (feed.stops.stop_lat <= lat_max) & \
+              (feed.stops.stop_lon >= lon_min) & (feed.stops.stop_lon <= lon_max)
+    stops_df = feed.stops[m_stops]
+    if feed.stop_times is None:
+        return stops_df, None
+    return stops_df, feed.stop_times[feed.stop_times['stop_id'].isin(set(stops_df['stop_id']))]
+
+
+def indexed_extract(feed, bbox):
+    """Seleção de prepare_sub_df: consulta à grelha + fatias de stop_times por paragem."""
+    stop_positions = get_stop_grid(feed).query_bbox(*bbox)
+    stops_df = feed.stops.iloc[stop_positions]
+    if feed.stop_times is None:
+        return stops_df, None
+    return stops_df, feed.stop_times.iloc[get_stop_times_by_stop(feed).rows_for_stops(stop_positions)]
+
+
+def bbox_around(center, half_km):
+    lat, lon = center
+    d_lat = half_km / 111.0
+    d_lon = half_km / (111.0 * np.cos(np.radians(lat)))
+    return (lat - d_lat, lat + d_lat, lon - d_lon, lon + d_lon)
+
+
+if __name__ == "__main__":
+    for prefix in ["METRO", "STCP"]:
+        feed = load_feed(prefix)
+        has_stop_times = feed.stop_times is not None
+        n_stop_times = len(feed.stop_times) if has_stop_times else 0
+
+        build_sec, _ = timeit(lambda: (get_stop_grid(feed), get_stop_times_by_stop(feed) if has_stop_times else None), repeat=1)
+        print(f"\n{prefix}: {len(feed.stops)} paragens, {n_stop_times} stop_times"
+              f"{'' if has_stop_times else ' (feed sem stop_times.txt: só paragens)'}; índices em {build_sec * 1000:.1f} ms")
+        print(f"  {'bbox':>9s} {'paragens':>9s} {'stop_times':>10s} {'original':>10s} {'indexado':>10s}")
+
+        for half_km in HALF_SIZES_KM:
+            bbox = bbox_around(CENTER, half_km)
+            legacy_sec, (stops_a, st_a) = timeit(lambda: legacy_extract(feed, bbox), repeat=5)
+            indexed_sec, (stops_b, st_b) = timeit(lambda: indexed_extract(feed, bbox), repeat=5)
+
+            assert stops_a['stop_id'].tolist() == stops_b['stop_id'].tolist()
+            if has_stop_times:
+                assert st_a.index.equals(st_b.index)
+
+            n_rows = len(st_b) if has_stop_times else 0
+            print(f"  {2 * half_km:6.1f} km {len(stops_b):9d} {n_rows:10d} "
+                  f"{legacy_sec * 1000:7.2f} ms {indexed_sec * 1000:7.2f} ms")
@@ -0,0 +1,136 @@
+"""
+Benchmark da heurística do A* / ACO.
+
+Compara o custo de calcular a heurística em cada expansão (geodésica, como no
+código original, ou haversine) com a tabela pré-calculada por destino, e mede
+o A* na consulta Casa da Música -> Póvoa de Varzim do main.py (entre as
+paragens de Metro correspondentes, sem rede pedonal).
+
+Para a fração do tempo do A* gasta na heurística, o A* corre com cada
+variante: antes da tabela, Solution.get_heuristic_table é substituída por
+colunas que calculam a estimativa em cada consulta (PerExpansionHeuristic).
+A fração é (avaliações na pesquisa x custo por avaliação) / tempo do A*, e
+para a tabela inclui a sua construção.
+
+Uso:
+    cd app
+    python -m benchmarks.heuristic
+"""
+
+import os
+import sys
+module_path = os.path.abspath(os.path.join('..'))
+if module_path not in sys.path:
+    sys.path.append(module_path)
+
+import time
+
+from shapely.geometry import Point
+
+from app.benchmarks.common import get_metro_graph_route, timeit
+from app.services.algoritms.a_star import optimized_multi_objective_routing
+from app.services.solution import Solution, HEURISTIC_MAX_SPEED_KPH, HEURISTIC_MIN_CO2_GPKM
+from app.utils.geo import get_km_distance
+from app.utils.time import time_to_seconds
+
+SOURCE = "METRO_5706"       # Casa da Música
+DESTINATION = "METRO_5746"  # Póvoa de Varzim
+START_TIME = "08:00:00"
+
+
+class PerExpansionHeuristic:
+    """
+    Heurística calculada em cada consulta, como antes da tabela: h_time[v]
+    calcula (tempo, CO2) do nó v e h_co2[v] devolve o CO2 do mesmo cálculo.
+    Conta as avaliações (calls).
+    """
+
+    def __init__(self, estimate):
+        self.estimate = estimate
+        self.calls = 0
+        self.last = (None, 0.0)
+
+    def columns(self):
+        heuristic = self
+
+        class TimeColumn:
+            def __getitem__(self, v):
+                heuristic.calls += 1
+                h_time, h_co2 = heuristic.estimate(v)
+                heuristic.last = (v, h_co2)
+                return h_time
+
+        class Co2Column:
+            def __getitem__(self, v):
+                node, h_co2 = heuristic.last
+                return h_co2 if node == v else heuristic.estimate(v)[1]
+
+        return TimeColumn(), Co2Column()
+
+
+def run_astar(cg, start_sec, heuristic=None):
+    """A* com a tabela (heuristic None) ou com a heurística por expansão."""
+    original = Solution.get_heuristic_table
+    if heuristic is not None:
+        Solution.get_heuristic_table = staticmethod(lambda cg, destination: heuristic.columns())
+    try:
+        return optimized_multi_objective_routing(cg, SOURCE, DESTINATION, start_sec)
+    finally:
+        Solution.get_heuristic_table = original
+
+
+if __name__ == "__main__":
+    graph = get_metro_graph_route()
+    graph.build_graph()
+    cg = graph.compact_graph
+    d = cg.index(DESTINATION)
+    nodes = list(range(cg.number_of_nodes)) * 20
+
+    x_d, y_d = cg.x.item(d), cg.y.item(d)
+
+    def geodesic_estimate(u):
+        dist_km = get_km_distance(Point(cg.x[u], cg.y[u]), Point(cg.x[d], cg.y[d]))
+        return dist_km / HEURISTIC_MAX_SPEED_KPH * 3600, dist_km * HEURISTIC_MIN_CO2_GPKM
+
+    def haversine_estimate(u):
+        return Solution.get_heuristic_from_coords(cg.x.item(u), cg.y.item(u), x_d, y_d)
+
+    def geodesic_per_call():
+        for u in nodes:
+            geodesic_estimate(u)
+
+    def haversine_per_call():
+        for u in nodes:
+            haversine_estimate(u)
+
+    def table_lookup():
+        h_time, h_co2 = Solution.get_heuristic_table(cg, d)
+        for u in nodes:
+            h_time[u], h_co2[u]
+
+    print(f"Custo por avaliação da heurística ({len(nodes)} avaliações):")
+    per_eval_sec = {}
+    for name, func in [("geodésica", geodesic_per_call), ("haversine", haversine_per_call), ("tabela", table_lookup)]:
+        elapsed, _ = timeit(func)
+        per_eval_sec[name] = elapsed / len(nodes)
+        print(f"  {name:<10} {per_eval_sec[name] * 1e6:8.2f} µs")
+
+    table_sec, _ = timeit(lambda: Solution.get_heuristic_table(cg, d))
+    print(f"\nConstrução da tabela ({cg.number_of_nodes} nós): {table_sec * 1e6:.0f} µs")
+
+    # Fração do tempo do A* gasta na heurística, antes (por expansão) e depois (tabela)
+    start_sec = time_to_seconds(START_TIME)
+    counter = PerExpansionHeuristic(haversine_estimate)
+    run_astar(cg, start_sec, counter)
+    n_evals = counter.calls
+
+    print(f"\nA* Casa da Música -> Póvoa de Varzim ({n_evals} avaliações da heurística):")
+    for name, estimate in [("geodésica", geodesic_estimate), ("haversine", haversine_estimate), ("tabela", None)]:
+        if estimate is None:
+            astar_sec, solutions = timeit(lambda: run_astar(cg, start_sec), repeat=10)
+            heuristic_sec = table_sec + n_evals * per_eval_sec[name]
+        else:
+            astar_sec, solutions = timeit(lambda: run_astar(cg, start_sec, PerExpansionHeuristic(estimate)), repeat=10)
+            heuristic_sec = n_evals * per_eval_sec[name]
+        print(f"  {name:<10} {astar_sec * 1000:7.2f} ms, {len(solutions)} soluções, "
+              f"heurística {min(heuristic_sec / astar_sec, 1.0):4.0%} do tempo")
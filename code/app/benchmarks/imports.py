@@ -0,0 +1,127 @@
+"""
+Benchmark (e orçamento) do tempo de importação do núcleo de encaminhamento.
+
+Importar os algoritmos (A*, Dijkstra, McRAPTOR, CSA, ACO) não deve carregar a
+visualização (folium, matplotlib), o osmnx/scipy/gtfs_kit/shapely, o sqlite3 nem ler nenhum
+feed GTFS: esses módulos só são importados quando são usados. Cada medição
+corre num interpretador novo (python -X importtime), para não contar módulos
+já em memória.
+
+Os pontos de entrada da CLI/API (ENTRY_MODULES: app.services.graph e
+app.services.isochrone) têm o mesmo orçamento e também não podem importar o
+pandas, o networkx, o shapely nem o scipy no arranque.
+
+Termina com código 1 se alguma importação exceder IMPORT_BUDGET_MS ou
+carregar algum módulo proibido.
+
+Uso:
+    cd app
+    python -m benchmarks.imports
+"""
+
+import os
+import sys
+module_path = os.path.abspath(os.path.join('..'))
+if module_path not in sys.path:
+    sys.path.append(module_path)
+
+import statistics
+import subprocess
+
+ROUTING_MODULES = [
+    "app.services.algoritms.a_star",
+    "app.services.algoritms.dijkstra",
+    "app.services.algoritms.raptor",
+    "app.services.algoritms.csa",
+    "app.services.algoritms.aco",
+]
+
+# Pontos de entrada da CLI/API (GraphRoute, isócronas): mesmo orçamento, e
+# também não podem importar as bibliotecas pesadas (só o app.utils.feed)
+ENTRY_MODULES = [
+    "app.services.graph",
+    "app.services.isochrone",
+]
+
+# Módulos que o núcleo de encaminhamento não pode importar
+FORBIDDEN_MODULES = [
+    "folium", "matplotlib", "osmnx", "scipy", "gtfs_kit", "sklearn", "shapely", "sqlite3",
+    "pandas", "networkx", "app.utils.feed",
+]
+ENTRY_FORBIDDEN_MODULES = [m for m in FORBIDDEN_MODULES if m != "app.utils.feed"]
+
+# Orçamento do tempo de importação (ms, mediana de N_RUNS interpretadores novos).
+# Medido: ~3100 ms antes das importações lazy, ~120 ms depois.
+IMPORT_BUDGET_MS = 400
+N_RUNS = 5
+
+# Módulos mais pesados mostrados no relatório do -X importtime
+N_TOP = 10
+
+
+def run_python(code, importtime=False):
+    """Corre code num interpretador novo (com app no sys.path) e devolve o resultado."""
+    env = dict(os.environ, PYTHONPATH=module_path)
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    return subprocess.run(args, env=env, capture_output=True, text=True, check=True)
+
+
+def measure_import_ms(modules, forbidden=FORBIDDEN_MODULES):
+    """Tempo (ms) de importar os módulos e módulos de forbidden que ficaram carregados."""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {', '.join(modules)}\n"
+        "print((time.perf_counter() - start) * 1000)\n"
+        f"print(','.join(m for m in {forbidden!r} if m in sys.modules))\n"
+    )
+    elapsed, loaded = run_python(code).stdout.splitlines()
+    return float(elapsed), [m for m in loaded.split(',') if m]
+
+
+def measure_median(modules, forbidden=FORBIDDEN_MODULES):
+    """Mediana de N_RUNS medições e união dos módulos proibidos carregados."""
+    runs = [measure_import_ms(modules, forbidden) for _ in range(N_RUNS)]
+    return statistics.median(elapsed for elapsed, _ in runs), sorted({m for _, loaded in runs for m in loaded})
+
+
+def parse_importtime(stderr):
+    """Linhas do -X importtime como (cumulativo em ms, módulo), por ordem decrescente."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)
+
+
+if __name__ == "__main__":
+    elapsed_ms, loaded = measure_median(ROUTING_MODULES)
+    print(f"Importação (mediana de {N_RUNS}, orçamento: {IMPORT_BUDGET_MS} ms):")
+    print(f"  {elapsed_ms:7.1f} ms  algoritmos ({len(ROUTING_MODULES)} módulos)")
+
+    failed = False
+    if loaded:
+        print(f"  ERRO: módulos pesados importados pelos algoritmos: {', '.join(loaded)}")
+        failed = True
+    if elapsed_ms > IMPORT_BUDGET_MS:
+        print("  ERRO: importação dos algoritmos acima do orçamento")
+        failed = True
+
+    for module in ENTRY_MODULES:
+        module_ms, module_loaded = measure_median([module], ENTRY_FORBIDDEN_MODULES)
+        print(f"  {module_ms:7.1f} ms  {module} (sem ler feeds)")
+        if module_loaded:
+            print(f"  ERRO: módulos pesados importados por {module}: {', '.join(module_loaded)}")
+            failed = True
+        if module_ms > IMPORT_BUDGET_MS:
+            print(f"  ERRO: importação de {module} acima do orçamento")
+            failed = True
+
+    rows = parse_importtime(run_python(f"import {', '.join(ROUTING_MODULES)}", importtime=True).stderr)
+    print("\nMódulos mais pesados (-X importtime, cumulativo):")
+    for cumulative_ms, name in rows[:N_TOP]:
+        print(f"  {cumulative_ms:7.1f} ms  {name}")
+
+    sys.exit(1 if failed else 0)
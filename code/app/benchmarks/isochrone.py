@@ -0,0 +1,56 @@
+"""
+Benchmark das isócronas (15/30/45 minutos às 08:00).
+
+Compara uma pesquisa one-to-all por contorno com uma única pesquisa para todos
+os contornos, e mede uma grelha de isócronas em batch à volta da Trindade.
+Sem rede pedonal (G_walk = None), a área à volta das paragens são círculos.
+
+Uso:
+    cd app
+    python -m benchmarks.isochrone
+"""
+
+import os
+import sys
+module_path = os.path.abspath(os.path.join('..'))
+if module_path not in sys.path:
+    sys.path.append(module_path)
+
+import time
+
+from app.benchmarks.common import get_metro_graph_route, timeit
+from app.services.algoritms.dijkstra import dijkstra_one_to_all
+from app.services.isochrone import IsochroneBuilder
+from app.utils.time import time_to_seconds
+
+SOURCE = "METRO_5726"       # Trindade
+START_TIME = "08:00:00"
+CONTOURS_MIN = (15, 30, 45)
+GRID = 10                   # grelha GRID x GRID de pontos com 500 m de espaçamento
+
+
+if __name__ == "__main__":
+    graph = get_metro_graph_route()
+    graph.build_graph()
+    builder = IsochroneBuilder(graph)
+    start_sec = time_to_seconds(START_TIME)
+
+    per_contour_sec, _ = timeit(lambda: [
+        dijkstra_one_to_all(builder.cg, SOURCE, start_sec, minutes * 60) for minutes in CONTOURS_MIN
+    ])
+    single_sec, _ = timeit(lambda: dijkstra_one_to_all(builder.cg, SOURCE, start_sec, max(CONTOURS_MIN) * 60))
+    geojson_sec, _ = timeit(lambda: builder.from_node(SOURCE, start_sec, CONTOURS_MIN))
+
+    print(f"Contornos {CONTOURS_MIN} min a partir de {SOURCE} às {START_TIME}\n")
+    print(f"  Uma pesquisa por contorno:    {per_contour_sec * 1000:8.2f} ms")
+    print(f"  Uma pesquisa para todos:      {single_sec * 1000:8.2f} ms")
+    print(f"  Isócronas (GeoJSON):          {geojson_sec * 1000:8.2f} ms")
+
+    lat, lon = builder.cg.y[builder.cg.index(SOURCE)], builder.cg.x[builder.cg.index(SOURCE)]
+    step = 500 / 111320.0
+    points = [(lat + (i - GRID / 2) * step, lon + (j - GRID / 2) * step) for i in range(GRID) for j in range(GRID)]
+
+    start = time.perf_counter()
+    results = builder.batch(points, start_sec, CONTOURS_MIN)
+    batch_sec = time.perf_counter() - start
+    print(f"\n  Grelha de {len(results)} isócronas:    {batch_sec:8.2f} s  ({batch_sec / len(results) * 1000:.1f} ms cada)")
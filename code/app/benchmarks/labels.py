@@ -0,0 +1,99 @@
+"""
+Benchmark da memória dos labels das pesquisas multi-objetivo.
+
+Compara os bytes por label de um objeto com __dict__ por instância (a classe
+Solution, com os mesmos campos de um label) com o Label compacto
+(__slots__) usado dentro do A* e do Dijkstra, e o pico de memória de uma
+pesquisa A* no grafo do Metro. Os bytes incluem os custos (floats) e a parte
+de cada label nos conjuntos de nós visitados (um a cada VISITED_SNAPSHOT_DEPTH
+níveis): o ganho dos __slots__ é só o do __dict__, ~1.2x por label.
+
+Uso:
+    cd app
+    python -m benchmarks.labels
+"""
+
+import os
+import sys
+module_path = os.path.abspath(os.path.join('..'))
+if module_path not in sys.path:
+    sys.path.append(module_path)
+
+import tracemalloc
+
+from app.benchmarks.common import get_metro_graph_route
+from app.services.algoritms.a_star import optimized_multi_objective_routing
+from app.services.solution import Label, Solution, VISITED_SNAPSHOT_DEPTH
+from app.utils.time import time_to_seconds
+
+N_LABELS = 100000
+PATH_LENGTH = 50   # paragens de Casa da Música -> Póvoa de Varzim
+N_NODES = 1000     # índices de nó (bits dos conjuntos de nós visitados)
+
+SOURCE = "METRO_5706"       # Casa da Música
+DESTINATION = "METRO_5746"  # Póvoa de Varzim
+START_TIME = "08:00:00"
+
+
+def make_dict_labels(n):
+    """Caminhos de PATH_LENGTH labels como objetos Solution (com __dict__), com os mesmos campos de Label."""
+    labels = []
+    parent = None
+    for i in range(n):
+        depth = i % PATH_LENGTH
+        if depth == 0:
+            parent = None
+        sol = Solution(float(i), float(i), 0.0, 28800.0 + i, None)
+        sol.node = (i * 7) % N_NODES
+        sol.trip_info = 'transfer'
+        sol.parent = parent
+        sol.depth = depth
+        if parent is None or depth % VISITED_SNAPSHOT_DEPTH == 0:
+            sol.visited = (parent.visited if parent is not None else 0) | (1 << sol.node)
+        else:
+            sol.visited = parent.visited
+        labels.append(sol)
+        parent = sol
+    return labels
+
+
+def make_slot_labels(n):
+    """Caminhos de PATH_LENGTH objetos Label."""
+    labels = []
+    parent = None
+    for i in range(n):
+        if i % PATH_LENGTH == 0:
+            parent = None
+        label = Label(float(i), float(i), 0.0, 28800.0 + i, (i * 7) % N_NODES, 'transfer', parent)
+        labels.append(label)
+        parent = label
+    return labels
+
+
+def bytes_per_label(func, n):
+    tracemalloc.start()
+    labels = func(n)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Descontar a lista que guarda os labels
+    return (retained - sys.getsizeof(labels)) / n
+
+
+if __name__ == "__main__":
+    print(f"Bytes por label ({N_LABELS:,} labels em caminhos de {PATH_LENGTH}, {N_NODES} nós):")
+    dict_bytes = bytes_per_label(make_dict_labels, N_LABELS)
+    slot_bytes = bytes_per_label(make_slot_labels, N_LABELS)
+    print(f"  Solution (__dict__): {dict_bytes:6.0f} B")
+    print(f"  Label (__slots__):   {slot_bytes:6.0f} B  ({dict_bytes / slot_bytes:.1f}x menos)")
+
+    graph = get_metro_graph_route()
+    graph.build_graph()
+    cg = graph.compact_graph
+    start_sec = time_to_seconds(START_TIME)
+
+    tracemalloc.start()
+    solutions = optimized_multi_objective_routing(cg, SOURCE, DESTINATION, start_sec)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"\nPico de memória do A* Casa da Música -> Póvoa de Varzim: {peak / 1024:.0f} KB ({len(solutions)} soluções)")
@@ -0,0 +1,69 @@
+"""
+Benchmark da matriz origem-destino.
+
+Compara, para todas as paragens do Metro às 08:00:
+- uma pesquisa McRAPTOR por par origem-destino (ciclo ingénuo, numa amostra de origens);
+- uma pesquisa one-to-all por origem, no processo atual;
+- a mesma matriz com as origens distribuídas por um pool de processos.
+
+Uso:
+    cd app
+    python -m benchmarks.matrix
+"""
+
+import os
+import sys
+module_path = os.path.abspath(os.path.join('..'))
+if module_path not in sys.path:
+    sys.path.append(module_path)
+
+import tempfile
+import time
+
+import numpy as np
+
+from app.benchmarks.common import get_metro_graph_route
+from app.services.algoritms.raptor import mc_raptor
+from app.services.matrix import TravelTimeMatrix, get_stops, travel_time_matrix
+from app.utils.time import time_to_seconds
+
+START_TIME = "08:00:00"
+NAIVE_ORIGINS = 5
+PROCESSES = max(2, os.cpu_count() or 1)
+
+
+if __name__ == "__main__":
+    graph = get_metro_graph_route()
+    graph.build_graph()
+    timetable = graph.raptor_timetable
+    start_sec = time_to_seconds(START_TIME)
+    stops = get_stops(timetable)
+
+    print(f"{len(stops)} paragens ({len(stops) ** 2} pares), partida às {START_TIME}\n")
+
+    start = time.perf_counter()
+    for origin in stops[:NAIVE_ORIGINS]:
+        for destination in stops:
+            if destination != origin:
+                mc_raptor(timetable, origin, destination, start_sec)
+    naive_sec = (time.perf_counter() - start) / NAIVE_ORIGINS * len(stops)
+    print(f"  Pesquisa por par (estimado):  {naive_sec:8.2f} s")
+
+    start = time.perf_counter()
+    matrix = travel_time_matrix(timetable, stops, start_sec, processes=1)
+    sequential_sec = time.perf_counter() - start
+    print(f"  One-to-all, 1 processo:       {sequential_sec:8.2f} s  ({naive_sec / sequential_sec:.0f}x)")
+
+    start = time.perf_counter()
+    pooled = travel_time_matrix(timetable, stops, start_sec, processes=PROCESSES)
+    pool_sec = time.perf_counter() - start
+    print(f"  One-to-all, {PROCESSES} processos:      {pool_sec:8.2f} s  ({naive_sec / pool_sec:.0f}x)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "matrix.npz")
+        pooled.save(path)
+        size_kb = os.path.getsize(path) / 1024
+        loaded = TravelTimeMatrix.load(path)
+
+    reached = np.isfinite(loaded.min_time()).sum()
+    print(f"\n  {len(loaded.total_time)} soluções, {reached} pares alcançados, ficheiro .npz: {size_kb:.1f} KB")
@@ -0,0 +1,149 @@
+"""
+Benchmark do registo de operadores (FeedRegistry) com IDs em códigos inteiros.
+
+1. Operador de cada paragem e filtro de transferências entre operadores:
+   separar o prefixo do stop_id ("METRO_5706".split('_')) vs códigos inteiros
+   (coluna operator), sobre as paragens do Metro e da STCP.
+2. Escala com o número de operadores: o Metro mais K operadores sintéticos
+   (cópias do Metro deslocadas para fora do corredor, com outro prefixo). O
+   tempo e a memória de get_filtered_multimodal_feed para a mesma consulta
+   devem ficar estáveis, porque os operadores sem paragens no corredor não
+   percorrem as suas tabelas nem entram na fusão.
+
+Uso:
+    cd app
+    python -m benchmarks.operators
+"""
+
+import os
+import sys
+module_path = os.path.abspath(os.path.join('..'))
+if module_path not in sys.path:
+    sys.path.append(module_path)
+
+import tracemalloc
+
+import numpy as np
+import gtfs_kit as gk
+from shapely.geometry import Point
+
+from app.benchmarks.common import timeit
+from app.utils.co2 import CO2_METRO_GPKM
+from app.utils.feed import FEED_REGISTRY, load_feed, get_filtered_multimodal_feed
+from app.utils.registry import FeedRegistry
+from app.utils.time import time_to_seconds
+
+N_RUNS = 5
+EXTRA_OPERATORS = [0, 1, 3, 7]
+
+# Deslocamento (graus de latitude) de cada operador sintético: fora de qualquer corredor do Porto
+SYNTHETIC_OFFSET_DEG = 1.0
+
+ORIGIN = Point(-8.6308, 41.1588)       # Casa da Música
+DESTINATION = Point(-8.7610, 41.3797)  # Póvoa de Varzim
+SERVICE_DATE = "20260310"
+TIME_WINDOW = (time_to_seconds("08:00:00"), time_to_seconds("11:00:00"))
+
+ID_COLUMNS = {
+    'stops': ['stop_id'],
+    'stop_times': ['stop_id', 'trip_id'],
+    'trips': ['trip_id', 'route_id'],
+    'routes': ['route_id'],
+}
+
+
+def synthetic_feed(feed, prefix, offset_deg):
+    """Cópia do feed com os IDs noutro prefixo e as paragens deslocadas offset_deg para norte."""
+    tables = {}
+    for table in ['agency', 'stops', 'routes', 'trips', 'stop_times', 'calendar', 'calendar_dates']:
+        df = getattr(feed, table)
+        if df is None:
+            continue
+        df = df.copy()
+        for column in ID_COLUMNS.get(table, []):
+            df[column] = df[column].str.replace(f"{feed.id_prefix}_", f"{prefix}_", n=1, regex=False)
+        tables[table] = df
+    tables['stops']['stop_lat'] = tables['stops']['stop_lat'] + offset_deg
+
+    synthetic = gk.Feed(dist_units=feed.dist_units, **tables)
+    synthetic.id_prefix = prefix
+    return synthetic
+
+
+def best_of(fn, n_runs=N_RUNS):
+    times = []
+    for _ in range(n_runs):
+        elapsed, result = timeit(fn)
+        times.append(elapsed)
+    return min(times), result
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def bench_operator_lookup():
+    from scipy.spatial import cKDTree
+
+    stops = [load_feed(operator.prefix).stops for operator in FEED_REGISTRY]
+    stop_ids = np.concatenate([s['stop_id'].to_numpy() for s in stops])
+    operators = np.concatenate([s['operator'].to_numpy() for s in stops])
+    coords = np.concatenate([s[['stop_lat', 'stop_lon']].to_numpy() for s in stops])
+    prefixes = FEED_REGISTRY.prefixes()
+
+    print(f"\nOperador de {len(stop_ids)} paragens (Metro + STCP):")
+    split_sec, modo_split = best_of(lambda: [stop_id.split('_')[0] for stop_id in stop_ids])
+    code_sec, modo_code = best_of(lambda: prefixes[operators])
+    assert list(modo_split) == list(modo_code)
+    print(f"  split('_')          {split_sec * 1000:8.2f} ms")
+    print(f"  prefixes[operator]  {code_sec * 1000:8.2f} ms  ({split_sec / code_sec:.0f}x)")
+
+    pairs = cKDTree(coords).query_pairs(350 / 111000.0, output_type='ndarray')
+    print(f"\nFiltro de transferências entre operadores ({len(pairs)} pares candidatos):")
+
+    def by_split():
+        return [(i, j) for i, j in pairs.tolist() if stop_ids[i].split('_')[0] != stop_ids[j].split('_')[0]]
+
+    def by_code():
+        return pairs[operators[pairs[:, 0]] != operators[pairs[:, 1]]]
+
+    split_sec, kept_split = best_of(by_split)
+    code_sec, kept_code = best_of(by_code)
+    assert len(kept_split) == len(kept_code)
+    print(f"  split('_') por par  {split_sec * 1000:8.2f} ms")
+    print(f"  operator (máscara)  {code_sec * 1000:8.2f} ms  ({split_sec / code_sec:.0f}x, {len(kept_code)} pares)")
+
+
+def bench_scaling():
+    metro = load_feed("METRO")
+    synthetic = [
+        synthetic_feed(metro, f"SIM{k}", SYNTHETIC_OFFSET_DEG * (k + 1)) for k in range(max(EXTRA_OPERATORS))
+    ]
+
+    print(f"\nget_filtered_multimodal_feed (Casa da Música -> Póvoa, {SERVICE_DATE}, 08:00-11:00):")
+    print(f"{'operadores':>10s} {'paragens':>9s} {'stop_times':>11s} {'tempo':>10s} {'pico memória':>13s}")
+    for n_extra in EXTRA_OPERATORS:
+        registry = FeedRegistry()
+        registry.register("METRO", co2_gpkm=CO2_METRO_GPKM, feed=metro)
+        for k in range(n_extra):
+            registry.register(f"SIM{k}", co2_gpkm=CO2_METRO_GPKM, feed=synthetic[k])
+
+        def query():
+            return get_filtered_multimodal_feed(
+                ORIGIN, DESTINATION, service_date=SERVICE_DATE, time_window=TIME_WINDOW, registry=registry
+            )
+
+        query()  # índices de cada feed (grelha, stop_times por paragem) construídos fora da medição
+        elapsed, feed = best_of(query)
+        peak = peak_memory(query)
+        print(f"{len(registry):10d} {len(feed.stops):9d} {len(feed.stop_times):11d} "
+              f"{elapsed * 1000:7.1f} ms {peak / 1e6:10.1f} MB")
+
+
+if __name__ == "__main__":
+    bench_operator_lookup()
+    bench_scaling()
@@ -0,0 +1,117 @@
+"""
+Microbenchmark do arquivo de Pareto (ParetoArchive) face a add_solution_with_diversity.
+
+Para fronteiras com 10, 100 e 1000 labels mede o tempo médio de:
+- rejeição: candidato dominado por uma das entradas (o caso mais comum nas pesquisas);
+- inserção: construção da fronteira, inserindo as suas entradas por ordem aleatória.
+
+Sem limite de tamanho e sem filtro epsilon, para comparar apenas os testes de dominância.
+Antes das medições verifica o caso de regressão "divisão seguida de remoções"
+(check_split_then_shrink).
+Com 10 labels o arquivo é um único bloco percorrido linearmente (LINEAR_SCAN_MAX),
+e o custo fica próximo do da lista; as escadas só contam a partir de ~100 labels.
+
+Uso:
+    cd app
+    python -m benchmarks.pareto
+"""
+
+import os
+import sys
+module_path = os.path.abspath(os.path.join('..'))
+if module_path not in sys.path:
+    sys.path.append(module_path)
+
+import time
+
+import numpy as np
+
+from app.services.pareto import ParetoArchive
+from app.services.solution import Label, add_solution_with_diversity
+
+SIZES = [10, 100, 1000]
+N_CANDIDATES = 2000
+N_RUNS = 5
+NO_LIMIT = 10**9
+
+
+def make_front(n, rng):
+    """n labels mutuamente não dominados: o tempo sobe e o CO2 desce; caminhada aleatória."""
+    times = np.sort(rng.uniform(0, 7200, n))
+    co2 = np.sort(rng.uniform(0, 2000, n))[::-1]
+    walks = rng.uniform(0, 2, n)
+    return [Label(float(t), float(c), float(w), 0, 0, 'start') for t, c, w in zip(times, co2, walks)]
+
+
+def make_dominated(front, rng):
+    """Candidatos ligeiramente piores que uma entrada aleatória da fronteira."""
+    picks = rng.integers(0, len(front), N_CANDIDATES)
+    return [Label(front[i].total_time + 1, front[i].total_co2 + 1, front[i].total_walk_km, 0, 0, 'start') for i in picks]
+
+
+def per_call_us(func, candidates):
+    """Tempo médio por chamada (µs), na melhor de N_RUNS repetições."""
+    best = float('inf')
+    for _ in range(N_RUNS):
+        start = time.perf_counter()
+        for candidate in candidates:
+            func(candidate)
+        best = min(best, time.perf_counter() - start)
+    return best / len(candidates) * 1e6
+
+
+def check_split_then_shrink():
+    """
+    Um arquivo dividido em vários blocos que volta a ter até LINEAR_SCAN_MAX
+    entradas tem de continuar a ver as entradas de todos os blocos.
+    """
+    archive = ParetoArchive()
+    for i in range(70):
+        archive.add(Label(float(i), 1000.0 - i, 100.0 if i % 5 == 0 else 0.0, 0, 0, 'start'))
+    assert len(archive._blocks) > 1, "o arquivo devia ter sido dividido em blocos"
+
+    # Domina as 56 entradas sem caminhada: ficam 14, espalhadas pelos blocos
+    assert archive.add(Label(-1.0, 0.0, 50.0, 0, 0, 'start'))
+    assert len(archive) == 15
+
+    # Dominada pela entrada (40, 960, 100), que estava no segundo bloco
+    assert not archive.add(Label(40.5, 960.0, 100.0, 0, 0, 'start')), "entrada dominada aceite"
+    assert archive.rejects(40.5, 960.0, 100.0)
+    print("Divisão seguida de remoções: entrada dominada recusada (ok)\n")
+
+
+if __name__ == "__main__":
+    check_split_then_shrink()
+    rng = np.random.default_rng(0)
+
+    print(f"{'labels':>7} | {'operação':<9} | {'lista (µs)':>10} | {'arquivo (µs)':>12} | ganho")
+    for n in SIZES:
+        front = make_front(n, rng)
+
+        archive = ParetoArchive()
+        for label in front:
+            archive.add(label)
+
+        # Rejeição: o conjunto não muda
+        dominated = make_dominated(front, rng)
+        list_us = per_call_us(lambda s: add_solution_with_diversity(front, s, NO_LIMIT, 0), dominated)
+        archive_us = per_call_us(archive.add, dominated)
+        print(f"{n:>7} | {'rejeição':<9} | {list_us:>10.2f} | {archive_us:>12.2f} | {list_us / archive_us:4.1f}x")
+
+        # Construção: inserir a fronteira, por ordem aleatória, numa estrutura vazia
+        order = [front[i] for i in rng.permutation(n)]
+
+        def build_list():
+            current = []
+            for s in order:
+                current, _ = add_solution_with_diversity(current, s, NO_LIMIT, 0)
+
+        def build_archive():
+            archive = ParetoArchive()
+            for s in order:
+                archive.add(s)
+
+        repeat = max(1, 20000 // (n * n) + 1)
+        list_us = per_call_us(lambda _: build_list(), range(repeat)) / n
+        archive_us = per_call_us(lambda _: build_archive(), range(repeat)) / n
+        print(f"{n:>7} | {'inserção':<9} | {list_us:>10.2f} | {archive_us:>12.2f} | {list_us / archive_us:4.1f}x")
@@ -0,0 +1,58 @@
+"""
+Benchmark do filtro do feed por data de serviço (calendar.txt + calendar_dates.txt).
+
+Sem o filtro, cada aresta de trânsito recebe as partidas de todos os tipos de
+dia (úteis, sábados, domingos e feriados). Compara, para o feed do Metro, o
+grafo sem filtro com o grafo de um dia útil, de um sábado e de um domingo:
+stop_times, ligações por aresta, tempo de build_graph e de uma consulta A*.
+
+Uso:
+    cd app
+    python -m benchmarks.service_date
+"""
+
+import os
+import sys
+module_path = os.path.abspath(os.path.join('..'))
+if module_path not in sys.path:
+    sys.path.append(module_path)
+
+from app.benchmarks.common import get_metro_graph_route, timeit
+from app.services.algoritms.a_star import optimized_multi_objective_routing
+from app.utils.time import time_to_seconds
+
+# Datas dentro do calendário do feed do Metro incluído no repositório
+SERVICE_DATES = {
+    "todos os dias": None,
+    "dia útil (2026-03-10)": "20260310",
+    "sábado (2026-03-14)": "20260314",
+    "domingo (2026-03-15)": "20260315",
+}
+
+SOURCE = "METRO_5706"       # Casa da Música
+DESTINATION = "METRO_5746"  # Póvoa de Varzim
+START_TIME = "08:00:00"
+
+
+if __name__ == "__main__":
+    start_sec = time_to_seconds(START_TIME)
+
+    rows = []
+    for label, service_date in SERVICE_DATES.items():
+        graph = get_metro_graph_route(service_date)
+        n_stop_times = len(graph.gtfs_feed.stop_times)
+
+        build_sec, _ = timeit(graph.build_graph)
+        n_edges = graph.G.number_of_edges()
+        n_connections = sum(len(data['connections']) for _, _, data in graph.G.edges(data=True))
+
+        cg = graph.compact_graph
+        query_sec, solutions = timeit(lambda: optimized_multi_objective_routing(cg, SOURCE, DESTINATION, start_sec))
+        rows.append((label, n_stop_times, n_edges, n_connections, build_sec, query_sec, len(solutions)))
+
+    print(f"\n{'Feed':24s} {'stop_times':>10s} {'arestas':>8s} {'ligações':>9s} {'lig/aresta':>10s} {'build_graph':>12s} {'A* 08:00':>10s}")
+    for label, n_stop_times, n_edges, n_connections, build_sec, query_sec, n_solutions in rows:
+        print(
+            f"{label:24s} {n_stop_times:10d} {n_edges:8d} {n_connections:9d} {n_connections / max(n_edges, 1):10.1f} "
+            f"{build_sec * 1000:9.1f} ms {query_sec * 1000:7.1f} ms  ({n_solutions} soluções)"
+        )
@@ -0,0 +1,76 @@
+"""
+Benchmark do corte dos stop_times pelo horizonte temporal da consulta.
+
+Uma consulta às 08:00 não usa viagens das 05:00 nem das 23:00. Compara, para
+o feed do Metro num dia útil:
+- o corte por pesquisa binária no índice temporal (StopTimesIndex) com uma
+  comparação linha a linha sobre a tabela completa;
+- o grafo do dia inteiro com o grafo do horizonte [08:00, 08:00 + duração]:
+  ligações, tempo de build_graph e da consulta A* (que tem de dar o mesmo
+  resultado).
+
+Uso:
+    cd app
+    python -m benchmarks.time_window
+"""
+
+import os
+import sys
+module_path = os.path.abspath(os.path.join('..'))
+if module_path not in sys.path:
+    sys.path.append(module_path)
+
+from app.benchmarks.common import get_metro_graph_route, timeit
+from app.services.algoritms.a_star import optimized_multi_objective_routing
+from app.utils.stop_times import StopTimesIndex
+from app.utils.time import time_to_seconds
+
+SERVICE_DATE = "20260310"   # dia útil dentro do calendário do feed do Metro
+START_TIME = "08:00:00"
+MAX_JOURNEY_SEC = [3600 * 3, 3600 * 2, 3600 * 3 // 2]
+
+SOURCE = "METRO_5706"       # Casa da Música
+DESTINATION = "METRO_5746"  # Póvoa de Varzim
+
+
+def fronts(solutions):
+    return sorted((s.total_time, round(s.total_co2, 6), round(s.total_walk_km, 6)) for s in solutions)
+
+
+if __name__ == "__main__":
+    start_sec = time_to_seconds(START_TIME)
+    graph = get_metro_graph_route(SERVICE_DATE)
+    stop_times = graph.gtfs_feed.stop_times
+
+    index_sec, index = timeit(lambda: StopTimesIndex(stop_times))
+    end_sec = start_sec + MAX_JOURNEY_SEC[0]
+    search_sec, rows = timeit(lambda: index.rows_between(start_sec, end_sec), repeat=20)
+    scan_sec, mask = timeit(
+        lambda: (stop_times['departure_sec'] >= start_sec) & (stop_times['departure_sec'] <= end_sec + index.max_dwell_sec),
+        repeat=20,
+    )
+    assert mask.sum() == len(rows)
+    print(f"Corte de {len(stop_times)} stop_times para [08:00, +{MAX_JOURNEY_SEC[0] // 60} min] ({len(rows)} linhas):")
+    print(f"  Índice temporal (uma vez): {index_sec * 1000:7.2f} ms")
+    print(f"  Pesquisa binária:          {search_sec * 1000:7.2f} ms")
+    print(f"  Comparação linha a linha:  {scan_sec * 1000:7.2f} ms")
+
+    rows_out = []
+    reference = None
+    for max_journey_sec in [None] + MAX_JOURNEY_SEC:
+        time_window = (start_sec, start_sec + max_journey_sec) if max_journey_sec is not None else None
+
+        build_sec, _ = timeit(lambda: graph.build_graph(time_window))
+        n_connections = sum(len(data['connections']) for _, _, data in graph.G.edges(data=True))
+        graph.__dict__.pop('compact_graph', None)
+        cg = graph.compact_graph
+
+        query_sec, solutions = timeit(lambda: optimized_multi_objective_routing(cg, SOURCE, DESTINATION, start_sec))
+        if reference is None:
+            reference = fronts(solutions)
+        label = "dia inteiro" if max_journey_sec is None else f"+{max_journey_sec // 60} min"
+        rows_out.append((label, n_connections, build_sec, query_sec, fronts(solutions) == reference))
+
+    print(f"\n{'Horizonte':12s} {'ligações':>9s} {'build_graph':>12s} {'A* 08:00':>10s}  mesmo resultado")
+    for label, n_connections, build_sec, query_sec, same in rows_out:
+        print(f"{label:12s} {n_connections:9d} {build_sec * 1000:9.1f} ms {query_sec * 1000:7.2f} ms  {'sim' if same else 'NÃO'}")
@@ -1,10 +1,12 @@
 """
 Framework de Avaliação Comparativa dos Algoritmos
 
-Executa casos de teste e compara desempenho dos 3 algoritmos:
+Executa casos de teste e compara desempenho dos algoritmos:
 - A* Multi-Objetivo
 - Dijkstra Multi-Label
 - ACO (Ant Colony Optimization)
+- McRAPTOR (por rondas, sobre padrões de rota GTFS)
+- CSA Multi-Critério (Connection Scan Algorithm)
 """
 
 import os
@@ -21,6 +23,8 @@ from app.services.graph import GraphRoute
 from app.services.algoritms.a_star import optimized_multi_objective_routing
 from app.services.algoritms.dijkstra import dijkstra_multi_objective
 from app.services.algoritms.aco import aco_optimized_routing
+from app.services.algoritms.raptor import mc_raptor
+from app.services.algoritms.csa import mc_csa
 from app.utils.time import time_to_seconds
 from app.test_cases import TestCaseEvaluator
 
@@ -53,6 +57,8 @@ class TestCaseResult:
     dijkstra_metrics: AlgorithmMetrics
     aco_metrics: AlgorithmMetrics
     validation_passed: bool
+    raptor_metrics: AlgorithmMetrics = None
+    csa_metrics: AlgorithmMetrics = None
     notes: str = ""
 
 
@@ -66,7 +72,7 @@ class ComparativeEvaluator:
 
     def run_single_test(self, test_case: Dict, verbose: bool = True) -> TestCaseResult:
         """
-        Executa um único caso de teste com os 3 algoritmos
+        Executa um único caso de teste com todos os algoritmos
         
         Returns: TestCaseResult com métricas de todos os algoritmos
         """
@@ -81,7 +87,7 @@ class ComparativeEvaluator:
 
         try:
             # 1. Construir grafo
-            print("[1/4] Construindo grafo multimodal...")
+            print("[1/6] Construindo grafo multimodal...")
             graph = GraphRoute(
                 origem=test_case["origem"],
                 destino=test_case["destino"]
@@ -90,10 +96,10 @@ class ComparativeEvaluator:
             print("✓ Grafo construído\n")
 
             # 2. Executar A*
-            print("[2/4] Executando A* Multi-Objetivo...")
+            print("[2/6] Executando A* Multi-Objetivo...")
             astar_metrics = self._run_algorithm(
                 algorithm_func=optimized_multi_objective_routing,
-                graph=graph.G,
+                graph=graph.compact_graph,
                 source=graph.origem_node_id,
                 destination=graph.destino_node_id,
                 start_time=start_sec,
@@ -101,10 +107,10 @@ class ComparativeEvaluator:
             )
 
             # 3. Executar Dijkstra
-            print("[3/4] Executando Dijkstra Multi-Label...")
+            print("[3/6] Executando Dijkstra Multi-Label...")
             dijkstra_metrics = self._run_algorithm(
                 algorithm_func=dijkstra_multi_objective,
-                graph=graph.G,
+                graph=graph.compact_graph,
                 source=graph.origem_node_id,
                 destination=graph.destino_node_id,
                 start_time=start_sec,
@@ -112,19 +118,41 @@ class ComparativeEvaluator:
             )
 
             # 4. Executar ACO
-            print("[4/4] Executando ACO...")
+            print("[4/6] Executando ACO...")
             aco_metrics = self._run_algorithm(
                 algorithm_func=aco_optimized_routing,
-                graph=graph.G,
+                graph=graph.compact_graph,
                 source=graph.origem_node_id,
                 destination=graph.destino_node_id,
                 start_time=start_sec,
                 name="ACO"
             )
 
+            # 5. Executar McRAPTOR
+            print("[5/6] Executando McRAPTOR...")
+            raptor_metrics = self._run_algorithm(
+                algorithm_func=mc_raptor,
+                graph=graph.raptor_timetable,
+                source=graph.origem_node_id,
+                destination=graph.destino_node_id,
+                start_time=start_sec,
+                name="McRAPTOR"
+            )
+
+            # 6. Executar CSA
+            print("[6/6] Executando CSA Multi-Critério...")
+            csa_metrics = self._run_algorithm(
+                algorithm_func=mc_csa,
+                graph=graph.connection_timetable,
+                source=graph.origem_node_id,
+                destination=graph.destino_node_id,
+                start_time=start_sec,
+                name="CSA Multi-Critério"
+            )
+
             # Validação
             validation_passed = self._validate_results(
-                test_case, astar_metrics, dijkstra_metrics, aco_metrics
+                test_case, astar_metrics, dijkstra_metrics, aco_metrics, raptor_metrics, csa_metrics
             )
 
             # Criar resultado
@@ -137,6 +165,8 @@ class ComparativeEvaluator:
                 astar_metrics=astar_metrics,
                 dijkstra_metrics=dijkstra_metrics,
                 aco_metrics=aco_metrics,
+                raptor_metrics=raptor_metrics,
+                csa_metrics=csa_metrics,
                 validation_passed=validation_passed
             )
 
@@ -206,12 +236,13 @@ class ComparativeEvaluator:
             print(f"  ❌ ERRO em {name}: {str(e)}\n")
             return None
 
-    def _validate_results(self, test_case, astar, dijkstra, aco) -> bool:
+    def _validate_results(self, test_case, astar, dijkstra, aco, raptor=None, csa=None) -> bool:
         """
         Valida que as soluções cumprem os critérios esperados
         """
         # Simplificado: validar que há soluções
-        if astar.num_solutions == 0 and dijkstra.num_solutions == 0 and aco.num_solutions == 0:
+        metrics = [m for m in (astar, dijkstra, aco, raptor, csa) if m is not None]
+        if all(m.num_solutions == 0 for m in metrics):
             return False
         
         return True
@@ -224,13 +255,13 @@ class ComparativeEvaluator:
             print("Nenhum resultado para comparar.")
             return
 
-        print("\n" + "="*120)
+        print("\n" + "="*160)
         print("TABELA COMPARATIVA - RESUMO DE TODOS OS CASOS")
-        print("="*120 + "\n")
+        print("="*160 + "\n")
 
-        print(f"{'Caso':<40} {'Complexidade':<12} {'A*':<18} {'Dijkstra':<18} {'ACO':<18}")
-        print(f"{'':40} {'':12} {'Soluções|Tempo':<18} {'Soluções|Tempo':<18} {'Soluções|Tempo':<18}")
-        print("-"*120)
+        print(f"{'Caso':<40} {'Complexidade':<12} {'A*':<18} {'Dijkstra':<18} {'ACO':<18} {'McRAPTOR':<18} {'CSA':<18}")
+        print(f"{'':40} {'':12} {'Soluções|Tempo':<18} {'Soluções|Tempo':<18} {'Soluções|Tempo':<18} {'Soluções|Tempo':<18} {'Soluções|Tempo':<18}")
+        print("-"*160)
 
         for result in self.results:
             print(f"{result.test_case_name[:40]:<40} {result.test_case_complexity:<12} ", end="")
@@ -253,9 +284,21 @@ class ComparativeEvaluator:
             else:
                 print("ERROR".ljust(18), end="")
 
+            # McRAPTOR
+            if result.raptor_metrics:
+                print(f"{result.raptor_metrics.num_solutions}|{result.raptor_metrics.execution_time_sec:.1f}s", end="".ljust(18))
+            else:
+                print("ERROR".ljust(18), end="")
+
+            # CSA
+            if result.csa_metrics:
+                print(f"{result.csa_metrics.num_solutions}|{result.csa_metrics.execution_time_sec:.1f}s", end="".ljust(18))
+            else:
+                print("ERROR".ljust(18), end="")
+
             print()
 
-        print("\n" + "="*120)
+        print("\n" + "="*160)
 
     def export_results_json(self, filename: str = "evaluation_results.json"):
         """
@@ -273,6 +316,8 @@ class ComparativeEvaluator:
                 "astar": asdict(result.astar_metrics) if result.astar_metrics else None,
                 "dijkstra": asdict(result.dijkstra_metrics) if result.dijkstra_metrics else None,
                 "aco": asdict(result.aco_metrics) if result.aco_metrics else None,
+                "raptor": asdict(result.raptor_metrics) if result.raptor_metrics else None,
+                "csa": asdict(result.csa_metrics) if result.csa_metrics else None,
             }
             results_dict.append(result_data)
 
@@ -307,6 +352,14 @@ class ComparativeEvaluator:
             if result.aco_metrics:
                 self._print_algorithm_details(result.aco_metrics)
 
+            # McRAPTOR
+            if result.raptor_metrics:
+                self._print_algorithm_details(result.raptor_metrics)
+
+            # CSA
+            if result.csa_metrics:
+                self._print_algorithm_details(result.csa_metrics)
+
             print("-"*120 + "\n")
     
     def _print_algorithm_details(self, metrics: AlgorithmMetrics):
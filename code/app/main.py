@@ -1,21 +1,30 @@
-from app.services.graph import GraphRoute
+import os
+import logging
+
+from app.services.graph import GraphRoute, SNAPSHOT_PATH
 from app.services.algoritms.a_star import optimized_multi_objective_routing
 from app.services.algoritms.dijkstra import dijkstra_multi_objective
 from app.services.algoritms.aco import aco_optimized_routing
 from app.utils.time import time_to_seconds
 
+# Mensagens das bibliotecas (filtro por data de serviço, tamanho do grafo)
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
 # Carregar grafo
 # Rotas: Casa da Musica → Casino da Póvoa de Varzim, 4490-403
+# Se existir um snapshot da cidade (python -m app.services.graph), a consulta
+# apenas liga a origem e o destino ao grafo já construído.
 graph = GraphRoute(
     origem="Casa da Musica",
     destino="Casino da Póvoa de Varzim, 4490-403",
+    snapshot_path=SNAPSHOT_PATH if os.path.exists(SNAPSHOT_PATH) else None,
 )
 
 START_TIME = '08:00:00'
 
 # Executar A*
 a_star_pareto_solutions = optimized_multi_objective_routing(
-    graph.G, graph.origem_node_id, graph.destino_node_id, time_to_seconds(START_TIME)
+    graph.compact_graph, graph.origem_node_id, graph.destino_node_id, time_to_seconds(START_TIME)
 )
 
 # Ver resultados
@@ -24,7 +33,7 @@ for i, sol in enumerate(a_star_pareto_solutions, 1):
 
 # Executar Dijkstra
 dijkstra_pareto_solutions = dijkstra_multi_objective(
-    graph.G, graph.origem_node_id, graph.destino_node_id, time_to_seconds(START_TIME)
+    graph.compact_graph, graph.origem_node_id, graph.destino_node_id, time_to_seconds(START_TIME)
 )
 
 # Ver resultados
@@ -33,7 +42,7 @@ for i, sol in enumerate(dijkstra_pareto_solutions, 1):
 
 # Executar ACO
 aco_pareto_solutions = aco_optimized_routing(
-    graph.G, graph.origem_node_id, graph.destino_node_id, time_to_seconds(START_TIME)
+    graph.compact_graph, graph.origem_node_id, graph.destino_node_id, time_to_seconds(START_TIME)
 )
 
 # Ver resultados
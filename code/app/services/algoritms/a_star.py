@@ -1,35 +1,47 @@
 import heapq
 
-from app.services.solution import Solution, add_solution_with_diversity
-from app.utils.route import get_edge_costs
+from app.services.compact_graph import CompactGraph
+from app.services.pareto import ParetoArchive
+from app.services.solution import Label, Solution
 
 
 def optimized_multi_objective_routing(G, source, destination, start_time_sec):
     """
     Algoritmo A* Multi-Objetivo (Tempo, CO2, Exercício).
     Garante a diversidade de soluções na fronteira de Pareto.
+
+    G pode ser um CompactGraph ou o MultiDiGraph do networkx (exportado na hora).
     """
     # 1. Configurações de Diversidade
     MAX_LABELS_PER_NODE = 10  # Permite manter várias opções em cada paragem
     TIME_WINDOW_EPSILON = 120 # (2 min) Agrupa soluções muito parecidas para ganhar velocidade
 
     # 2. Inicialização
-    # label_set[nó] = lista de objetos Solution
-    label_set = {node: [] for node in G.nodes}
-    final_solutions = []
+    cg = CompactGraph.as_compact(G)
+    source = cg.index(source)
+    destination = cg.index(destination)
+
+    # Heurística pré-calculada para todos os nós (consulta O(1) no ciclo interno)
+    h_time_table, h_co2_table = Solution.get_heuristic_table(cg, destination)
+
+    # label_set[nó] = ParetoArchive de objetos Label (criado na primeira visita)
+    label_set = [None] * cg.number_of_nodes
+    final_solutions = ParetoArchive(max_size=15, epsilon=TIME_WINDOW_EPSILON)
     count = 0 
 
     # Heurística Admissível (Peso 1.0 para não matar a diversidade)
-    h_time, h_co2 = Solution.get_heuristic(source, destination, G)
+    h_time, h_co2 = h_time_table[source], h_co2_table[source]
 
-    initial_sol = Solution(
+    initial_sol = Label(
         total_time=0, 
         total_co2=0.0, 
         total_walk_km=0.0, 
         arrival_sec=start_time_sec, 
-        path=[(source, 'start', start_time_sec)]
+        node=source,
+        trip_info='start'
     )
-    label_set[source] = [initial_sol]
+    label_set[source] = ParetoArchive(max_size=MAX_LABELS_PER_NODE, epsilon=TIME_WINDOW_EPSILON)
+    label_set[source].add(initial_sol)
 
     # PQ: (f_time, f_co2, count, current_node, solution)
     pq = [(h_time, h_co2, count, source, initial_sol)]
@@ -40,25 +52,24 @@ def optimized_multi_objective_routing(G, source, destination, start_time_sec):
         # --- PODAGEM GLOBAL RELAXADA ---
         # Só descartamos se for MUITO pior que a melhor solução já encontrada
         if final_solutions:
-            best_t_found = min(s.total_time for s in final_solutions)
+            best_t_found = final_solutions.min_time()
             if f_time > best_t_found * 1.5: # Permite soluções até 50% mais lentas
                 continue
 
         # --- CHEGADA AO DESTINO ---
         if u == destination:
-            final_solutions, _ = add_solution_with_diversity(
-                final_solutions, u_sol, max_labels=15, epsilon=TIME_WINDOW_EPSILON
-            )
+            final_solutions.add(u_sol)
             continue
 
         # --- EXPLORAÇÃO ---
-        for v in G.neighbors(u):
+        for e in cg.edges_from(u):
+            v = cg.target(e)
+
             # BLOQUEIO DE CICLOS (Evita loops infinitos em transferências)
-            if any(v == step[0] for step in u_sol.path):
+            if u_sol.visits(v):
                 continue
 
-            edge_data = G.get_edge_data(u, v).get(0)
-            t_cost, c_cost, w_cost, trip_info = get_edge_costs(edge_data, u_sol.arrival_sec)
+            t_cost, c_cost, w_cost, trip_info = cg.edge_costs(e, u_sol.arrival_sec)
             
             if t_cost == float('inf'): continue
 
@@ -69,23 +80,19 @@ def optimized_multi_objective_routing(G, source, destination, start_time_sec):
             v_arrival = u_sol.arrival_sec + t_cost
 
             # Heurística para o próximo nó
-            h_v_t, h_v_c = Solution.get_heuristic(v, destination, G)
-            v_f_time = v_g_time + h_v_t
-            v_f_co2 = v_g_co2 + h_v_c
+            v_f_time = v_g_time + h_time_table[v]
+            v_f_co2 = v_g_co2 + h_co2_table[v]
 
-            # Criar nova solução
-            v_sol = Solution(
-                v_g_time, v_g_co2, v_g_walk, v_arrival, 
-                u_sol.path + [(v, trip_info, v_arrival)]
-            )
+            # Criar nova solução (aponta para u_sol em vez de copiar o caminho)
+            v_sol = u_sol.extend(v, trip_info, v_g_time, v_g_co2, v_g_walk, v_arrival)
 
             # --- GESTÃO DE LABELS COM DIVERSIDADE ---
-            label_set[v], added = add_solution_with_diversity(
-                label_set[v], v_sol, max_labels=MAX_LABELS_PER_NODE, epsilon=TIME_WINDOW_EPSILON
-            )
+            if label_set[v] is None:
+                label_set[v] = ParetoArchive(max_size=MAX_LABELS_PER_NODE, epsilon=TIME_WINDOW_EPSILON)
 
-            if added:
+            if label_set[v].add(v_sol):
                 count += 1
                 heapq.heappush(pq, (v_f_time, v_f_co2, count, v, v_sol))
 
-    return final_solutions
+    # Só os labels da fronteira final são convertidos em Solution (com os IDs originais dos nós)
+    return [label.to_solution(cg) for label in final_solutions]
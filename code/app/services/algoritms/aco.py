@@ -1,10 +1,21 @@
 import numpy as np
 
-from app.services.solution import Solution, add_solution_with_diversity
-from app.utils.route import get_edge_costs
+from app.services.compact_graph import CompactGraph
+from app.services.pareto import ParetoArchive
+from app.services.solution import Solution
 
 
 def aco_optimized_routing(G, source, destination, start_time_sec, n_ants=30, n_iterations=20):
+    """
+    ACO multi-objetivo. G pode ser um CompactGraph ou o MultiDiGraph do networkx.
+    """
+    cg = CompactGraph.as_compact(G)
+    source = cg.index(source)
+    destination = cg.index(destination)
+
+    # Heurística pré-calculada para todos os nós (consulta O(1) em cada passo)
+    h_time_table, _ = Solution.get_heuristic_table(cg, destination)
+
     # Parâmetros de Controlo
     ALPHA = 1.0     # Importância do Feromónio
     BETA = 3.0      # Importância da Heurística (Maior = Mais focada no destino)
@@ -12,8 +23,9 @@ def aco_optimized_routing(G, source, destination, start_time_sec, n_ants=30, n_i
     RHO = 0.1       # Taxa de evaporação
 
     # Inicialização de Feromónios (Pequeno valor inicial para encorajar exploração)
-    pheromone = {edge: 0.1 for edge in G.edges()}
-    global_pareto_front = []
+    # Um valor por aresta do grafo compacto, indexado pelo índice da aresta
+    pheromone = np.full(cg.number_of_edges, 0.1)
+    global_pareto_front = ParetoArchive(max_size=15, epsilon=60)
 
     print(f"🚀 Iniciando ACO Agressivo: {n_ants} formigas, {n_iterations} gerações...")
 
@@ -34,20 +46,19 @@ def aco_optimized_routing(G, source, destination, start_time_sec, n_ants=30, n_i
                 if current_node == destination:
                     break
 
-                neighbors = list(G.neighbors(current_node))
-                valid_neighbors = [n for n in neighbors if n not in visited]
+                valid_edges = [e for e in cg.edges_from(current_node) if cg.target(e) not in visited]
 
-                if not valid_neighbors:
+                if not valid_edges:
                     break # Formiga em beco sem saída
 
                 # Cálculo de Probabilidades
                 probabilities = []
                 candidate_data = []
                 
-                for v in valid_neighbors:
-                    edge_data = G[current_node][v].get(0)
+                for e in valid_edges:
+                    v = cg.target(e)
                     # Obter custos reais (GTFS + Walk)
-                    t_cost, c_cost, w_cost, info = get_edge_costs(edge_data, current_time)
+                    t_cost, c_cost, w_cost, info = cg.edge_costs(e, current_time)
 
                     if t_cost == float('inf'):
                         probabilities.append(0)
@@ -55,11 +66,11 @@ def aco_optimized_routing(G, source, destination, start_time_sec, n_ants=30, n_i
                         continue
 
                     # HEURÍSTICA AGRESSIVA (1 / Distância ao Destino)
-                    h_v_time, _ = Solution.get_heuristic(v, destination, G)
+                    h_v_time = h_time_table[v]
                     # Adicionamos +1 para evitar divisão por zero e t_cost para penalizar arestas lentas
                     visibility = 1.0 / (t_cost + h_v_time + 1)
 
-                    tau = pheromone.get((current_node, v), 0.1)
+                    tau = pheromone.item(e)
 
                     # Fórmula ACS: tau^alpha * visibility^beta
                     prob = (tau ** ALPHA) * (visibility ** BETA)
@@ -71,7 +82,7 @@ def aco_optimized_routing(G, source, destination, start_time_sec, n_ants=30, n_i
 
                 # Seleção por Roleta
                 norm_probs = [p / prob_sum for p in probabilities]
-                choice_idx = np.random.choice(len(valid_neighbors), p=norm_probs)
+                choice_idx = np.random.choice(len(valid_edges), p=norm_probs)
                 
                 v, t, c, w, info = candidate_data[choice_idx]
                 
@@ -88,12 +99,11 @@ def aco_optimized_routing(G, source, destination, start_time_sec, n_ants=30, n_i
                 sol = Solution(total_time, total_co2, total_walk, current_time, path)
                 iteration_solutions.append(sol)
                 # Atualizar a Fronteira de Pareto Global
-                global_pareto_front, updated = add_solution_with_diversity(global_pareto_front, sol, max_labels=15, epsilon=60)
+                global_pareto_front.add(sol)
 
         # --- ATUALIZAÇÃO DE FEROMÓNIO ---
         # 1. Evaporação
-        for edge in pheromone:
-            pheromone[edge] *= (1 - RHO)
+        pheromone *= (1 - RHO)
         
         # 2. Depósito (Apenas as formigas que chegaram ao destino e são Pareto-ótimas)
         for sol in global_pareto_front:
@@ -102,10 +112,15 @@ def aco_optimized_routing(G, source, destination, start_time_sec, n_ants=30, n_i
             for i in range(len(sol.path) - 1):
                 u = sol.path[i][0]
                 v = sol.path[i+1][0]
-                if (u, v) in pheromone:
-                    pheromone[(u, v)] += reward
+                e = cg.find_edge(u, v)
+                if e >= 0:
+                    pheromone[e] += reward
                     
         if iteration % 5 == 0:
             print(f"  Iteração {iteration}: {len(global_pareto_front)} soluções na fronteira.")
 
-    return global_pareto_front
\ No newline at end of file
+    # Devolver os caminhos com os IDs originais dos nós
+    for sol in global_pareto_front:
+        sol.path = cg.to_node_path(sol.path)
+
+    return global_pareto_front.items
\ No newline at end of file
@@ -0,0 +1,225 @@
+from app.services.pareto import ParetoArchive
+from app.services.solution import Label
+from app.services.timetable import ConnectionTimetable
+
+
+def csa_earliest_arrival(G, source, destination, start_time_sec):
+    """
+    Connection Scan Algorithm (CSA) de chegada mais cedo.
+
+    Percorre uma única vez o array de ligações ordenado por partida, a partir
+    de start_time_sec: uma ligação é usada se o seu veículo já tiver sido
+    apanhado ou se a paragem de partida for alcançada a tempo. Termina quando
+    as ligações partem depois da melhor chegada ao destino.
+
+    G pode ser um ConnectionTimetable ou um GraphRoute (usa graph.connection_timetable).
+    Retorna uma lista com (no máximo) uma Solution.
+    """
+    tt = ConnectionTimetable.as_timetable(G)
+    cg = tt.cg
+    source = cg.index(source)
+    destination = cg.index(destination)
+
+    # best[nó] = Label com a chegada mais cedo a esse nó
+    best = [None] * cg.number_of_nodes
+    # trip_label[viagem] = Label na última paragem alcançada por essa viagem
+    trip_label = {}
+
+    def improve(node, label):
+        current = best[node]
+        if current is None or label.arrival_sec < current.arrival_sec:
+            best[node] = label
+            return True
+        return False
+
+    def relax_footpaths(label):
+        for v, walk_time, walk_km in tt.footpaths[label.node]:
+            improve(v, label.extend(
+                v, 'transfer',
+                label.total_time + walk_time,
+                label.total_co2,
+                label.total_walk_km + walk_km,
+                label.arrival_sec + walk_time
+            ))
+
+    initial_label = Label(
+        total_time=0,
+        total_co2=0.0,
+        total_walk_km=0.0,
+        arrival_sec=start_time_sec,
+        node=source,
+        trip_info='start'
+    )
+    best[source] = initial_label
+    relax_footpaths(initial_label)
+
+    departure_sec, arrival_sec = tt.departure_sec, tt.arrival_sec
+    dep_stop, arr_stop, trip, co2_cost_g = tt.dep_stop, tt.arr_stop, tt.trip, tt.co2_cost_g
+
+    for c in range(tt.first_connection(start_time_sec), len(tt)):
+        departure = departure_sec[c]
+
+        target = best[destination]
+        if target is not None and departure > target.arrival_sec:
+            break
+
+        t = trip[c]
+        label = trip_label.get(t)
+        if label is None:
+            label = best[dep_stop[c]]
+            if label is None or label.arrival_sec > departure:
+                continue
+
+        v = arr_stop[c]
+        arrival = arrival_sec[c]
+        label = label.extend(
+            v, tt.trip_ids[t],
+            label.total_time + arrival - label.arrival_sec,
+            label.total_co2 + co2_cost_g[c],
+            label.total_walk_km,
+            arrival
+        )
+        trip_label[t] = label
+
+        if improve(v, label):
+            relax_footpaths(label)
+
+    if best[destination] is None:
+        return []
+    return [best[destination].to_solution(cg)]
+
+
+def mc_csa(G, source, destination, start_time_sec):
+    """
+    CSA multi-objetivo (Tempo, CO2, Exercício).
+
+    Cada paragem tem um bag de Labels (o mesmo ParetoArchive com diversidade do
+    A*) e cada viagem um "trip bag" com os labels que seguem nela, que só
+    competem em CO2 e caminhada (todos chegam às paragens seguintes à mesma
+    hora). O varrimento termina quando as ligações partem depois de
+    start_time_sec + 1.5 x o melhor tempo já encontrado (a mesma poda relaxada do A*).
+
+    G pode ser um ConnectionTimetable ou um GraphRoute (usa graph.connection_timetable).
+    """
+    # 1. Configurações de Diversidade (iguais às do A*)
+    MAX_LABELS_PER_NODE = 10
+    TIME_WINDOW_EPSILON = 120
+
+    # 2. Inicialização
+    tt = ConnectionTimetable.as_timetable(G)
+    cg = tt.cg
+    source = cg.index(source)
+    destination = cg.index(destination)
+
+    # bags[nó] = ParetoArchive de Labels (criado na primeira visita)
+    bags = [None] * cg.number_of_nodes
+    bags[destination] = ParetoArchive(max_size=15, epsilon=TIME_WINDOW_EPSILON)
+    target_bag = bags[destination]
+    # trip_bags[viagem] = labels na última paragem alcançada por essa viagem
+    trip_bags = {}
+    # Hora a partir da qual nenhuma ligação pode levar a uma solução aceitável
+    bound = float('inf')
+
+    def add_to_bag(node, label):
+        nonlocal bound
+        if bags[node] is None:
+            bags[node] = ParetoArchive(max_size=MAX_LABELS_PER_NODE, epsilon=TIME_WINDOW_EPSILON)
+        if not bags[node].add(label):
+            return False
+
+        # --- PODAGEM GLOBAL RELAXADA ---
+        if node == destination:
+            bound = start_time_sec + target_bag.min_time() * 1.5
+        return True
+
+    def relax_footpaths(label):
+        for v, walk_time, walk_km in tt.footpaths[label.node]:
+            if label.visits(v):
+                continue
+            add_to_bag(v, label.extend(
+                v, 'transfer',
+                label.total_time + walk_time,
+                label.total_co2,
+                label.total_walk_km + walk_km,
+                label.arrival_sec + walk_time
+            ))
+
+    initial_label = Label(
+        total_time=0,
+        total_co2=0.0,
+        total_walk_km=0.0,
+        arrival_sec=start_time_sec,
+        node=source,
+        trip_info='start'
+    )
+    add_to_bag(source, initial_label)
+    relax_footpaths(initial_label)
+
+    departure_sec, arrival_sec = tt.departure_sec, tt.arrival_sec
+    dep_stop, arr_stop, trip, co2_cost_g = tt.dep_stop, tt.arr_stop, tt.trip, tt.co2_cost_g
+
+    # 3. Varrimento das ligações por ordem de partida
+    for c in range(tt.first_connection(start_time_sec), len(tt)):
+        departure = departure_sec[c]
+
+        if departure > bound:
+            break
+
+        t = trip[c]
+        riding = trip_bags.get(t)
+        bag = bags[dep_stop[c]]
+        if riding is None and not bag:
+            continue
+
+        # Embarcar os labels que chegam à paragem a tempo (o bag está ordenado por tempo)
+        candidates = list(riding) if riding else []
+        if bag:
+            for label in bag:
+                if label.arrival_sec > departure:
+                    break
+                merge_trip_bag(candidates, label)
+
+        if not candidates:
+            continue
+
+        v = arr_stop[c]
+        arrival = arrival_sec[c]
+        co2 = co2_cost_g[c]
+        extended = []
+        for label in candidates:
+            # Bloqueio de ciclos
+            if label.visits(v):
+                continue
+
+            label = label.extend(
+                v, tt.trip_ids[t],
+                label.total_time + arrival - label.arrival_sec,
+                label.total_co2 + co2,
+                label.total_walk_km,
+                arrival
+            )
+            extended.append(label)
+
+            if add_to_bag(v, label):
+                relax_footpaths(label)
+
+        trip_bags[t] = extended
+
+    # Só os labels do destino são convertidos em Solution (com os IDs originais dos nós)
+    return [label.to_solution(cg) for label in target_bag]
+
+
+def merge_trip_bag(trip_bag, label):
+    """
+    Junta label ao trip bag, mantendo só labels não dominados em CO2 e
+    caminhada (na mesma viagem, a hora de chegada é igual para todos).
+    """
+    for other in trip_bag:
+        if other.total_co2 <= label.total_co2 and other.total_walk_km >= label.total_walk_km:
+            return
+
+    trip_bag[:] = [
+        other for other in trip_bag
+        if not (label.total_co2 <= other.total_co2 and label.total_walk_km >= other.total_walk_km)
+    ]
+    trip_bag.append(label)
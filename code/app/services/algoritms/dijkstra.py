@@ -1,29 +1,41 @@
 import heapq
 
-from app.services.solution import Solution, add_solution_with_diversity
-from app.utils.route import get_edge_costs
+import numpy as np
+
+from app.services.compact_graph import CompactGraph
+from app.services.pareto import ParetoArchive
+from app.services.solution import Label
 
 
 def dijkstra_multi_objective(G, source, destination, start_time_sec):
     """
     Versão Dijkstra do roteador: expande por custo real acumulado.
     Ideal para garantir que encontramos todas as rotas ótimas sem viés de heurística.
+
+    G pode ser um CompactGraph ou o MultiDiGraph do networkx (exportado na hora).
     """
     # 1. Inicialização
+    cg = CompactGraph.as_compact(G)
+    source = cg.index(source)
+    destination = cg.index(destination)
+
     # label_set[nó] armazena as soluções não-dominadas encontradas para aquele ponto
-    label_set = {node: [] for node in G.nodes}
-    final_solutions = []
+    # (ParetoArchive criado na primeira visita ao nó)
+    label_set = [None] * cg.number_of_nodes
+    final_solutions = ParetoArchive(max_size=15, epsilon=60)
     count = 0 
 
     # Solução inicial na origem
-    initial_sol = Solution(
+    initial_sol = Label(
         total_time=0, 
         total_co2=0.0, 
         total_walk_km=0.0, 
         arrival_sec=start_time_sec, 
-        path=[(source, 'start', start_time_sec)]
+        node=source,
+        trip_info='start'
     )
-    label_set[source] = [initial_sol]
+    label_set[source] = ParetoArchive(max_size=8, epsilon=60)
+    label_set[source].add(initial_sol)
 
     # Fila de Prioridade: (g_time, g_co2, count, current_node, solution)
     # No Dijkstra, a prioridade é apenas o custo real 'g'
@@ -34,21 +46,19 @@ def dijkstra_multi_objective(G, source, destination, start_time_sec):
 
         # --- CHEGADA AO DESTINO ---
         if u == destination:
-            final_solutions, _ = add_solution_with_diversity(
-                final_solutions, u_sol, max_labels=15, epsilon=60
-            )
+            final_solutions.add(u_sol)
             continue
 
         # --- EXPLORAÇÃO DE VIZINHOS ---
-        for v in G.neighbors(u):
+        for e in cg.edges_from(u):
+            v = cg.target(e)
+
             # Prevenção de ciclos para evitar loops infinitos
-            if any(v == step[0] for step in u_sol.path):
+            if u_sol.visits(v):
                 continue
-                
-            edge_data = G.get_edge_data(u, v).get(0)
-            
+
             # Cálculo de custos dependentes do tempo (GTFS + Caminhada)
-            t_cost, c_cost, w_cost, info = get_edge_costs(edge_data, u_sol.arrival_sec)
+            t_cost, c_cost, w_cost, info = cg.edge_costs(e, u_sol.arrival_sec)
             
             if t_cost == float('inf'): continue
 
@@ -58,20 +68,63 @@ def dijkstra_multi_objective(G, source, destination, start_time_sec):
             v_g_walk = u_sol.total_walk_km + w_cost
             v_arrival = u_sol.arrival_sec + t_cost
 
-            new_v_sol = Solution(
-                v_g_time, v_g_co2, v_g_walk, v_arrival,
-                u_sol.path + [(v, info, v_arrival)]
-            )
+            new_v_sol = u_sol.extend(v, info, v_g_time, v_g_co2, v_g_walk, v_arrival)
 
             # --- TESTE DE DOMINÂNCIA LOCAL ---
             # Só adicionamos a 'v' se esta nova rota não for pior que as já existentes em 'v'
-            label_set[v], added = add_solution_with_diversity(
-                label_set[v], new_v_sol, max_labels=8, epsilon=60
-            )
+            if label_set[v] is None:
+                label_set[v] = ParetoArchive(max_size=8, epsilon=60)
 
-            if added:
+            if label_set[v].add(new_v_sol):
                 count += 1
                 # No Dijkstra, a prioridade é o tempo acumulado real
                 heapq.heappush(pq, (v_g_time, v_g_co2, count, v, new_v_sol))
 
-    return final_solutions
\ No newline at end of file
+    # Só os labels da fronteira final são convertidos em Solution (com os IDs originais dos nós)
+    return [label.to_solution(cg) for label in final_solutions]
+
+def dijkstra_one_to_all(G, source, start_time_sec, max_time_sec=None):
+    """
+    Dijkstra de chegada mais cedo sem destino (one-to-all), para isócronas e
+    análises de acessibilidade.
+
+    Só minimiza o tempo (um valor por nó em vez de um conjunto de labels): com
+    horários FIFO, chegar mais cedo a um nó nunca impede apanhar uma ligação,
+    pelo que basta um Dijkstra escalar dependente do tempo.
+
+    source pode ser o ID de um nó ou um dicionário {ID do nó: tempo inicial (s)}
+    para pesquisas com várias origens (por exemplo, as paragens alcançadas a pé
+    a partir de um ponto). A pesquisa pára em max_time_sec (segundos desde
+    start_time_sec), o que permite calcular vários contornos numa só pesquisa.
+
+    Retorna um array com o tempo (s) até cada nó do CompactGraph (inf se não alcançado).
+    """
+    cg = CompactGraph.as_compact(G)
+    sources = source if isinstance(source, dict) else {source: 0}
+    if max_time_sec is None:
+        max_time_sec = float('inf')
+
+    best = [float('inf')] * cg.number_of_nodes
+    pq = []
+    for node_id, initial_time in sources.items():
+        u = cg.index(node_id)
+        if initial_time < best[u] and initial_time <= max_time_sec:
+            best[u] = initial_time
+            pq.append((initial_time, u))
+    heapq.heapify(pq)
+
+    while pq:
+        t, u = heapq.heappop(pq)
+        if t > best[u]:
+            continue
+
+        for e in cg.edges_from(u):
+            t_cost = cg.edge_costs(e, start_time_sec + t)[0]
+
+            v_time = t + t_cost
+            v = cg.target(e)
+            if v_time < best[v] and v_time <= max_time_sec:
+                best[v] = v_time
+                heapq.heappush(pq, (v_time, v))
+
+    return np.array(best)
@@ -0,0 +1,357 @@
+from bisect import bisect_left
+
+from app.services.pareto import ParetoArchive
+from app.services.solution import Label
+from app.services.timetable import RaptorTimetable
+
+
+def mc_raptor(G, source, destination, start_time_sec, max_transfers=3):
+    """
+    McRAPTOR multi-objetivo (Tempo, CO2, Exercício) por rondas.
+
+    Em vez de expandir aresta a aresta, cada ronda k percorre uma única vez os
+    padrões de rota que servem as paragens melhoradas na ronda anterior,
+    embarcando na primeira viagem possível, e depois relaxa os footpaths
+    (arestas de caminhada do grafo). A ronda k corresponde a viagens com k
+    veículos, logo max_transfers limita o número de transbordos.
+
+    G pode ser um RaptorTimetable ou um GraphRoute (usa graph.raptor_timetable).
+    Os bags de cada paragem usam o mesmo ParetoArchive (com diversidade) do A*.
+    """
+    # 1. Configurações de Diversidade (iguais às do A*)
+    MAX_LABELS_PER_NODE = 10
+    TIME_WINDOW_EPSILON = 120
+
+    # 2. Inicialização
+    timetable = RaptorTimetable.as_timetable(G)
+    cg = timetable.cg
+    source = cg.index(source)
+    destination = cg.index(destination)
+
+    # bags[nó] = ParetoArchive de Labels (criado na primeira visita)
+    bags = [None] * cg.number_of_nodes
+    bags[destination] = ParetoArchive(max_size=15, epsilon=TIME_WINDOW_EPSILON)
+
+    def add_to_bag(node, label):
+        if bags[node] is None:
+            bags[node] = ParetoArchive(max_size=MAX_LABELS_PER_NODE, epsilon=TIME_WINDOW_EPSILON)
+        return bags[node].add(label)
+
+    initial_label = Label(
+        total_time=0,
+        total_co2=0.0,
+        total_walk_km=0.0,
+        arrival_sec=start_time_sec,
+        node=source,
+        trip_info='start'
+    )
+    add_to_bag(source, initial_label)
+
+    # 3. Rondas: a ronda k usa k viagens
+    run_rounds(timetable, {source: [initial_label]}, bags, add_to_bag, max_transfers)
+
+    # Só os labels do destino são convertidos em Solution (com os IDs originais dos nós)
+    return [label.to_solution(cg) for label in bags[destination]]
+
+
+def mc_raptor_one_to_all(G, source, start_time_sec, max_transfers=3):
+    """
+    McRAPTOR sem destino: as rondas continuam até não haver paragens
+    melhoradas (ou até max_transfers), em vez de parar num único destino.
+
+    Retorna a lista de bags por índice de nó do CompactGraph
+    (ParetoArchive de Labels, ou None se o nó não foi alcançado).
+    """
+    MAX_LABELS_PER_NODE = 10
+    TIME_WINDOW_EPSILON = 120
+
+    timetable = RaptorTimetable.as_timetable(G)
+    source = timetable.cg.index(source)
+
+    bags = [None] * timetable.cg.number_of_nodes
+
+    def add_to_bag(node, label):
+        if bags[node] is None:
+            bags[node] = ParetoArchive(max_size=MAX_LABELS_PER_NODE, epsilon=TIME_WINDOW_EPSILON)
+        return bags[node].add(label)
+
+    initial_label = Label(
+        total_time=0,
+        total_co2=0.0,
+        total_walk_km=0.0,
+        arrival_sec=start_time_sec,
+        node=source,
+        trip_info='start'
+    )
+    add_to_bag(source, initial_label)
+
+    run_rounds(timetable, {source: [initial_label]}, bags, add_to_bag, max_transfers)
+
+    return bags
+
+
+def profile_mc_raptor(G, source, destination, window_start_sec, window_end_sec, max_transfers=3):
+    """
+    Consulta de perfil (rRAPTOR multi-objetivo): jornadas de Pareto para todas
+    as partidas entre window_start_sec e window_end_sec, numa só passagem.
+
+    As horas de partida candidatas são as partidas das viagens nas paragens
+    alcançáveis a pé a partir da origem (descontando a caminhada). São
+    processadas da mais tardia para a mais cedo, mantendo os bags entre
+    iterações e comparando pela hora de chegada: uma jornada que parte mais
+    cedo só é guardada (e só continua a ser expandida) se chegar mais cedo,
+    emitir menos CO2 ou caminhar mais do que as que partem depois. Assim cada
+    iteração só explora o que é novo, em vez de repetir a pesquisa completa.
+
+    Os embarques (viagem, paragem) também são mantidos entre iterações: uma
+    partida mais cedo que apanha a mesma viagem com os mesmos custos não a
+    volta a percorrer (ver scan_pattern).
+
+    Retorna as Solutions ordenadas por hora de partida
+    (partida = arrival_sec - total_time = path[0][2]).
+    """
+    # Sem filtro epsilon: partidas seguidas diferem por segundos e o filtro
+    # descartaria a chegada (segundos) mais cedo que permite apanhar outra viagem
+    MAX_LABELS_PER_NODE = 10
+
+    timetable = RaptorTimetable.as_timetable(G)
+    cg = timetable.cg
+    source = cg.index(source)
+    destination = cg.index(destination)
+
+    # total_time dos labels é contado desde window_start_sec (e não desde a partida
+    # de cada iteração), para que os bags comparem horas de chegada
+    bags = [None] * cg.number_of_nodes
+    bags[destination] = ParetoArchive()
+
+    def add_to_bag(node, label):
+        if bags[node] is None:
+            bags[node] = ParetoArchive(max_size=MAX_LABELS_PER_NODE)
+        return bags[node].add(label)
+
+    # Embarques de todas as iterações (ver scan_pattern)
+    boarded = {}
+
+    solutions = []
+    for departure in get_departure_times(timetable, source, window_start_sec, window_end_sec):
+        initial_label = Label(
+            total_time=departure - window_start_sec,
+            total_co2=0.0,
+            total_walk_km=0.0,
+            arrival_sec=departure,
+            node=source,
+            trip_info='start'
+        )
+        if not add_to_bag(source, initial_label):
+            continue
+        run_rounds(timetable, {source: [initial_label]}, bags, add_to_bag, max_transfers, boarded)
+
+        # As jornadas desta partida que sobrevivem no destino são as do perfil. Tem
+        # de ser agora: as partidas mais cedo que chegam antes removem-nas do bag.
+        for label in bags[destination]:
+            if label.path[0][2] == departure:
+                sol = label.to_solution(cg)
+                sol.total_time = sol.arrival_sec - departure
+                solutions.append(sol)
+
+    solutions.sort(key=lambda s: (s.path[0][2], s.total_time))
+    return solutions
+
+
+def get_departure_times(timetable, source, window_start_sec, window_end_sec):
+    """
+    Horas de partida da origem que permitem apanhar uma viagem numa paragem
+    alcançável a pé (ou na própria origem), por ordem decrescente.
+    """
+    access = [(source, 0)] + [(v, walk_time) for v, walk_time, _ in timetable.footpaths[source]]
+
+    departures = set()
+    for stop, walk_time in access:
+        for r, i in timetable.routes_serving.get(stop, ()):
+            pattern = timetable.patterns[r]
+            if i == len(pattern.stops) - 1:
+                continue
+            for departure in pattern.departures_at[i]:
+                leave = departure - walk_time
+                if window_start_sec <= leave <= window_end_sec:
+                    departures.add(leave)
+
+    return sorted(departures, reverse=True)
+
+
+def run_rounds(timetable, marked, bags, add_to_bag, max_transfers, boarded=None):
+    """
+    Executa as rondas do McRAPTOR a partir dos labels marcados (por paragem):
+    relaxa os footpaths iniciais e, em cada ronda, percorre os padrões que
+    servem as paragens melhoradas e relaxa os footpaths das paragens alcançadas.
+    Com boarded (dict), os embarques já feitos são guardados e os dominados
+    são ignorados (ver scan_pattern).
+    """
+    relax_footpaths(timetable, marked, add_to_bag)
+
+    for _ in range(max_transfers + 1):
+        # Padrões a percorrer, entre a primeira e a última paragem marcada de cada um
+        queue = {}
+        for stop in marked:
+            for r, i in timetable.routes_serving.get(stop, ()):
+                bounds = queue.get(r)
+                if bounds is None:
+                    queue[r] = [i, i]
+                elif i < bounds[0]:
+                    bounds[0] = i
+                elif i > bounds[1]:
+                    bounds[1] = i
+
+        new_marked = {}
+        for r, (first, last) in queue.items():
+            scan_pattern(timetable.patterns[r], first, last, marked, new_marked, bags, add_to_bag, boarded)
+
+        relax_footpaths(timetable, new_marked, add_to_bag)
+
+        if not new_marked:
+            break
+        marked = new_marked
+
+
+def scan_pattern(pattern, first, last, marked, new_marked, bags, add_to_bag, boarded=None):
+    """
+    Percorre o padrão a partir da posição first e pára quando o route bag
+    fica vazio depois de last (a última paragem marcada). O route bag guarda
+    os labels em viagem ([label, viagem, posição do label, CO2 acumulado até à
+    paragem atual]); em cada paragem primeiro avançam os labels em viagem e depois
+    embarcam os labels marcados.
+
+    Os labels das paragens intermédias só são criados quando a chegada é aceite
+    pelo bag da paragem (ParetoArchive.rejects), o que evita criar um objeto
+    por paragem percorrida.
+
+    Com boarded, cada embarque (viagem, posição) guarda o CO2 e a caminhada
+    dos labels que embarcaram, e um label que embarca com CO2 maior ou igual
+    e caminhada menor ou igual é ignorado. Como total_time - arrival_sec é o
+    mesmo para todos os labels de uma pesquisa (e de um perfil, contado desde
+    o início da janela), os dois teriam as mesmas chegadas e o novo seria
+    dominado: no perfil, é o que acontece às partidas mais cedo que
+    apanham a mesma viagem que uma partida já processada.
+    """
+    stops = pattern.stops
+    arrivals = pattern.arrivals
+    segment_co2 = pattern.segment_co2
+    route_bag = []
+
+    for i in range(first, len(stops)):
+        if i > last and not route_bag:
+            break
+        p = stops[i]
+
+        # Avançar os labels em viagem até à paragem p
+        if route_bag:
+            riding = []
+            for entry in route_bag:
+                label, t, pos, co2 = entry
+                co2 += segment_co2[i - 1]
+                entry[3] = co2
+
+                # Bloqueio de ciclos: o caminho já passou por p
+                if label.visits(p):
+                    continue
+                riding.append(entry)
+
+                arrival = arrivals[t][i]
+                total_time = label.total_time + arrival - label.arrival_sec
+                bag = bags[p]
+                if bag is not None and bag.rejects(total_time, co2, label.total_walk_km):
+                    continue
+
+                # Criar os labels das paragens desde a última criada até p
+                trip_id = pattern.trip_ids[t]
+                for j in range(pos + 1, i + 1):
+                    arrival = arrivals[t][j]
+                    label = label.extend(
+                        stops[j], trip_id,
+                        label.total_time + arrival - label.arrival_sec,
+                        label.total_co2 + segment_co2[j - 1],
+                        label.total_walk_km,
+                        arrival
+                    )
+                entry[0] = label
+                entry[2] = i
+
+                if add_to_bag(p, label):
+                    new_marked.setdefault(p, []).append(label)
+                    # Continuar na viagem conta como embarque: voltar a embarcar nela em p é redundante
+                    if boarded is not None:
+                        record_boarding(boarded, (trip_id, i), label)
+            route_bag = riding
+
+        # Embarcar na primeira viagem que parte de p depois da chegada do label
+        if p in marked and i < len(stops) - 1:
+            departures = pattern.departures_at[i]
+            for label in marked[p]:
+                t = bisect_left(departures, label.arrival_sec)
+                if t < len(departures):
+                    if boarded is not None and not record_boarding(boarded, (pattern.trip_ids[t], i), label):
+                        continue
+                    merge_route_bag(route_bag, [label, t, i, label.total_co2])
+
+
+def record_boarding(boarded, key, label) -> bool:
+    """
+    Regista o embarque do label em key = (viagem, posição). Retorna False se
+    um embarque anterior na mesma viagem e posição o domina (CO2 menor ou
+    igual e caminhada maior ou igual).
+    """
+    co2, walk = label.total_co2, label.total_walk_km
+    previous = boarded.setdefault(key, [])
+    for other_co2, other_walk in previous:
+        if other_co2 <= co2 and other_walk >= walk:
+            return False
+    previous.append((co2, walk))
+    return True
+
+
+def merge_route_bag(route_bag, new_entry):
+    """
+    Junta a entrada [label, viagem, posição, CO2] ao route bag, mantendo só
+    entradas não dominadas: numa viagem mais cedo (ou a mesma) com menos ou
+    igual CO2 e mais ou igual caminhada.
+    """
+    label, trip, _, co2 = new_entry
+    walk = label.total_walk_km
+
+    for other, other_trip, _, other_co2 in route_bag:
+        if other_trip <= trip and other_co2 <= co2 and other.total_walk_km >= walk:
+            return
+
+    route_bag[:] = [
+        entry for entry in route_bag
+        if not (trip <= entry[1] and co2 <= entry[3] and walk >= entry[0].total_walk_km)
+    ]
+    route_bag.append(new_entry)
+
+
+def relax_footpaths(timetable, marked, add_to_bag):
+    """
+    Relaxa as arestas de caminhada a partir dos labels marcados nesta ronda.
+    Como no RAPTOR, os footpaths não são encadeados (um por ronda).
+    """
+    snapshot = [(stop, list(labels)) for stop, labels in marked.items()]
+
+    for stop, labels in snapshot:
+        footpaths = timetable.footpaths[stop]
+        if not footpaths:
+            continue
+
+        for label in labels:
+            for v, walk_time, walk_km in footpaths:
+                if label.visits(v):
+                    continue
+
+                walked = label.extend(
+                    v, 'transfer',
+                    label.total_time + walk_time,
+                    label.total_co2,
+                    label.total_walk_km + walk_km,
+                    label.arrival_sec + walk_time
+                )
+                if add_to_bag(v, walked):
+                    marked.setdefault(v, []).append(walked)
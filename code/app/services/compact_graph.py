@@ -0,0 +1,221 @@
+import math
+
+import numpy as np
+
+# Tipos de aresta no grafo compacto
+EDGE_WALK = 0
+EDGE_TRANSIT = 1
+
+# "Custo psicológico" de uma transferência entre paragens (ver get_edge_costs)
+TRANSFER_PENALTY_SEC = 120
+
+# As partidas são guardadas numa chave única (aresta << DEPARTURE_BITS) | partida,
+# ordenada globalmente, para que a próxima partida de qualquer aresta seja uma
+# única pesquisa binária sobre o array completo (sem criar fatias por aresta).
+# 18 bits cobrem horários GTFS até 72h.
+DEPARTURE_BITS = 18
+DEPARTURE_MASK = (1 << DEPARTURE_BITS) - 1
+
+
+class CompactGraph:
+    """
+    Grafo multimodal dependente do tempo em formato CSR (Compressed Sparse Row).
+
+    Os nós são inteiros 0..n-1 (node_ids[i] guarda o ID original) e as arestas
+    que saem do nó u são targets[offsets[u]:offsets[u+1]]. Cada aresta tem um
+    tipo (caminhada/trânsito) e:
+    - caminhada: walk_time (já com a penalização de transferência) e walk_km;
+    - trânsito: co2_cost_g (constante por aresta, como em build_graph) e as suas
+      partidas em conn_key/travel_time_sec/trip_idx, no intervalo
+      conn_offsets[e]:conn_offsets[e+1], ordenadas por partida
+      (conn_key = (e << DEPARTURE_BITS) | departure_sec).
+
+    O networkx continua a ser usado para construir o grafo e para a visualização;
+    os algoritmos de pesquisa trabalham apenas sobre estes arrays.
+    """
+
+    def __init__(self, node_ids, x, y, offsets, targets, edge_type, walk_time, walk_km,
+                 conn_offsets, conn_key, travel_time_sec, trip_idx, co2_cost_g,
+                 trip_ids, route_ids):
+        self.node_ids = node_ids
+        self.node_index = {node_id: i for i, node_id in enumerate(node_ids)}
+        self.x = x
+        self.y = y
+
+        self.offsets = offsets
+        self.targets = targets
+        self.edge_type = edge_type
+        self.walk_time = walk_time
+        self.walk_km = walk_km
+        self.co2_cost_g = co2_cost_g
+
+        self.conn_offsets = conn_offsets
+        self.conn_key = conn_key
+        self.travel_time_sec = travel_time_sec
+        self.trip_idx = trip_idx
+        self.trip_ids = trip_ids
+        self.route_ids = route_ids
+
+        # Cópias em listas Python dos arrays por nó/aresta (não por partida): o
+        # acesso escalar a listas é várias vezes mais rápido que a arrays NumPy
+        # no ciclo interno dos algoritmos.
+        self._offsets = offsets.tolist()
+        self._targets = targets.tolist()
+        self._edge_type = edge_type.tolist()
+        self._walk_time = walk_time.tolist()
+        self._walk_km = walk_km.tolist()
+        self._co2_cost_g = co2_cost_g.tolist()
+        self._conn_end = conn_offsets[1:].tolist()
+
+    @property
+    def number_of_nodes(self):
+        return len(self.node_ids)
+
+    @property
+    def number_of_edges(self):
+        return len(self.targets)
+
+    @classmethod
+    def from_networkx(cls, G):
+        """
+        Exporta um MultiDiGraph construído por GraphRoute para o formato compacto.
+        Tal como os algoritmos originais (G.get_edge_data(u, v).get(0)), só a
+        primeira aresta de cada par (u, v) é considerada.
+        """
+        node_ids = list(G.nodes)
+        node_index = {node_id: i for i, node_id in enumerate(node_ids)}
+        n = len(node_ids)
+
+        x = np.array([G.nodes[node_id]['x'] for node_id in node_ids], dtype=np.float64)
+        y = np.array([G.nodes[node_id]['y'] for node_id in node_ids], dtype=np.float64)
+
+        degree = np.zeros(n + 1, dtype=np.int64)
+        targets, edge_type, walk_time, walk_km, co2_cost_g, edge_connections = [], [], [], [], [], []
+
+        for u, adjacency in G.adj.items():
+            u_idx = node_index[u]
+            for v, keyed_data in adjacency.items():
+                data = keyed_data.get(0)
+                if data is None:
+                    continue
+
+                targets.append(node_index[v])
+                degree[u_idx + 1] += 1
+
+                if data['type'] == 'transit':
+                    connections = data['connections']
+                    edge_type.append(EDGE_TRANSIT)
+                    walk_time.append(0.0)
+                    walk_km.append(0.0)
+                    co2_cost_g.append(connections.co2_cost_g[0] if len(connections) else 0.0)
+                    edge_connections.append(connections)
+                else:
+                    penalty = TRANSFER_PENALTY_SEC if data.get('is_transfer', False) else 0
+                    edge_type.append(EDGE_WALK)
+                    walk_time.append(data['travel_time'] + penalty)
+                    walk_km.append(data.get('walk_distance_km', 0.0))
+                    co2_cost_g.append(0.0)
+                    edge_connections.append(None)
+
+        # G.adj itera os nós pela ordem de inserção, logo as arestas já estão agrupadas por origem
+        offsets = np.cumsum(degree)
+
+        conn_sizes = np.array([len(c) if c is not None else 0 for c in edge_connections], dtype=np.int64)
+        conn_offsets = np.zeros(len(edge_connections) + 1, dtype=np.int64)
+        np.cumsum(conn_sizes, out=conn_offsets[1:])
+
+        # Todas as arestas de um grafo de GraphRoute partilham a mesma tabela de viagens
+        transit = [c for c in edge_connections if c is not None]
+        trip_ids = transit[0].trip_ids if transit else np.empty(0, dtype=object)
+        route_ids = transit[0].route_ids if transit else np.empty(0, dtype=object)
+
+        def concat(attr, dtype):
+            if not transit:
+                return np.empty(0, dtype=dtype)
+            return np.concatenate([getattr(c, attr) for c in transit]).astype(dtype, copy=False)
+
+        edge_of_connection = np.repeat(np.arange(len(edge_connections), dtype=np.int64), conn_sizes)
+        conn_key = (edge_of_connection << DEPARTURE_BITS) | concat('departure_sec', np.int64)
+
+        return cls(
+            node_ids=node_ids,
+            x=x,
+            y=y,
+            offsets=offsets,
+            targets=np.array(targets, dtype=np.int32),
+            edge_type=np.array(edge_type, dtype=np.int8),
+            walk_time=np.array(walk_time, dtype=np.float64),
+            walk_km=np.array(walk_km, dtype=np.float64),
+            conn_offsets=conn_offsets,
+            conn_key=conn_key,
+            travel_time_sec=concat('travel_time_sec', np.int32),
+            trip_idx=concat('trip_idx', np.int32),
+            co2_cost_g=np.array(co2_cost_g, dtype=np.float64),
+            trip_ids=trip_ids,
+            route_ids=route_ids,
+        )
+
+    @classmethod
+    def as_compact(cls, G):
+        """Devolve G se já for compacto; caso contrário exporta-o a partir do networkx."""
+        if isinstance(G, cls):
+            return G
+
+        import networkx as nx
+        if isinstance(G, nx.Graph):
+            return cls.from_networkx(G)
+        raise TypeError(f"Grafo não suportado: {type(G).__name__}")
+
+    def index(self, node_id) -> int:
+        return self.node_index[node_id]
+
+    def edges_from(self, u: int) -> range:
+        """Índices das arestas que saem do nó u."""
+        return range(self._offsets[u], self._offsets[u + 1])
+
+    def target(self, e: int) -> int:
+        """Nó de chegada da aresta e."""
+        return self._targets[e]
+
+    def find_edge(self, u: int, v: int) -> int:
+        """Índice da aresta u -> v, ou -1 se não existir."""
+        for e in self.edges_from(u):
+            if self._targets[e] == v:
+                return e
+        return -1
+
+    def edge_costs(self, e: int, current_time_sec):
+        """
+        Equivalente a get_edge_costs para a aresta e do grafo compacto.
+        Retorna (time_cost, co2_cost, walk_km, trip_info).
+        """
+        if self._edge_type[e] == EDGE_WALK:
+            return self._walk_time[e], 0.0, self._walk_km[e], 'transfer'
+
+        # Primeira partida >= current_time_sec; se passar para a aresta seguinte, não há partidas
+        i = int(self.conn_key.searchsorted((e << DEPARTURE_BITS) + math.ceil(current_time_sec)))
+        if i == self._conn_end[e]:
+            return float('inf'), float('inf'), 0.0, 'unavailable'
+
+        travel_time = self.travel_time_sec.item(i)
+        total_time = (self.conn_key.item(i) & DEPARTURE_MASK) - current_time_sec + travel_time
+        trip_id = self.trip_ids[self.trip_idx.item(i)]
+
+        return total_time, self._co2_cost_g[e], 0.0, trip_id
+
+    def departures(self, e: int) -> np.ndarray:
+        """Horas de partida (segundos) da aresta de trânsito e, ordenadas."""
+        return self.conn_key[self.conn_offsets.item(e):self.conn_offsets.item(e + 1)] & DEPARTURE_MASK
+
+    def to_node_path(self, path):
+        """Converte um caminho [(índice, info, chegada), ...] para os IDs originais dos nós."""
+        return [(self.node_ids[u], info, arrival) for u, info, arrival in path]
+
+    def nbytes(self) -> int:
+        """Memória ocupada pelos arrays do grafo (sem a tabela de IDs nem as listas auxiliares)."""
+        arrays = [
+            self.x, self.y, self.offsets, self.targets, self.edge_type, self.walk_time,
+            self.walk_km, self.conn_offsets, self.conn_key, self.travel_time_sec,
+            self.trip_idx, self.co2_cost_g,
+        ]
+        return sum(a.nbytes for a in arrays)
@@ -1,14 +1,52 @@
+import os
 import math
-import networkx as nx
-import osmnx as ox
+import logging
+import time
+import pickle
+from functools import cached_property
+import numpy as np
 
-from scipy.spatial import cKDTree
-from shapely.geometry import Point
+from app.utils.time import times_to_seconds
+from app.utils.route import Connections
+from app.utils.geo import get_geocode_by_address, get_m_distance, haversine_m, get_m_distances_one_to_many
+from app.utils.feed import FEED_REGISTRY, get_filtered_multimodal_feed, get_multimodal_feed, get_stop_times_index
+from app.utils.street import StreetGraphStore, STREET_GRAPH_PATH
+from app.services.compact_graph import CompactGraph
+from app.services.timetable import RaptorTimetable, ConnectionTimetable
+from app.services.transfers import (
+    compute_transfer_table, transfer_cache_key, load_transfer_table, save_transfer_table, subset_transfer_table,
+)
 
-from app.utils.co2 import get_co2
-from app.utils.time import time_to_seconds
-from app.utils.geo import get_geocode_by_address, get_m_distance, get_km_distance
-from app.utils.feed import get_filtered_multimodal_feed
+module_path = os.path.abspath(os.path.join('..'))
+
+logger = logging.getLogger(__name__)
+
+SOURCE_NODE_ID = "USER_START"
+DESTINATION_NODE_ID = "USER_END"
+
+# Versão do formato do snapshot. Incrementar sempre que a estrutura do grafo
+# (atributos dos nós/arestas) mudar, para invalidar snapshots antigos.
+SNAPSHOT_VERSION = 4
+SNAPSHOT_PATH = f"{module_path}/cache/multimodal_graph_v{SNAPSHOT_VERSION}.pkl"
+
+# Margem (m) do corredor recortado da rede pedonal local: a margem do feed
+# filtrado (1 km) mais as caminhadas de acesso e transferência
+STREET_CORRIDOR_BUFFER_M = 1500
+
+# Com um corredor (GraphRoute(corridor=...)), a rede pedonal usa o mesmo
+# corredor do feed alargado por esta margem (km)
+STREET_CORRIDOR_MARGIN_KM = 0.5
+
+# Duração máxima de uma viagem no horizonte temporal de uma consulta
+# (GraphRoute(start_time_sec=...)): os stop_times fora de
+# [start_time_sec, start_time_sec + MAX_JOURNEY_SEC] não entram no grafo
+MAX_JOURNEY_SEC = 3 * 3600
+
+# Tabelas de transferências entre paragens (ver add_osmnx_transfer_edges)
+TRANSFERS_CACHE_DIR = f"{module_path}/cache"
+
+# Snapshots já carregados neste processo (caminho -> conteúdo)
+_LOADED_SNAPSHOTS = {}
 
 
 class GraphRoute:
@@ -17,86 +55,338 @@ class GraphRoute:
         self,
         origem: str,
         destino: str,
+        snapshot_path: str = None,
+        street_graph_path: str = None,
+        service_date=None,
+        start_time_sec=None,
+        max_journey_sec=MAX_JOURNEY_SEC,
+        corridor=None,
     ):
+        if snapshot_path is not None:
+            # O snapshot é o grafo de toda a cidade e de todo o dia de serviço:
+            # estas opções só se aplicam a grafos construídos para a consulta
+            ignored = [
+                name for name, value, default in [
+                    ('street_graph_path', street_graph_path, None),
+                    ('service_date', service_date, None),
+                    ('start_time_sec', start_time_sec, None),
+                    ('max_journey_sec', max_journey_sec, MAX_JOURNEY_SEC),
+                    ('corridor', corridor, None),
+                ]
+                if value != default
+            ]
+            if ignored:
+                raise ValueError(f"snapshot_path não pode ser combinado com {', '.join(ignored)}.")
+
         self.origem=origem
         self.destino=destino
         self.geo_origem=get_geocode_by_address(origem)
         self.geo_destino=get_geocode_by_address(destino)
-        self.gtfs_feed=get_filtered_multimodal_feed(self.geo_origem, self.geo_destino)
 
-        self.build_street_graph()
-        self.build_graph()
+        # Região da consulta: corridor(origem, destino) -> Corridor, por exemplo
+        # EllipseCorridor ou LineCorridor (None: retângulo origem-destino)
+        self.corridor = corridor(self.geo_origem, self.geo_destino) if corridor is not None else None
+
+        if snapshot_path is not None:
+            # Grafo da cidade pré-construído (todos os dias e horas de serviço):
+            # só falta ligar a origem e o destino
+            self.load_snapshot(snapshot_path)
+        else:
+            time_window = (start_time_sec, start_time_sec + max_journey_sec) if start_time_sec is not None else None
+            self.gtfs_feed=get_filtered_multimodal_feed(
+                self.geo_origem, self.geo_destino, service_date=service_date, time_window=time_window,
+                corridor=self.corridor,
+            )
+
+            self.build_street_graph(street_graph_path=street_graph_path)
+            self.build_graph(time_window=time_window)
+            logger.info(
+                "Grafo de trânsito: %d paragens, %d arestas, %d ligações.",
+                self.G.number_of_nodes(), self.G.number_of_edges(), len(self.segments),
+            )
+            self.add_osmnx_transfer_edges()
+
         self.add_user_points_to_graph()
-        self.add_osmnx_transfer_edges()
 
-    def build_graph(self):
+    @cached_property
+    def compact_graph(self) -> CompactGraph:
+        """
+        Exportação CSR de self.G usada pelos algoritmos de pesquisa.
+        É calculada no primeiro acesso, depois de o grafo estar completo.
+        """
+        return CompactGraph.from_networkx(self.G)
+
+    @cached_property
+    def raptor_timetable(self) -> RaptorTimetable:
+        """Padrões de rota e footpaths usados pelo McRAPTOR (sobre o mesmo grafo compacto)."""
+        return RaptorTimetable.from_graph_route(self)
+
+    @cached_property
+    def connection_timetable(self) -> ConnectionTimetable:
+        """Ligações elementares ordenadas por partida usadas pelo CSA."""
+        return ConnectionTimetable.from_graph_route(self)
+
+    @classmethod
+    def build_snapshot(cls, path: str = SNAPSHOT_PATH, buffer_km: float = 1.0):
+        """
+        Constrói o grafo multimodal completo (Metro + STCP) de toda a área
+        metropolitana, sem origem/destino, e guarda-o em disco.
+
+        Inclui as arestas de trânsito, as arestas de transferência e o
+        mapeamento paragem -> nó OSM. As consultas seguintes usam
+        GraphRoute(origem, destino, snapshot_path=path).
+        """
+        city = cls.__new__(cls)
+        city.origem = None
+        city.destino = None
+        city.gtfs_feed = get_multimodal_feed()
+
+        stops = city.gtfs_feed.stops
+        buffer_deg = buffer_km / 111.0
+        bbox = (
+            stops['stop_lon'].min() - buffer_deg,
+            stops['stop_lat'].min() - buffer_deg,
+            stops['stop_lon'].max() + buffer_deg,
+            stops['stop_lat'].max() + buffer_deg,
+        )
+
+        city.build_street_graph(bbox=bbox)
+        city.build_graph()
+        city.add_osmnx_transfer_edges()
+        city.save_snapshot(path)
+
+        return city
+
+    def save_snapshot(self, path: str = SNAPSHOT_PATH):
+        """Guarda o grafo (sem os pontos do utilizador) num snapshot versionado."""
+        G = self.G.copy()
+        G.remove_nodes_from([SOURCE_NODE_ID, DESTINATION_NODE_ID])
+
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'created_at': time.time(),
+            'G': G,
+            'G_walk': self.G_walk,
+            'stops_df': self.stops_df,
+            'gtfs_feed': self.gtfs_feed,
+            'segments': self.segments,
+        }
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        logger.info("Snapshot guardado em %s: %d nós, %d arestas.", path, G.number_of_nodes(), G.number_of_edges())
+
+    def load_snapshot(self, path: str = SNAPSHOT_PATH):
+        """
+        Carrega um snapshot do grafo da cidade. O ficheiro só é lido uma vez por
+        processo; cada consulta trabalha sobre uma cópia do grafo multimodal
+        para que os pontos do utilizador não se acumulem entre consultas.
+        """
+        snapshot = _LOADED_SNAPSHOTS.get(path)
+        if snapshot is None:
+            with open(path, 'rb') as f:
+                snapshot = pickle.load(f)
+
+            if snapshot.get('version') != SNAPSHOT_VERSION:
+                raise ValueError(
+                    f"Snapshot {path} tem versão {snapshot.get('version')}, "
+                    f"esperada {SNAPSHOT_VERSION}. Reconstrua com GraphRoute.build_snapshot()."
+                )
+            _LOADED_SNAPSHOTS[path] = snapshot
+
+        self.gtfs_feed = snapshot['gtfs_feed']
+        self.G_walk = snapshot['G_walk']
+        self.stops_df = snapshot['stops_df']
+        self.segments = snapshot['segments']
+        self.G = snapshot['G'].copy()
+        self.time_window = None
+
+    def build_graph(self, time_window=None):
+        """
+        Constrói o grafo de trânsito do feed. Com time_window (início, fim) em
+        segundos, só os stop_times desse horizonte geram ligações (ver build_stop_times).
+        """
+        import networkx as nx
+        import pandas as pd
+
         metadata = {
             "crs": "epsg:4326",
         }
 
         G_transport = nx.MultiDiGraph(**metadata)
-        for _, row in self.gtfs_feed.stops.iterrows():
-            G_transport.add_node(
-                row['stop_id'], 
-                y=row['stop_lat'],
-                x=row['stop_lon'],
-                name=row['stop_name'],
-                modo=row['stop_id'].split("_")[0],
+
+        # Operador de cada paragem pelo código inteiro (ver FEED_REGISTRY), sem
+        # separar o prefixo do stop_id
+        stops = self.gtfs_feed.stops
+        operators = stops['operator'].to_numpy()
+        G_transport.add_nodes_from(
+            (stop_id, {'y': lat, 'x': lon, 'name': name, 'modo': modo, 'operator': operator})
+            for stop_id, lat, lon, name, modo, operator in zip(
+                stops['stop_id'], stops['stop_lat'], stops['stop_lon'],
+                stops['stop_name'], FEED_REGISTRY.prefixes()[operators], operators.tolist(),
             )
+        )
 
-        st = self.gtfs_feed.stop_times[['trip_id', 'arrival_time', 'departure_time', 'stop_id', 'stop_sequence']]
-        st = st.merge(self.gtfs_feed.trips[['trip_id', 'route_id']], on='trip_id')
+        segments = self.build_segments(time_window)
+        # Guardados para o CSA (ConnectionTimetable) e o McRAPTOR (RaptorTimetable)
+        self.segments = segments
+        self.time_window = time_window
+
+        # Ordenar uma única vez por aresta (u, v) e hora de partida, e obter os
+        # limites de cada aresta no array ordenado em vez de um groupby por aresta.
+        u_codes, u_ids = pd.factorize(segments['stop_id'])
+        v_codes, v_ids = pd.factorize(segments['next_stop_id'])
+        departure = segments['departure_sec'].to_numpy()
+        order = np.lexsort((departure, v_codes, u_codes))
+
+        # Tabela de viagens partilhada por todas as arestas (trip_idx -> trip_id/route_id)
+        trip_codes, trip_ids = pd.factorize(segments['trip_id'])
+        trip_ids = np.asarray(trip_ids, dtype=object)
+        trip_route_ids = np.empty(len(trip_ids), dtype=object)
+        trip_route_ids[trip_codes] = segments['route_id'].to_numpy()
+
+        u_codes, v_codes = u_codes[order], v_codes[order]
+        departure = departure[order].astype(np.int32)
+        travel_time = segments['travel_time_sec'].to_numpy()[order].astype(np.int32)
+        trip_codes = trip_codes[order].astype(np.int32)
+
+        is_start = np.ones(len(order), dtype=bool)
+        is_start[1:] = (u_codes[1:] != u_codes[:-1]) | (v_codes[1:] != v_codes[:-1])
+        starts = np.flatnonzero(is_start)
+        ends = np.append(starts[1:], len(order))
+        avg_travel_time = np.add.reduceat(travel_time, starts) / (ends - starts) if len(starts) else []
+
+        # --- Cálculo de Distância e CO2 (Propriedades do Segmento), para todas as arestas de uma vez ---
+        edge_u = u_ids[u_codes[starts]]
+        edge_v = v_ids[v_codes[starts]]
+        stops_by_id = stops.set_index('stop_id')
+        coords = stops_by_id[['stop_lat', 'stop_lon']]
+        coords_u = coords.loc[edge_u].to_numpy()
+        coords_v = coords.loc[edge_v].to_numpy()
+        edge_distance_m = haversine_m(coords_u[:, 0], coords_u[:, 1], coords_v[:, 0], coords_v[:, 1])
+        edge_co2_g = (edge_distance_m / 1000) * FEED_REGISTRY.co2_gpkm()[stops_by_id['operator'].loc[edge_u].to_numpy()]
+
+        edges = []
+        for k, (i, j) in enumerate(zip(starts, ends)):
+            u, v = edge_u[k], edge_v[k]
+            distance_m = float(edge_distance_m[k])
+            co2_cost_g = float(edge_co2_g[k])
+
+            # Arrays paralelos ordenados por partida (cópias, para não reter os arrays globais)
+            connections = Connections(
+                departure_sec=departure[i:j].copy(),
+                travel_time_sec=travel_time[i:j].copy(),
+                trip_idx=trip_codes[i:j].copy(),
+                co2_cost_g=np.full(j - i, co2_cost_g),
+                distance_m=distance_m,
+                trip_ids=trip_ids,
+                route_ids=trip_route_ids,
+            )
 
-        st['arrival_sec'] = st['arrival_time'].apply(time_to_seconds)
-        st['departure_sec'] = st['departure_time'].apply(time_to_seconds)
+            edges.append((u, v, {
+                'type': 'transit',
+                'connections': connections,
+                'avg_travel_time': avg_travel_time[k],
+            }))
 
-        st = st.sort_values(['trip_id', 'stop_sequence'])
+        # Adiciona as arestas ao grafo
+        G_transport.add_edges_from(edges)
 
-        segments = st.copy()
-        segments['next_stop_id'] = segments.groupby('trip_id')['stop_id'].shift(-1)
-        segments['next_arrival_sec'] = segments.groupby('trip_id')['arrival_sec'].shift(-1)
-        segments['next_stop_sequence'] = segments.groupby('trip_id')['stop_sequence'].shift(-1)
+        self.G = G_transport
 
-        segments = segments.dropna(subset=['next_stop_id'])
-        segments['travel_time_sec'] = segments['next_arrival_sec'] - segments['departure_sec']
-        segments = segments[segments['travel_time_sec'] >= 0]
+    def build_stop_times(self, time_window=None):
+        """
+        stop_times do feed com o route_id de cada viagem e as horas já em
+        segundos (arrival_sec, departure_sec), ordenados por viagem e sequência.
+        As horas só são convertidas se o feed não as trouxer da cache (read_feed_cached).
 
-        for (u, v), group in segments.groupby(['stop_id', 'next_stop_id']):
+        Com time_window (início, fim), as linhas fora do horizonte são cortadas
+        por pesquisa binária no índice temporal do feed (get_stop_times_index).
+        """
+        stop_times = self.gtfs_feed.stop_times
+        if time_window is not None:
+            stop_times = stop_times.iloc[get_stop_times_index(self.gtfs_feed).rows_between(*time_window)]
+        has_seconds = 'arrival_sec' in stop_times.columns and 'departure_sec' in stop_times.columns
 
-            # --- Cálculo de Distância e CO2 (Propriedades do Segmento) ---
-            data_u, data_v = G_transport.nodes[u], G_transport.nodes[v]
-            distance_m = get_m_distance(
-                Point(data_u['x'], data_u['y']),
-                Point(data_v['x'], data_v['y'])
-            )
+        columns = ['trip_id', 'trip_code', 'arrival_time', 'departure_time', 'stop_id', 'stop_sequence']
+        if has_seconds:
+            columns += ['arrival_sec', 'departure_sec']
 
-            group.sort_values(by="departure_sec", ascending=True, inplace=True)
+        # Junção e ordenação pelo código inteiro da viagem (ver intern_feed_ids)
+        st = stop_times[columns]
+        st = st.merge(self.gtfs_feed.trips[['trip_code', 'route_id']], on='trip_code')
+        st = st.sort_values(['trip_code', 'stop_sequence'], kind='stable').reset_index(drop=True)
 
-            connections = []
-            for _, row in group.iterrows():
-                co2_cost_g = (distance_m/1000) * get_co2(row['stop_id'].split("_")[0])
+        if not has_seconds:
+            st['arrival_sec'] = times_to_seconds(st['arrival_time'])
+            st['departure_sec'] = times_to_seconds(st['departure_time'])
 
-                connections.append({
-                    'departure_sec': row['departure_sec'], 
-                    'travel_time_sec': row['travel_time_sec'],
-                    'trip_id': row['trip_id'],
-                    'route_id': row['route_id'],
-                    'co2_cost_g': co2_cost_g,
-                    'distance_m': distance_m
-                })
+        return st
 
-            # Adiciona a aresta ao grafo
-            G_transport.add_edge(u, v, 
-                        type='transit', 
-                        connections=connections,
-                        avg_travel_time=group['travel_time_sec'].mean())
+    def build_segments(self, time_window=None):
+        """
+        Calcula os segmentos elementares (paragem -> paragem seguinte da mesma viagem)
+        de forma vetorizada, sem groupby/shift por viagem.
+        """
+        import pandas as pd
 
-        self.G = G_transport
+        st = self.build_stop_times(time_window)
+
+        trip_id = st['trip_id'].to_numpy()
+        trip_code = st['trip_code'].to_numpy()
+        stop_id = st['stop_id'].to_numpy()
+        arrival_sec = st['arrival_sec'].to_numpy()
+        departure_sec = st['departure_sec'].to_numpy()
+
+        # Índices das linhas seguidas de outra paragem da mesma viagem
+        idx = np.flatnonzero(trip_code[:-1] == trip_code[1:])
 
-    def build_street_graph(self):
-        dist_m = get_m_distance(self.geo_origem, self.geo_destino)
+        segments = pd.DataFrame({
+            'trip_id': trip_id[idx],
+            'route_id': st['route_id'].to_numpy()[idx],
+            'stop_id': stop_id[idx],
+            'next_stop_id': stop_id[idx + 1],
+            'departure_sec': departure_sec[idx],
+            'travel_time_sec': arrival_sec[idx + 1] - departure_sec[idx],
+        })
+
+        return segments[segments['travel_time_sec'] >= 0].reset_index(drop=True)
+
+    def build_street_graph(self, bbox=None, street_graph_path: str = None):
+        """
+        Obtém a rede pedonal. Se existir uma rede local (street_graph_path, por
+        omissão STREET_GRAPH_PATH; ver StreetGraphStore), recorta dela o
+        corredor origem-destino (o da consulta, alargado por
+        STREET_CORRIDOR_MARGIN_KM, ou a bbox indicada) sem usar a rede.
+
+        Caso contrário descarrega-a: por omissão num raio igual à distância
+        origem-destino; com bbox (oeste, sul, este, norte) descarrega a área indicada.
+        """
+        path = street_graph_path or STREET_GRAPH_PATH
+        # Rede local de onde foi recortada G_walk (chave da tabela de transferências)
+        self.street_graph_path = None
+        if os.path.exists(path):
+            store = StreetGraphStore.load(path)
+            self.street_graph_path = path
+            corridor = getattr(self, 'corridor', None)
+            if bbox is not None:
+                self.G_walk = store.clip(bbox)
+            elif corridor is not None:
+                self.G_walk = store.clip_region(corridor.grow(STREET_CORRIDOR_MARGIN_KM))
+            else:
+                self.G_walk = store.clip_corridor(self.geo_origem, self.geo_destino, buffer_m=STREET_CORRIDOR_BUFFER_M)
+            return
+
+        import osmnx as ox
+
+        if bbox is not None:
+            G_walk=ox.graph_from_bbox(bbox, network_type="walk")
+        else:
+            dist_m = get_m_distance(self.geo_origem, self.geo_destino)
+            G_walk=ox.graph_from_point((self.geo_origem.y, self.geo_origem.x), dist=dist_m,  network_type="walk")
 
-        G_walk=ox.graph_from_point((self.geo_origem.y, self.geo_origem.x), dist=dist_m,  network_type="walk")
         G_walk=ox.add_edge_speeds(G_walk)
         G_walk=ox.add_edge_travel_times(G_walk)
 
@@ -105,208 +395,328 @@ class GraphRoute:
     def add_user_points_to_graph(self, max_walk_meters: int = 1000):
         """
         Adiciona nós arbitrários (Origem e Destino do Utilizador) ao grafo e liga-os
-        por arestas de caminhada às paragens GTFS mais próximas.
+        por arestas de caminhada às paragens GTFS a menos de max_walk_meters.
+
+        Com a rede pedonal (G_walk), a distância é a distância real pelas ruas,
+        obtida com uma única pesquisa Dijkstra limitada a max_walk_meters a
+        partir do nó OSM de cada ponto (ver get_street_distances_m). Sem G_walk,
+        usa a distância em linha reta.
         """
+        import osmnx as ox
+        from scipy.spatial import cKDTree
+
         WALK_SPEED_KPH = 5.0
-        SOURCE_NODE_ID = "USER_START"
-        DESTINATION_NODE_ID = "USER_END"
-
-        # Certifique-se de que os nós não existem antes de adicionar
-        self.G.add_node(
-            SOURCE_NODE_ID,
-            y=self.geo_origem.y,
-            x=self.geo_origem.x,
-            name="Ponto de Partida",
-            osmnx_node=ox.nearest_nodes(self.G_walk, self.geo_origem.x, self.geo_origem.y),
-        )
-        self.G.add_node(
-            DESTINATION_NODE_ID,
-            y=self.geo_destino.y,
-            x=self.geo_destino.x,
-            name="Ponto de Chegada",
-            osmnx_node=ox.nearest_nodes(self.G_walk, self.geo_destino.x, self.geo_destino.y),
-        )
 
         user_points = [
-            (SOURCE_NODE_ID, (self.geo_origem.y, self.geo_origem.x)),
-            (DESTINATION_NODE_ID, (self.geo_destino.y, self.geo_destino.x))
+            (SOURCE_NODE_ID, (self.geo_origem.y, self.geo_origem.x), "Ponto de Partida"),
+            (DESTINATION_NODE_ID, (self.geo_destino.y, self.geo_destino.x), "Ponto de Chegada"),
         ]
 
-        # 2. Ligar cada ponto do utilizador às paragens mais próximas
-        for user_id, user_coords in user_points:
-            user_lat, user_lon = user_coords
-
-            # Iterar apenas sobre os nós de paragem GTFS
-            for stop_id, data in self.G.nodes(data=True):
-                if stop_id in [SOURCE_NODE_ID, DESTINATION_NODE_ID]:
-                    continue
-
-                stop_lat, stop_lon = data['y'], data['x']
-
-                distance_m = get_m_distance(Point(user_lon, user_lat), Point(stop_lon, stop_lat))
-
-                if distance_m <= max_walk_meters:
-                    walk_time_sec = math.ceil((distance_m / 1000) / WALK_SPEED_KPH * 3600)
-
-                    # Para a Origem (SOURCE_NODE_ID -> Paragem): Permite acesso ao sistema
-                    if user_id == SOURCE_NODE_ID:
-                        self.G.add_edge(user_id, stop_id, 
-                                type='walk', 
-                                travel_time=walk_time_sec, 
-                                distance_km=(distance_m / 1000),
-                                co2_cost_g=0,
-                                # Atributo para rastrear o exercício
-                                walk_distance_km=(distance_m / 1000)) 
-
-                    # Para o Destino (Paragem -> DESTINATION_NODE_ID): Permite sair do sistema
-                    elif user_id == DESTINATION_NODE_ID:
-                        self.G.add_edge(stop_id, user_id, 
-                                type='walk', 
-                                travel_time=walk_time_sec, 
-                                distance_km=(distance_m / 1000),
-                                co2_cost_g=0,
-                                # Atributo para rastrear o exercício
-                                walk_distance_km=(distance_m / 1000))
+        # 1. Iterar apenas sobre os nós de paragem GTFS (cKDTree para o pré-filtro)
+        stop_ids = [n for n in self.G.nodes if n not in [SOURCE_NODE_ID, DESTINATION_NODE_ID]]
+        stop_lats = np.array([self.G.nodes[n]['y'] for n in stop_ids])
+        stop_lons = np.array([self.G.nodes[n]['x'] for n in stop_ids])
+        tree = cKDTree(np.column_stack([stop_lats, stop_lons]))
+
+        for user_id, (user_lat, user_lon), name in user_points:
+            user_osm = ox.nearest_nodes(self.G_walk, user_lon, user_lat) if self.G_walk is not None else None
+
+            # Certifique-se de que os nós não existem antes de adicionar
+            self.G.add_node(user_id, y=user_lat, x=user_lon, name=name, osmnx_node=user_osm)
+
+            # 2. Pré-filtro: paragens a menos de max_walk_meters em linha reta (um minorante
+            # da distância pelas ruas). O raio em graus usa o grau de longitude, o mais curto.
+            radius_deg = max_walk_meters / (111000.0 * math.cos(math.radians(user_lat)))
+            candidates = tree.query_ball_point((user_lat, user_lon), radius_deg)
+            if not candidates:
+                continue
+
+            distances_m = get_m_distances_one_to_many(user_lat, user_lon, stop_lats[candidates], stop_lons[candidates])
+            candidates = [stop_ids[k] for k, d in zip(candidates, distances_m.tolist()) if d <= max_walk_meters]
+
+            # 3. Distância a cada paragem: pelas ruas ou, sem rede pedonal, em linha reta
+            if user_osm is not None:
+                distances = self.get_street_distances_m(
+                    user_lat, user_lon, user_osm, candidates, max_walk_meters,
+                    reverse=(user_id == DESTINATION_NODE_ID)
+                )
+            else:
+                distances = {
+                    stop_id: float(d) for stop_id, d in zip(candidates, get_m_distances_one_to_many(
+                        user_lat, user_lon,
+                        [self.G.nodes[n]['y'] for n in candidates], [self.G.nodes[n]['x'] for n in candidates]
+                    ))
+                }
+
+            for stop_id, distance_m in distances.items():
+                walk_time_sec = math.ceil((distance_m / 1000) / WALK_SPEED_KPH * 3600)
+
+                # Para a Origem (SOURCE_NODE_ID -> Paragem): Permite acesso ao sistema
+                if user_id == SOURCE_NODE_ID:
+                    self.G.add_edge(user_id, stop_id, 
+                            type='walk', 
+                            travel_time=walk_time_sec, 
+                            distance_km=(distance_m / 1000),
+                            co2_cost_g=0,
+                            # Atributo para rastrear o exercício
+                            walk_distance_km=(distance_m / 1000)) 
+
+                # Para o Destino (Paragem -> DESTINATION_NODE_ID): Permite sair do sistema
+                elif user_id == DESTINATION_NODE_ID:
+                    self.G.add_edge(stop_id, user_id, 
+                            type='walk', 
+                            travel_time=walk_time_sec, 
+                            distance_km=(distance_m / 1000),
+                            co2_cost_g=0,
+                            # Atributo para rastrear o exercício
+                            walk_distance_km=(distance_m / 1000))
 
         self.origem_node_id = SOURCE_NODE_ID
         self.destino_node_id = DESTINATION_NODE_ID
 
-    def add_osmnx_transfer_edges(self, max_dist_m=250, walk_speed_ms=1.1):
+    def get_street_distances_m(self, lat, lon, osm_node, stop_ids, max_walk_meters, reverse=False):
+        """
+        Distâncias a pé (m) pela rede de ruas entre um ponto e as paragens
+        indicadas, com uma única pesquisa Dijkstra limitada a max_walk_meters a
+        partir do nó OSM do ponto. Com reverse=True, mede o caminho das paragens
+        para o ponto (pesquisa no grafo invertido, para a saída no destino).
+
+        A distância inclui os troços em linha reta entre o ponto/paragem e o
+        respetivo nó OSM. Paragens fora do alcance não são devolvidas.
+        """
+        import networkx as nx
+
+        if not stop_ids:
+            return {}
+
+        G_walk = self.G_walk.reverse(copy=False) if reverse else self.G_walk
+        lengths = nx.single_source_dijkstra_path_length(G_walk, osm_node, cutoff=max_walk_meters, weight='length')
+
+        # Nó OSM de cada paragem (já calculado em add_osmnx_transfer_edges, se existir)
+        stops_df = getattr(self, 'stops_df', None)
+        if stops_df is not None and 'osmnx_node' in stops_df.columns and stops_df.index.intersection(stop_ids).size == len(stop_ids):
+            stop_osm = stops_df.loc[stop_ids, 'osmnx_node'].tolist()
+        else:
+            import osmnx as ox
+            stop_osm = ox.nearest_nodes(
+                self.G_walk, [self.G.nodes[n]['x'] for n in stop_ids], [self.G.nodes[n]['y'] for n in stop_ids]
+            )
+
+        node = self.G_walk.nodes[osm_node]
+        point_snap_m = haversine_m(lat, lon, node['y'], node['x'])
+
+        distances = {}
+        for stop_id, stop_node in zip(stop_ids, stop_osm):
+            street_m = lengths.get(stop_node)
+            if street_m is None:
+                continue
+
+            stop, snapped = self.G.nodes[stop_id], self.G_walk.nodes[stop_node]
+            distance_m = float(point_snap_m + street_m + haversine_m(stop['y'], stop['x'], snapped['y'], snapped['x']))
+            if distance_m <= max_walk_meters:
+                distances[stop_id] = distance_m
+
+        return distances
+
+    def add_osmnx_transfer_edges(self, max_dist_m=250, walk_speed_ms=1.1, processes=None, use_cache=True):
         """
         Cria arestas de transferência intermodal usando distâncias reais de ruas (OSMnx).
 
         Args:
             max_dist_m: Distância máxima de caminhada permitida em metros.
             walk_speed_ms: Velocidade média de caminhada (1.1 m/s ~ 4 km/h).
+            processes: Processos usados no cálculo das distâncias (None = automático,
+                ver compute_transfer_table).
+            use_cache: Com uma rede pedonal local, usa a tabela completa de
+                transferências (todas as paragens dos operadores registados sobre
+                toda a rede local, calculada uma vez e guardada em cache) e fica
+                só com as paragens do corredor. Sem rede local, a tabela é
+                calculada para o corredor e não é guardada.
         """
+        import osmnx as ox
+
         # 1. Preparar dados para a cKDTree (Busca rápida de vizinhança)
         # Filtramos apenas paragens que foram mapeadas com sucesso para a rede OSM
         stops_df = self.gtfs_feed.stops
         stops_df['osmnx_node'] = ox.nearest_nodes(self.G_walk, stops_df['stop_lon'], stops_df['stop_lat'])
         stops_df = stops_df.set_index('stop_id')
 
-        self.stops_df = stops_df.copy()
+        self.stops_df = stops_df
+
+        transfers = None
+        street_graph_path = getattr(self, 'street_graph_path', None)
+        if use_cache and street_graph_path is not None:
+            city_transfers = get_city_transfer_table(street_graph_path, max_dist_m, processes)
+            if city_transfers is not None:
+                transfers = subset_transfer_table(city_transfers, stops_df.index)
+
+        if transfers is None:
+            transfers = self.build_transfer_table(self.G_walk, stops_df, max_dist_m, processes)
+
+        # 2. Adicionar arestas bidirecionais ao grafo multimodal
+        for u, v, real_dist in transfers.itertuples(index=False):
+            # Tempo de caminhada + Penalização fixa (3 min) para transbordo
+            walk_time_sec = (real_dist / walk_speed_ms) + 180
+
+            edge_params = {
+                'type': 'walk',
+                'travel_time': walk_time_sec,
+                'distance_km': real_dist / 1000.0,
+                'co2_cost_g': 0.0,
+                'is_transfer': True
+            }
+
+            self.G.add_edge(u, v, **edge_params)
+            self.G.add_edge(v, u, **edge_params)
+
+    @staticmethod
+    def build_transfer_table(G_walk, stops_df, max_dist_m=250, processes=None):
+        """
+        Tabela (from_stop, to_stop, distance_m) das transferências entre redes
+        diferentes a menos de max_dist_m pela rede de ruas G_walk.
+        """
+        from scipy.spatial import cKDTree
+
 
         valid_stops = stops_df.dropna(subset=['osmnx_node', 'stop_lat', 'stop_lon'])
         node_coords = valid_stops[['stop_lat', 'stop_lon']].values
         node_ids = valid_stops.index.tolist()
+        operators = valid_stops['operator'].to_numpy()
         osm_mapping = valid_stops['osmnx_node'].to_dict()
 
         tree = cKDTree(node_coords)
         
         # Raio aproximado em graus para a busca inicial (mais eficiente que calcular tudo)
         radius_deg = (max_dist_m + 100) / 111000.0 
-        pairs = tree.query_pairs(radius_deg)
+        pairs = tree.query_pairs(radius_deg, output_type='ndarray')
         
-        edges_added = 0
-        print(f"Analisando {len(pairs)} pares candidatos para transferência real...")
+        logger.info("Analisando %d pares candidatos para transferência real...", len(pairs))
 
-        for i, j in pairs:
-            u, v = node_ids[i], node_ids[j]
-            
-            # Filtro de Operador: Só transferimos entre redes diferentes (ex: STCP -> METRO)
-            if u.split('_')[0] == v.split('_')[0]:
-                continue
+        # Filtro de Operador: Só transferimos entre redes diferentes (ex: STCP -> METRO)
+        pairs = pairs[operators[pairs[:, 0]] != operators[pairs[:, 1]]]
 
-            # 2. Obter os nós correspondentes na rede de ruas
-            u_osm = osm_mapping[u]
-            v_osm = osm_mapping[v]
-
-            try:
-                # 3. Calcular a distância real de caminhada via NetworkX/OSMnx
-                # Usamos o peso 'length' que a OSMnx guarda em cada aresta
-                real_dist = nx.shortest_path_length(self.G_walk, u_osm, v_osm, weight='length')
-
-                if real_dist <= max_dist_m:
-                    # 4. Cálculo do Custo de Tempo
-                    # Tempo de caminhada + Penalização fixa (3 min) para transbordo
-                    walk_time_sec = (real_dist / walk_speed_ms) + 180
-
-                    # Adicionar arestas bidirecionais ao grafo multimodal
-                    edge_params = {
-                        'type': 'walk',
-                        'travel_time': walk_time_sec,
-                        'distance_km': real_dist / 1000.0,
-                        'co2_cost_g': 0.0,
-                        'is_transfer': True
-                    }
-                    
-                    self.G.add_edge(u, v, **edge_params)
-                    self.G.add_edge(v, u, **edge_params)
-                    edges_added += 1
-
-            except (nx.NetworkXNoPath, nx.NodeNotFound):
-                # Caso não exista caminho a pé (ex: barreiras físicas ou ilhas de rede)
-                continue
+        candidates = []
+        for i, j in pairs.tolist():
+            u, v = node_ids[i], node_ids[j]
+            candidates.append((u, osm_mapping[u], v, osm_mapping[v]))
 
-        self.stops_df = stops_df
+        # Uma pesquisa limitada a max_dist_m por paragem de origem cobre todos os seus vizinhos
+        # (caso não exista caminho a pé, por barreiras físicas ou ilhas de rede, o par é ignorado)
+        return compute_transfer_table(G_walk, candidates, max_dist_m, processes)
 
     def add_intermodal_transfer_edges(self, max_dist_meters=10, transfer_penalty_sec=300):
         """
         Cria ligações a pé entre nós de redes diferentes (Ex: METRO <-> STCP).
         Usa uma cKDTree para busca espacial ultra-rápida.
         """
+        from scipy.spatial import cKDTree
+
         nodes_data = list(self.G.nodes(data=True))
         # Extrair coordenadas e IDs, filtrando apenas nós que têm lat/lon
         node_coords = []
         node_ids = []
+        operators = []
 
         for node_id, data in nodes_data:
             if 'y' in data and 'x' in data:
                 node_coords.append([data['y'], data['x']])
                 node_ids.append(node_id)
+                # Os pontos do utilizador não têm operador (-1)
+                operators.append(data.get('operator', -1))
 
         if not node_coords:
             return
 
         # Criar a árvore para busca espacial
+        node_coords = np.array(node_coords)
         tree = cKDTree(node_coords)
 
         # Converter metros para graus aproximados (1 grau ~ 111km)
         radius_deg = max_dist_meters / 111000.0
 
         # Encontrar todos os pares de nós dentro do raio
-        pairs = tree.query_pairs(radius_deg)
+        pairs = tree.query_pairs(radius_deg, output_type='ndarray')
+        if len(pairs) == 0:
+            return
+
+        # 1. FILTRO DE OPERADOR (Crucial para Performance)
+        # Só criamos a aresta se os operadores forem diferentes (ex: METRO vs STCP)
+        operators = np.array(operators)
+        pairs = pairs[operators[pairs[:, 0]] != operators[pairs[:, 1]]]
+
+        # 2. CÁLCULO DE DISTÂNCIA REAL (todos os pares de uma vez)
+        coords_i, coords_j = node_coords[pairs[:, 0]], node_coords[pairs[:, 1]]
+        dist_km = haversine_m(coords_i[:, 0], coords_i[:, 1], coords_j[:, 0], coords_j[:, 1]) / 1000.0
+
+        within = dist_km <= (max_dist_meters / 1000.0)
+        pairs, dist_km = pairs[within], dist_km[within]
 
         edges_added = 0
-        for i, j in pairs:
+        for (i, j), pair_dist_km in zip(pairs.tolist(), dist_km.tolist()):
             u, v = node_ids[i], node_ids[j]
 
-            # 1. FILTRO DE OPERADOR (Crucial para Performance)
-            # Só criamos a aresta se os prefixos forem diferentes (ex: METRO_ vs STCP_)
-            prefix_u = u.split('_')[0]
-            prefix_v = v.split('_')[0]
-
-            if prefix_u == prefix_v:
-                continue # Ignora transferências entre o mesmo operador (já existem via rota)
-
-            # 2. CÁLCULO DE DISTÂNCIA REAL
-            lat1, lon1 = node_coords[i]
-            lat2, lon2 = node_coords[j]
-            dist_km =  get_km_distance(Point(lon1, lat1), Point(lon2, lat2))
-
-            if dist_km <= (max_dist_meters / 1000.0):
-                # 3. CÁLCULO DO TEMPO (Caminhada + Penalização)
-                # Velocidade média de caminhada: 4 km/h
-                walk_time = math.ceil((dist_km / 4.0) * 3600)
-
-                # Adicionamos uma penalização fixa (ex: 3 min) para evitar transbordos triviais
-                # que o utilizador não faria na vida real.
-                total_transfer_time = walk_time + transfer_penalty_sec
-
-                # 4. ADICIONAR ARESTAS (Bidirecionais)
-                self.G.add_edge(u, v, 
-                        type='walk', 
-                        travel_time=total_transfer_time, 
-                        co2_cost_g=0.0, 
-                        distance_km=dist_km,
-                        is_transfer=True)
-
-                self.G.add_edge(v, u, 
-                        type='walk', 
-                        travel_time=total_transfer_time, 
-                        co2_cost_g=0.0, 
-                        distance_km=dist_km,
-                        is_transfer=True)
-
-                edges_added += 1
+            # 3. CÁLCULO DO TEMPO (Caminhada + Penalização)
+            # Velocidade média de caminhada: 4 km/h
+            walk_time = math.ceil((pair_dist_km / 4.0) * 3600)
+
+            # Adicionamos uma penalização fixa (ex: 3 min) para evitar transbordos triviais
+            # que o utilizador não faria na vida real.
+            total_transfer_time = walk_time + transfer_penalty_sec
+
+            # 4. ADICIONAR ARESTAS (Bidirecionais)
+            self.G.add_edge(u, v, 
+                    type='walk', 
+                    travel_time=total_transfer_time, 
+                    co2_cost_g=0.0, 
+                    distance_km=pair_dist_km,
+                    is_transfer=True)
+
+            self.G.add_edge(v, u, 
+                    type='walk', 
+                    travel_time=total_transfer_time, 
+                    co2_cost_g=0.0, 
+                    distance_km=pair_dist_km,
+                    is_transfer=True)
+
+            edges_added += 1
+
+def get_city_transfer_table(street_graph_path, max_dist_m=250, processes=None):
+    """
+    Tabela de transferências de todas as paragens dos operadores registados
+    sobre toda a rede pedonal local: calculada uma vez por feeds + rede (ver
+    transfer_cache_key), guardada em TRANSFERS_CACHE_DIR e reutilizada por
+    todas as consultas. None se algum feed não vier da cache colunar (sem
+    feed.source_hash).
+    """
+    import pandas as pd
+    from app.utils.feed import load_feed
+
+    feeds = [load_feed(operator.prefix) for operator in FEED_REGISTRY]
+    feed_hashes = [getattr(feed, 'source_hash', None) for feed in feeds]
+    if None in feed_hashes:
+        return None
+
+    key = transfer_cache_key(feed_hashes, street_graph_path, max_dist_m)
+    cache_path = f"{TRANSFERS_CACHE_DIR}/transfers_{key}.pkl"
+    transfers = load_transfer_table(cache_path)
+    if transfers is not None:
+        return transfers
+
+    import osmnx as ox
+
+    G_walk = StreetGraphStore.load(street_graph_path).G
+    stops_df = pd.concat(
+        [feed.stops[['stop_id', 'stop_lat', 'stop_lon', 'operator']] for feed in feeds], ignore_index=True
+    )
+    stops_df['osmnx_node'] = ox.nearest_nodes(G_walk, stops_df['stop_lon'], stops_df['stop_lat'])
+    transfers = GraphRoute.build_transfer_table(G_walk, stops_df.set_index('stop_id'), max_dist_m, processes)
+
+    save_transfer_table(transfers, cache_path)
+    return transfers
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    # Constrói uma única vez o grafo da área metropolitana
+    GraphRoute.build_snapshot()
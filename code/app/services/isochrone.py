@@ -0,0 +1,252 @@
+import math
+
+import numpy as np
+
+from app.services.algoritms.dijkstra import dijkstra_one_to_all
+from app.services.compact_graph import CompactGraph
+from app.utils.time import format_time
+
+# Metros por grau de latitude (e de longitude no equador)
+M_PER_DEG = 111320.0
+
+# Lado (m) das células da grelha usada para converter os nós da rede pedonal
+# alcançados em polígonos (cada nó marca a sua célula e as vizinhas que ainda
+# consegue alcançar a pé no tempo restante)
+GRID_CELL_M = 100.0
+
+# Vizinhança 3x3 de uma célula
+_NEIGHBOURS = np.array([(i, j) for i in (-1, 0, 1) for j in (-1, 0, 1)])
+
+
+class IsochroneBuilder:
+    """
+    Isócronas (áreas alcançáveis em 15/30/45 minutos, por exemplo) a partir do
+    grafo multimodal de um GraphRoute.
+
+    Cada isócrona faz uma única pesquisa one-to-all (dijkstra_one_to_all) com o
+    limite do maior contorno; todos os contornos são recortados do mesmo
+    resultado. A área à volta dos nós alcançados é o que ainda se consegue
+    caminhar no tempo restante:
+    - com G_walk, uma segunda pesquisa sobre a rede pedonal (scipy, com várias
+      origens); a área são as células de uma grelha de GRID_CELL_M dos nós
+      alcançados e as vizinhas ao alcance do tempo restante (uma união de
+      células é muito mais rápida que a união de buffers de milhares de ruas);
+    - sem G_walk, um círculo por nó com o raio da caminhada restante.
+
+    O grafo compacto, a rede pedonal em CSR e as árvores de pesquisa são
+    construídos uma só vez, pelo que o mesmo objeto serve para gerar uma grelha
+    de isócronas (batch).
+
+    As geometrias são calculadas numa projeção métrica local (equiretangular
+    centrada no grafo) e devolvidas em GeoJSON (lon/lat).
+    """
+
+    def __init__(self, graph, walk_speed_kph=5.0, max_access_m=1000):
+        from scipy.spatial import cKDTree
+
+        self.cg = CompactGraph.as_compact(graph.compact_graph if hasattr(graph, 'compact_graph') else graph)
+        self.walk_speed_ms = walk_speed_kph / 3.6
+        self.max_access_m = max_access_m
+
+        self.lat0 = float(np.mean(self.cg.y))
+        self.node_xy = self.project(self.cg.x, self.cg.y)
+        self.node_tree = cKDTree(self.node_xy)
+
+        self.street = None
+        G_walk = getattr(graph, 'G_walk', None)
+        if G_walk is not None:
+            self.street = StreetNetwork(G_walk, self)
+            # Nó da rede pedonal mais próximo de cada nó do grafo multimodal
+            snap_m, self.node_street = self.street.tree.query(self.node_xy)
+            self.node_snap_sec = snap_m / self.walk_speed_ms
+
+    def project(self, lon, lat):
+        """lon/lat (graus) -> coordenadas métricas locais (m), em array (n, 2)."""
+        lon, lat = np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64)
+        x = lon * M_PER_DEG * math.cos(math.radians(self.lat0))
+        y = lat * M_PER_DEG
+        return np.column_stack([x, y])
+
+    def unproject(self, coords):
+        coords = np.asarray(coords)
+        lon = coords[:, 0] / (M_PER_DEG * math.cos(math.radians(self.lat0)))
+        lat = coords[:, 1] / M_PER_DEG
+        return np.column_stack([lon, lat])
+
+    def from_node(self, node_id, start_time_sec, contours_min=(15, 30, 45)):
+        """Isócronas a partir de um nó do grafo (por exemplo USER_START)."""
+        max_sec = max(contours_min) * 60
+        times = dijkstra_one_to_all(self.cg, node_id, start_time_sec, max_sec)
+        return self.build(times, start_time_sec, contours_min)
+
+    def from_point(self, lat, lon, start_time_sec, contours_min=(15, 30, 45)):
+        """
+        Isócronas a partir de um ponto qualquer: a pesquisa começa em todos os
+        nós a menos de max_access_m (em linha reta), com o tempo de caminhada
+        até cada um, e a própria caminhada a partir do ponto também conta.
+        """
+        max_sec = max(contours_min) * 60
+        origin_xy = self.project([lon], [lat])
+
+        sources = {}
+        for k in self.node_tree.query_ball_point(origin_xy[0], self.max_access_m):
+            distance_m = float(np.hypot(*(self.node_xy[k] - origin_xy[0])))
+            sources[self.cg.node_ids[k]] = math.ceil(distance_m / self.walk_speed_ms)
+
+        times = dijkstra_one_to_all(self.cg, sources, start_time_sec, max_sec) if sources \
+            else np.full(self.cg.number_of_nodes, np.inf)
+        return self.build(times, start_time_sec, contours_min, origin_xy=origin_xy)
+
+    def batch(self, points, start_time_sec, contours_min=(15, 30, 45)):
+        """Isócronas para uma lista de pontos (lat, lon), reutilizando as estruturas já construídas."""
+        return [self.from_point(lat, lon, start_time_sec, contours_min) for lat, lon in points]
+
+    def build(self, times, start_time_sec, contours_min, origin_xy=None):
+        """Converte os tempos por nó numa FeatureCollection GeoJSON (um polígono por contorno)."""
+        import shapely
+        from shapely.geometry import mapping
+
+        max_sec = max(contours_min) * 60
+        reached = np.flatnonzero(times <= max_sec)
+
+        if self.street is not None:
+            street_sec = self.street.walk_times(
+                self.node_street[reached], times[reached] + self.node_snap_sec[reached], max_sec, origin_xy
+            )
+
+        features = []
+        for minutes in sorted(contours_min, reverse=True):
+            limit = minutes * 60
+            if self.street is not None:
+                area = self.street.area(street_sec, limit)
+            else:
+                area = self.circles(self.node_xy[reached], times[reached], limit, origin_xy)
+
+            area = shapely.transform(area, self.unproject)
+            features.append({
+                'type': 'Feature',
+                'geometry': mapping(area),
+                'properties': {
+                    'contour_min': minutes,
+                    'start_time': format_time(start_time_sec),
+                },
+            })
+
+        return {'type': 'FeatureCollection', 'features': features}
+
+    def circles(self, xy, times, limit, origin_xy=None):
+        """União de círculos com o raio da caminhada possível no tempo restante (sem rede pedonal)."""
+        import shapely
+
+        if origin_xy is not None:
+            xy = np.vstack([xy, origin_xy])
+            times = np.append(times, 0)
+
+        inside = times <= limit
+        radius = np.minimum((limit - times[inside]) * self.walk_speed_ms, self.max_access_m)
+        return shapely.union_all(shapely.buffer(shapely.points(xy[inside]), radius))
+
+
+class StreetNetwork:
+    """Rede pedonal (G_walk) em CSR para pesquisas com várias origens no scipy."""
+
+    def __init__(self, G_walk, builder: IsochroneBuilder):
+        from scipy.sparse import csr_matrix
+        from scipy.spatial import cKDTree
+
+        self.builder = builder
+        self.node_ids = list(G_walk.nodes)
+        index = {node: i for i, node in enumerate(self.node_ids)}
+
+        self.xy = builder.project(
+            [G_walk.nodes[n]['x'] for n in self.node_ids],
+            [G_walk.nodes[n]['y'] for n in self.node_ids],
+        )
+        self.tree = cKDTree(self.xy)
+
+        # Arestas (u, v) com o menor comprimento entre arestas paralelas
+        lengths = {}
+        for u, v, length in G_walk.edges(data='length', default=None):
+            if length is None:
+                length = float(np.hypot(*(self.xy[index[u]] - self.xy[index[v]])))
+            key = (index[u], index[v])
+            if length < lengths.get(key, float('inf')):
+                lengths[key] = length
+
+        n = len(self.node_ids)
+        edges = np.array(list(lengths.keys()), dtype=np.int64).reshape(-1, 2)
+        seconds = np.maximum(np.array(list(lengths.values())) / builder.walk_speed_ms, 1e-6)
+
+        # A linha/coluna n é uma super-origem ligada às origens de cada pesquisa
+        self.n = n
+        self.base = csr_matrix((seconds, (edges[:, 0], edges[:, 1])), shape=(n + 1, n + 1))
+
+    def walk_times(self, street_nodes, initial_sec, max_sec, origin_xy=None):
+        """Tempo (s) até cada nó da rede pedonal, começando nas origens com os tempos iniciais indicados."""
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import dijkstra
+
+        pairs = list(zip(street_nodes.tolist(), initial_sec.tolist()))
+        if origin_xy is not None:
+            snap_m, node = self.tree.query(origin_xy[0])
+            pairs.append((int(node), snap_m / self.builder.walk_speed_ms))
+
+        # Menor tempo inicial por nó (o csr_matrix somaria entradas repetidas)
+        initial = {}
+        for node, seconds in pairs:
+            if seconds < initial.get(node, float('inf')):
+                initial[node] = seconds
+
+        if not initial:
+            return np.full(self.n, np.inf)
+
+        # O scipy ignora arestas de peso 0: um tempo inicial nulo passa a um valor ínfimo
+        super_edges = csr_matrix(
+            (np.maximum(list(initial.values()), 1e-6), (np.full(len(initial), self.n), list(initial.keys()))),
+            shape=(self.n + 1, self.n + 1),
+        )
+        matrix = self.base + super_edges
+
+        times = dijkstra(matrix, indices=self.n, limit=max_sec)
+        return times[:self.n]
+
+    def area(self, times, limit):
+        """
+        Células da grelha dos nós alcançados dentro do limite, unidas num
+        (multi)polígono. Cada nó marca a sua célula e as células vizinhas
+        (3x3) cuja distância ao nó não excede a caminhada no tempo restante,
+        para que um nó alcançado no limite não alargue a área.
+        """
+        import shapely
+
+        reached = times <= limit
+        if not reached.any():
+            return shapely.MultiPolygon()
+
+        xy = self.xy[reached]
+        remaining_m = (limit - times[reached]) * self.builder.walk_speed_ms
+        cells = np.floor(xy / GRID_CELL_M).astype(np.int64)
+
+        # Distância de cada nó a cada célula vizinha (retângulo), por eixo
+        candidates = cells[:, None, :] + _NEIGHBOURS[None]
+        low = candidates * GRID_CELL_M
+        gap = np.maximum(np.maximum(low - xy[:, None, :], xy[:, None, :] - (low + GRID_CELL_M)), 0.0)
+        within = np.hypot(gap[..., 0], gap[..., 1]) <= remaining_m[:, None]
+
+        cells = np.unique(candidates[within], axis=0)
+        boxes = shapely.box(
+            cells[:, 0] * GRID_CELL_M, cells[:, 1] * GRID_CELL_M,
+            (cells[:, 0] + 1) * GRID_CELL_M, (cells[:, 1] + 1) * GRID_CELL_M,
+        )
+        # As células não se sobrepõem: coverage_union é uma união sem interseções
+        return shapely.simplify(shapely.coverage_union_all(boxes), GRID_CELL_M / 2)
+
+
+def isochrones(graph, start_time_sec, contours_min=(15, 30, 45), source=None):
+    """
+    Isócronas de um GraphRoute a partir de source (por omissão, a origem do
+    utilizador, USER_START), em GeoJSON.
+    """
+    if source is None:
+        source = graph.origem_node_id
+    return IsochroneBuilder(graph).from_node(source, start_time_sec, contours_min)
@@ -0,0 +1,203 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from app.services.algoritms.raptor import mc_raptor_one_to_all
+from app.services.timetable import RaptorTimetable
+
+# Horário e destinos de cada processo do pool (definidos em _init_worker)
+_worker_timetable = None
+_worker_destinations = None
+
+
+class TravelTimeMatrix:
+    """
+    Matriz origem-destino de fronteiras de Pareto (Tempo, CO2, Exercício).
+
+    Cada célula (i, j) pode ter várias soluções; são guardadas em formato CSR
+    para ocupar pouca memória: as soluções da célula k = i * n_destinos + j são
+    total_time[offsets[k]:offsets[k+1]] (e o mesmo para total_co2 e
+    total_walk_km), ordenadas por tempo. Células sem soluções são destinos não
+    alcançados a partir da origem.
+    """
+
+    def __init__(self, origins, destinations, start_time_sec, offsets, total_time, total_co2, total_walk_km):
+        self.origins = np.asarray(origins, dtype=object)
+        self.destinations = np.asarray(destinations, dtype=object)
+        self.start_time_sec = start_time_sec
+
+        self.offsets = offsets
+        self.total_time = total_time
+        self.total_co2 = total_co2
+        self.total_walk_km = total_walk_km
+
+    @property
+    def shape(self):
+        return len(self.origins), len(self.destinations)
+
+    def front(self, i, j):
+        """Soluções da célula (origem i, destino j): [(tempo, co2, km), ...]."""
+        k = i * len(self.destinations) + j
+        start, end = self.offsets[k], self.offsets[k + 1]
+        return list(zip(
+            self.total_time[start:end].tolist(),
+            self.total_co2[start:end].tolist(),
+            self.total_walk_km[start:end].tolist(),
+        ))
+
+    def min_time(self) -> np.ndarray:
+        """Matriz densa com o menor tempo de cada célula (NaN se não alcançado)."""
+        result = np.full(len(self.offsets) - 1, np.nan, dtype=np.float32)
+        counts = np.diff(self.offsets)
+        reached = counts > 0
+        # As soluções estão ordenadas por tempo: a primeira de cada célula é a mais rápida
+        result[reached] = self.total_time[self.offsets[:-1][reached]]
+        return result.reshape(self.shape)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Formato longo (uma linha por solução), por exemplo para exportar com DataFrame.to_parquet."""
+        cells = np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+        n = len(self.destinations)
+
+        return pd.DataFrame({
+            'origin': self.origins[cells // n],
+            'destination': self.destinations[cells % n],
+            'total_time': self.total_time,
+            'total_co2': self.total_co2,
+            'total_walk_km': self.total_walk_km,
+        })
+
+    def save(self, path):
+        """Guarda a matriz num ficheiro .npz comprimido."""
+        np.savez_compressed(
+            path,
+            origins=self.origins.astype(str),
+            destinations=self.destinations.astype(str),
+            start_time_sec=self.start_time_sec,
+            offsets=self.offsets,
+            total_time=self.total_time,
+            total_co2=self.total_co2,
+            total_walk_km=self.total_walk_km,
+        )
+
+    @classmethod
+    def load(cls, path) -> 'TravelTimeMatrix':
+        with np.load(path) as data:
+            return cls(
+                origins=data['origins'],
+                destinations=data['destinations'],
+                start_time_sec=int(data['start_time_sec']),
+                offsets=data['offsets'],
+                total_time=data['total_time'],
+                total_co2=data['total_co2'],
+                total_walk_km=data['total_walk_km'],
+            )
+
+
+def one_to_many(G, origin, start_time_sec, destinations=None, max_transfers=3):
+    """
+    Fronteiras de Pareto de uma origem para vários destinos, com uma só
+    pesquisa McRAPTOR sem destino.
+
+    G pode ser um RaptorTimetable ou um GraphRoute. Sem destinations, usa todas
+    as paragens servidas por viagens. Retorna {destino: [(tempo, co2, km), ...]}
+    apenas com os destinos alcançados.
+    """
+    timetable = RaptorTimetable.as_timetable(G)
+    if destinations is None:
+        destinations = get_stops(timetable)
+
+    bags = mc_raptor_one_to_all(timetable, origin, start_time_sec, max_transfers)
+
+    result = {}
+    for destination in destinations:
+        bag = bags[timetable.cg.index(destination)]
+        if bag:
+            result[destination] = [(label.total_time, label.total_co2, label.total_walk_km) for label in bag]
+    return result
+
+
+def travel_time_matrix(G, origins, start_time_sec, destinations=None, max_transfers=3, processes=None):
+    """
+    Matriz origem-destino (uma pesquisa one-to-all por origem).
+
+    As origens são distribuídas por um pool de processos (processes=None usa
+    todos os CPUs; processes=1 corre no processo atual). Cada processo recebe o
+    horário uma única vez, no arranque. Sem destinations, usa todas as paragens
+    servidas por viagens.
+    """
+    timetable = RaptorTimetable.as_timetable(G)
+    if destinations is None:
+        destinations = get_stops(timetable)
+
+    origins = list(origins)
+    destinations = list(destinations)
+    columns = [timetable.cg.index(destination) for destination in destinations]
+    tasks = [(origin, start_time_sec, max_transfers) for origin in origins]
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(origins))
+
+    if processes <= 1:
+        _init_worker(timetable, columns)
+        try:
+            rows = [_solve_origin(task) for task in tasks]
+        finally:
+            _init_worker(None, None)
+    else:
+        chunksize = max(1, len(tasks) // (processes * 4))
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(timetable, columns)) as pool:
+            rows = list(pool.map(_solve_origin, tasks, chunksize=chunksize))
+
+    # Juntar as linhas (contagens por célula + soluções) num único CSR
+    counts = np.concatenate([row[0] for row in rows]) if rows else np.empty(0, dtype=np.int64)
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    def concat(k, dtype):
+        arrays = [row[k] for row in rows]
+        return np.concatenate(arrays).astype(dtype) if arrays else np.empty(0, dtype=dtype)
+
+    return TravelTimeMatrix(
+        origins=origins,
+        destinations=destinations,
+        start_time_sec=start_time_sec,
+        offsets=offsets,
+        total_time=concat(1, np.float32),
+        total_co2=concat(2, np.float32),
+        total_walk_km=concat(3, np.float32),
+    )
+
+
+def get_stops(timetable: RaptorTimetable):
+    """IDs das paragens servidas por pelo menos um padrão de rota."""
+    return [timetable.cg.node_ids[stop] for stop in sorted(timetable.routes_serving)]
+
+
+def _init_worker(timetable, columns):
+    global _worker_timetable, _worker_destinations
+    _worker_timetable = timetable
+    _worker_destinations = columns
+
+
+def _solve_origin(task):
+    """Uma linha da matriz: (contagens por destino, tempos, CO2, km)."""
+    origin, start_time_sec, max_transfers = task
+    bags = mc_raptor_one_to_all(_worker_timetable, origin, start_time_sec, max_transfers)
+
+    counts = np.zeros(len(_worker_destinations), dtype=np.int64)
+    times, co2, walks = [], [], []
+    for j, node in enumerate(_worker_destinations):
+        bag = bags[node]
+        if not bag:
+            continue
+        counts[j] = len(bag)
+        for label in bag:
+            times.append(label.total_time)
+            co2.append(label.total_co2)
+            walks.append(label.total_walk_km)
+
+    return counts, np.array(times, dtype=np.float64), np.array(co2, dtype=np.float64), np.array(walks, dtype=np.float64)
@@ -0,0 +1,297 @@
+from bisect import bisect_left, bisect_right, insort
+
+# Entradas por bloco do arquivo (um bloco é dividido ao passar de 2 * BLOCK_SIZE)
+BLOCK_SIZE = 32
+
+# Blocos até este tamanho são percorridos linearmente, sem escada; um arquivo
+# com até LINEAR_SCAN_MAX entradas volta a ser um só bloco depois de remoções
+LINEAR_SCAN_MAX = 16
+
+
+class ParetoArchive:
+    """
+    Arquivo de Pareto para os três objetivos do roteador: minimizar tempo e CO2
+    e maximizar a caminhada (exercício).
+
+    Substitui add_solution_with_diversity nos conjuntos de labels. As entradas
+    (tempo, CO2, ordem de inserção, caminhada, item) estão ordenadas por
+    (tempo, CO2) em blocos de até 2 * BLOCK_SIZE entradas. Cada bloco com mais
+    de LINEAR_SCAN_MAX entradas tem também a sua escada 2-D em (CO2,
+    caminhada), calculada quando é precisa: os CO2 ordenados, o máximo da
+    caminhada até cada CO2 e o mínimo a partir dele. Assim:
+    - "alguma entrada com tempo <= t domina a nova?" é, para cada bloco
+      inteiramente anterior a t, uma pesquisa binária na escada (existe
+      CO2 <= c com caminhada >= w?), e só o bloco que contém t é percorrido;
+    - "que entradas com tempo >= t a nova domina?" só percorre os blocos
+      cuja escada indica alguma (CO2 >= c com caminhada <= w);
+    - o filtro de diversidade só olha para a janela de tempo ]t - epsilon, t + epsilon[.
+    O custo de um teste de dominância é O(n / BLOCK_SIZE * log BLOCK_SIZE + BLOCK_SIZE).
+
+    Os bags por nó das pesquisas (max_size de 8 a 15) são sempre um só bloco
+    percorrido linearmente, como a lista: aí o arquivo não é mais rápido que
+    add_solution_with_diversity (~0.8-0.9x em benchmarks.pareto). O ganho das
+    escadas só aparece com centenas de labels (bags sem limite, como o do
+    destino em profile_mc_raptor).
+
+    As opções mantêm a semântica de add_solution_with_diversity:
+    - epsilon: janela de tempo (s) dentro da qual uma solução só é aceite se
+      for melhor em CO2 (ou se a existente for substancialmente melhor em CO2
+      e exercício). Com 0, o arquivo guarda a fronteira de Pareto exata;
+    - max_size: número máximo de entradas. Ao exceder, são preservados os três
+      campeões (menor tempo, menor CO2, mais caminhada) e descartada a entrada
+      com maior (tempo, CO2) entre as restantes. Com None, não há limite.
+
+    Desempates (só diferem de add_solution_with_diversity quando há entradas
+    com custos iguais): entre entradas empatadas num campeão, prevalece a
+    primeira na ordem (tempo, CO2, inserção), isto é, a mais antiga, onde a
+    lista preferia a acabada de inserir; entre entradas não campeãs com o
+    mesmo (tempo, CO2), é descartada a mais recente, onde a lista descartava
+    a mais antiga. Sem empates, o conteúdo é o mesmo da lista.
+
+    Aceita quaisquer objetos com total_time, total_co2 e total_walk_km (Label, Solution).
+    """
+
+    __slots__ = ('max_size', 'epsilon', '_blocks', '_last_times', '_stairs', '_len', '_seq')
+
+    def __init__(self, max_size=None, epsilon=0.0):
+        self.max_size = max_size
+        self.epsilon = epsilon
+
+        self._blocks = []      # blocos de entradas (t, c, seq, w, item), ordenados
+        self._last_times = []  # tempo da última entrada de cada bloco
+        self._stairs = []      # escada de cada bloco (None até ser precisa, ver _staircase)
+        self._len = 0
+        self._seq = 0
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        """Itera pelas entradas por ordem crescente de (tempo, CO2)."""
+        for block in self._blocks:
+            for entry in block:
+                yield entry[4]
+
+    @property
+    def items(self) -> list:
+        return list(self)
+
+    def min_time(self):
+        """Menor tempo no arquivo (None se estiver vazio)."""
+        return self._blocks[0][0][0] if self._blocks else None
+
+    def rejects(self, total_time, total_co2, total_walk_km) -> bool:
+        """
+        Indica se uma entrada com estes custos seria recusada por add (dominada
+        ou redundante), sem a inserir. Permite evitar criar o objeto.
+        """
+        t, c, w = total_time, total_co2, total_walk_km
+        blocks = self._blocks
+
+        # 1. Dominância: só as entradas com tempo <= t podem dominar a nova.
+        # Arquivo com um só bloco: percorrer as entradas até t
+        if len(blocks) <= 1:
+            if blocks:
+                for t_i, c_i, _, w_i, _ in blocks[0]:
+                    if t_i > t:
+                        break
+                    if c_i <= c and w_i >= w:
+                        return True
+            return self.epsilon > 0 and self._redundant(t, c, w)
+
+        # Blocos inteiramente anteriores a t: pesquisa na escada do bloco
+        n_before = bisect_right(self._last_times, t)
+        for b in range(n_before):
+            block = blocks[b]
+            if len(block) <= LINEAR_SCAN_MAX:
+                for _, c_i, _, w_i, _ in block:
+                    if c_i <= c and w_i >= w:
+                        return True
+            else:
+                co2_sorted, walk_max, _ = self._staircase(b)
+                k = bisect_right(co2_sorted, c)
+                if k and walk_max[k - 1] >= w:
+                    return True
+
+        # Bloco que contém t: percorrer as entradas com tempo <= t
+        if n_before < len(blocks):
+            for t_i, c_i, _, w_i, _ in blocks[n_before]:
+                if t_i > t:
+                    break
+                if c_i <= c and w_i >= w:
+                    return True
+
+        # 2. Filtro de diversidade
+        return self.epsilon > 0 and self._redundant(t, c, w)
+
+    def _redundant(self, t, c, w) -> bool:
+        """Filtro de diversidade na janela de tempo ]t - epsilon, t + epsilon[."""
+        blocks = self._blocks
+        low, high = t - self.epsilon, t + self.epsilon
+        for b in range(bisect_right(self._last_times, low), len(blocks)):
+            for t_i, c_i, _, w_i, _ in blocks[b]:
+                if t_i <= low:
+                    continue
+                if t_i >= high:
+                    return False
+                if c_i <= c and not (c_i <= c * 0.95 and w_i >= w * 1.05):
+                    return True
+        return False
+
+    def add(self, item) -> bool:
+        """
+        Tenta inserir item no arquivo. Retorna True se foi aceite (não dominado
+        nem redundante), removendo as entradas que passam a ser dominadas.
+        """
+        # 1-2. Dominância e filtro de diversidade
+        t, c, w = item.total_time, item.total_co2, item.total_walk_km
+        if len(self._blocks) <= 1:
+            # Um só bloco: o teste de rejects sem a chamada (é o caso de quase todos os nós)
+            if self._blocks:
+                for t_i, c_i, _, w_i, _ in self._blocks[0]:
+                    if t_i > t:
+                        break
+                    if c_i <= c and w_i >= w:
+                        return False
+            if self.epsilon > 0 and self._redundant(t, c, w):
+                return False
+        elif self.rejects(t, c, w):
+            return False
+
+        # 3. Remover as entradas dominadas pela nova (só podem ter tempo >= t)
+        b = bisect_left(self._last_times, t)
+        while b < len(self._blocks):
+            block = self._blocks[b]
+            if len(block) > LINEAR_SCAN_MAX:
+                co2_sorted, _, walk_min = self._staircase(b)
+                k = bisect_left(co2_sorted, c)
+                candidates = k < len(co2_sorted) and walk_min[k] <= w
+            else:
+                candidates = True
+            if candidates:
+                kept = [
+                    e for e in block
+                    if not (e[0] >= t and e[1] >= c and e[3] <= w and (e[0] > t or e[1] > c or e[3] < w))
+                ]
+                if len(kept) != len(block):
+                    self._len -= len(block) - len(kept)
+                    if not kept:
+                        self._remove_block(b)
+                        continue
+                    self._set_block(b, kept)
+            b += 1
+
+        # Depois das remoções, um arquivo pequeno volta a ser um só bloco (caminho linear)
+        if len(self._blocks) > 1 and self._len <= LINEAR_SCAN_MAX:
+            self._merge_blocks()
+
+        # 4. Inserir mantendo a ordem (tempo, CO2, inserção)
+        entry = (t, c, self._seq, w, item)
+        self._seq += 1
+        self._insert(entry)
+
+        # 5. Limite de tamanho preservando a diversidade
+        if self.max_size is not None and self._len > self.max_size:
+            self._evict()
+
+        return True
+
+    def _insert(self, entry):
+        self._len += 1
+        if not self._blocks:
+            self._blocks.append([entry])
+            self._last_times.append(entry[0])
+            self._stairs.append(None)
+            return
+
+        # Bloco da entrada: o primeiro cuja última entrada não é menor (ou o último)
+        b = min(bisect_left(self._last_times, entry[0]), len(self._blocks) - 1)
+        while b + 1 < len(self._blocks) and self._blocks[b][-1] < entry:
+            b += 1
+        block = self._blocks[b]
+        insort(block, entry)
+
+        if len(block) > 2 * BLOCK_SIZE:
+            half = len(block) // 2
+            self._set_block(b, block[:half])
+            self._blocks.insert(b + 1, block[half:])
+            self._last_times.insert(b + 1, block[-1][0])
+            self._stairs.insert(b + 1, None)
+        else:
+            self._set_block(b, block)
+
+    def _set_block(self, b, block):
+        self._blocks[b] = block
+        self._last_times[b] = block[-1][0]
+        self._stairs[b] = None
+
+    def _staircase(self, b):
+        """
+        Escada 2-D (CO2, caminhada) do bloco b: os CO2 ordenados, o máximo da
+        caminhada até cada posição (prefixo) e o mínimo a partir dela (sufixo).
+        Calculada na primeira consulta depois de o bloco mudar.
+        """
+        stair = self._stairs[b]
+        if stair is not None:
+            return stair
+
+        pairs = sorted((e[1], e[3]) for e in self._blocks[b])
+        co2_sorted = [c for c, _ in pairs]
+
+        walk_max, best = [], float('-inf')
+        for _, w in pairs:
+            best = w if w > best else best
+            walk_max.append(best)
+
+        walk_min, best = [0.0] * len(pairs), float('inf')
+        for k in range(len(pairs) - 1, -1, -1):
+            w = pairs[k][1]
+            best = w if w < best else best
+            walk_min[k] = best
+
+        stair = (co2_sorted, walk_max, walk_min)
+        self._stairs[b] = stair
+        return stair
+
+    def _merge_blocks(self):
+        """Junta todos os blocos num só (as entradas já estão ordenadas entre blocos)."""
+        block = [entry for block in self._blocks for entry in block]
+        self._blocks = [block]
+        self._last_times = [block[-1][0]]
+        self._stairs = [None]
+
+    def _remove_block(self, b):
+        del self._blocks[b]
+        del self._last_times[b]
+        del self._stairs[b]
+
+    def _evict(self):
+        """
+        Remove a entrada com maior (tempo, CO2) que não seja um dos três campeões.
+        Em caso de empate num campeão, prevalece a primeira entrada na ordem
+        (tempo, CO2, inserção). Percorre o arquivo: só acontece com max_size,
+        isto é, em arquivos pequenos.
+        """
+        entries = [entry for block in self._blocks for entry in block]
+        n = len(entries)
+        best_time = 0
+        best_co2 = min(range(n), key=lambda i: entries[i][1])
+        best_walk = max(range(n), key=lambda i: entries[i][3])
+
+        for i in range(n - 1, -1, -1):
+            if i != best_time and i != best_co2 and i != best_walk:
+                victim = entries[i]
+                break
+        else:
+            return
+
+        for b, block in enumerate(self._blocks):
+            if block[-1] >= victim:
+                kept = [e for e in block if e is not victim]
+                self._len -= 1
+                if kept:
+                    self._set_block(b, kept)
+                else:
+                    self._remove_block(b)
+                return
+
@@ -1,13 +1,127 @@
-import folium
-import numpy as np
-import matplotlib.pyplot as plt
-import networkx as nx
-from shapely.geometry import Point
-
-from app.utils.geo import get_km_distance
+from app.utils.geo import haversine_m, HAVERSINE_MAX_REL_ERROR
 from app.utils.time import format_time
 
-class Solution:
+# Parâmetros da heurística admissível: velocidade máxima (Metro) e fator de
+# emissão mínimo (Metro: 40g/km)
+HEURISTIC_MAX_SPEED_KPH = 50.0
+HEURISTIC_MIN_CO2_GPKM = 40.0
+
+# De quantos em quantos níveis um label guarda o conjunto (bits por índice de
+# nó) dos nós visitados, partilhado pelos seus descendentes: a verificação de
+# ciclos percorre no máximo VISITED_SNAPSHOT_DEPTH - 1 antecessores
+VISITED_SNAPSHOT_DEPTH = 8
+
+
+class _ParetoCosts:
+    """Comparações comuns a Solution e Label (tempo, CO2 e exercício)."""
+
+    __slots__ = ()
+
+    def dominates(self, other) -> bool:
+        # (Mantém a lógica de dominância que definimos antes)
+        better_time = self.total_time <= other.total_time
+        better_co2 = self.total_co2 <= other.total_co2
+        better_exercise = self.total_walk_km >= other.total_walk_km
+        is_better_or_equal = better_time and better_co2 and better_exercise
+        is_strictly_better = (self.total_time < other.total_time or 
+                             self.total_co2 < other.total_co2 or 
+                             self.total_walk_km > other.total_walk_km)
+        return is_better_or_equal and is_strictly_better
+
+    def __lt__(self, other):
+        """
+        Define o comportamento do operador '<'. 
+        Útil para o heapq desempatar soluções com o mesmo f_time e f_co2.
+        """
+        # Se houver empate nos custos principais, priorizamos a que tem MAIS exercício
+        if self.total_time == other.total_time and self.total_co2 == other.total_co2:
+            return self.total_walk_km > other.total_walk_km
+        return self.total_time < other.total_time
+
+
+class Label(_ParetoCosts):
+    """
+    Label compacto usado dentro das pesquisas multi-objetivo (A*, Dijkstra).
+
+    Usa __slots__ (sem __dict__ por instância; só ~1.2x menos memória por
+    label, porque a maior parte são os floats dos custos: ver benchmarks.labels)
+    e, em vez de copiar o caminho completo em cada expansão, guarda apenas o
+    seu nó, a informação da viagem e um ponteiro para o label anterior
+    (parent). Só os labels que chegam ao
+    destino são convertidos em Solution (to_solution).
+
+    Para a verificação de ciclos (visits), os labels a cada
+    VISITED_SNAPSHOT_DEPTH níveis do caminho guardam os nós visitados até si
+    num inteiro (bit i = nó de índice i do CompactGraph); os restantes
+    partilham o do antecessor mais próximo. A verificação é exata e não
+    depende do comprimento do caminho.
+    """
+
+    __slots__ = ('total_time', 'total_co2', 'total_walk_km', 'arrival_sec',
+                 'node', 'trip_info', 'parent', 'depth', 'visited')
+
+    def __init__(self, total_time, total_co2, total_walk_km, arrival_sec, node, trip_info, parent=None):
+        self.total_time = total_time
+        self.total_co2 = total_co2
+        self.total_walk_km = total_walk_km
+        self.arrival_sec = arrival_sec
+        self.node = node
+        self.trip_info = trip_info
+        self.parent = parent
+
+        if parent is None:
+            self.depth = 0
+            self.visited = 1 << node
+        elif (parent.depth + 1) % VISITED_SNAPSHOT_DEPTH:
+            self.depth = parent.depth + 1
+            self.visited = parent.visited
+        else:
+            # Novo conjunto: o do antecessor mais os nós desde o último guardado
+            self.depth = parent.depth + 1
+            visited = parent.visited | (1 << node)
+            label = parent
+            while label.depth % VISITED_SNAPSHOT_DEPTH:
+                visited |= 1 << label.node
+                label = label.parent
+            self.visited = visited
+
+    def extend(self, node, trip_info, total_time, total_co2, total_walk_km, arrival_sec) -> 'Label':
+        """Cria o label sucessor deste, no nó node, sem copiar o caminho."""
+        return Label(total_time, total_co2, total_walk_km, arrival_sec, node, trip_info, self)
+
+    def visits(self, node) -> bool:
+        """
+        Indica se o caminho deste label já passa pelo nó (verificação de
+        ciclos): os nós desde o último label com o conjunto guardado e depois
+        o bit do nó nesse conjunto.
+        """
+        label = self
+        while label.depth % VISITED_SNAPSHOT_DEPTH:
+            if label.node == node:
+                return True
+            label = label.parent
+        return (label.visited >> node) & 1 == 1
+
+    @property
+    def path(self):
+        """Lista [(nó, trip_info, hora de chegada), ...] desde a origem, reconstruída pelos parents."""
+        path = []
+        label = self
+        while label is not None:
+            path.append((label.node, label.trip_info, label.arrival_sec))
+            label = label.parent
+        path.reverse()
+        return path
+
+    def to_solution(self, cg=None) -> 'Solution':
+        """Converte o label numa Solution; com cg, o caminho usa os IDs originais dos nós."""
+        path = self.path
+        if cg is not None:
+            path = cg.to_node_path(path)
+        return Solution(self.total_time, self.total_co2, self.total_walk_km, self.arrival_sec, path)
+
+
+class Solution(_ParetoCosts):
     def __init__(self, total_time, total_co2, total_walk_km, arrival_sec, path):
         self.total_time = total_time
         self.total_co2 = total_co2
@@ -24,39 +138,37 @@ class Solution:
         node_u = G.nodes[u]
         node_d = G.nodes[destino]
 
-        dist_km = get_km_distance(
-            Point(node_u['x'], node_u['y']),
-            Point(node_d['x'], node_d['y'])
-        )
+        return Solution.get_heuristic_from_coords(node_u['x'], node_u['y'], node_d['x'], node_d['y'])
+
+    @staticmethod
+    def get_heuristic_from_coords(x_u, y_u, x_d, y_d):
+        """Mesma estimativa de get_heuristic, a partir das coordenadas (lon, lat) dos dois nós."""
+        # Haversine corrigida pelo seu erro máximo para continuar a ser um minorante
+        dist_km = float(haversine_m(y_u, x_u, y_d, x_d)) * (1 - HAVERSINE_MAX_REL_ERROR) / 1000.0
 
         # Estimativa de Tempo: Distância / Velocidade máxima (ex: 50km/h)
-        h_time = (dist_km / 50.0) * 3600 
+        h_time = (dist_km / HEURISTIC_MAX_SPEED_KPH) * 3600 
 
         # Estimativa de CO2: Distância * Fator mínimo (Metro: 40g/km)
-        h_co2 = dist_km * 40.0
+        h_co2 = dist_km * HEURISTIC_MIN_CO2_GPKM
 
         return h_time, h_co2
 
-    def dominates(self, other: 'Solution') -> bool:
-        # (Mantém a lógica de dominância que definimos antes)
-        better_time = self.total_time <= other.total_time
-        better_co2 = self.total_co2 <= other.total_co2
-        better_exercise = self.total_walk_km >= other.total_walk_km
-        is_better_or_equal = better_time and better_co2 and better_exercise
-        is_strictly_better = (self.total_time < other.total_time or 
-                             self.total_co2 < other.total_co2 or 
-                             self.total_walk_km > other.total_walk_km)
-        return is_better_or_equal and is_strictly_better
-
-    def __lt__(self, other):
+    @staticmethod
+    def get_heuristic_table(cg, destino: int):
         """
-        Define o comportamento do operador '<'. 
-        Útil para o heapq desempatar soluções com o mesmo f_time e f_co2.
+        Calcula, numa única passagem vetorizada, os minorantes de tempo e CO2 de
+        todos os nós de um CompactGraph até ao nó destino.
+
+        Retorna duas listas (h_time, h_co2) indexadas pelo índice do nó, para
+        que os ciclos internos façam apenas uma consulta O(1).
         """
-        # Se houver empate nos custos principais, priorizamos a que tem MAIS exercício
-        if self.total_time == other.total_time and self.total_co2 == other.total_co2:
-            return self.total_walk_km > other.total_walk_km
-        return self.total_time < other.total_time
+        dist_km = haversine_m(cg.y, cg.x, cg.y[destino], cg.x[destino]) * (1 - HAVERSINE_MAX_REL_ERROR) / 1000.0
+
+        h_time = (dist_km / HEURISTIC_MAX_SPEED_KPH) * 3600
+        h_co2 = dist_km * HEURISTIC_MIN_CO2_GPKM
+
+        return h_time.tolist(), h_co2.tolist()
 
     def summarize_solution(self, G_multimodal, start_time_sec: int):
         """Gera um resumo legível e a decomposição do caminho para uma solução."""
@@ -100,6 +212,8 @@ class Solution:
         """
         Converte uma solução (path) em uma lista de coordenadas (lat, lon) reais.
         """
+        import networkx as nx
+
         SOURCE_NODE_ID = "USER_START"
         DESTINATION_NODE_ID = "USER_END"
 
@@ -149,6 +263,8 @@ class Solution:
         return full_coords
 
     def create_route_map(self, G_combined, G_osm, stops_df):
+        import folium
+
         # 1. Obter a geometria completa
         coords = self.get_full_geometry(G_combined, G_osm, stops_df)
 
@@ -202,6 +318,9 @@ def plot_pareto(solutions):
         print("Nenhuma solução para plotar.")
         return
 
+    import numpy as np
+    import matplotlib.pyplot as plt
+
     # 1. Extrair dados
     times = np.array([s.total_time / 60 for s in solutions])
     co2 = np.array([s.total_co2 for s in solutions])
@@ -0,0 +1,229 @@
+from collections import defaultdict
+
+import numpy as np
+
+from app.services.compact_graph import CompactGraph, EDGE_WALK
+
+
+def build_footpaths(cg: CompactGraph):
+    """
+    Arestas de caminhada do grafo compacto por nó de origem:
+    footpaths[nó] = [(nó destino, tempo (s, com penalização de transferência), km), ...]
+    """
+    footpaths = [[] for _ in range(cg.number_of_nodes)]
+    sources = np.repeat(np.arange(cg.number_of_nodes), np.diff(cg.offsets))
+
+    for e in np.flatnonzero(cg.edge_type == EDGE_WALK).tolist():
+        footpaths[sources[e]].append((cg.target(e), cg.walk_time.item(e), cg.walk_km.item(e)))
+
+    return footpaths
+
+
+class RoutePattern:
+    """
+    Padrão de rota do RAPTOR: viagens da mesma linha que servem exatamente a
+    mesma sequência de paragens, ordenadas por hora de partida e sem
+    ultrapassagens (a viagem t parte e chega a todas as paragens antes de t+1).
+
+    As horas são listas Python (acesso escalar rápido no ciclo do RAPTOR):
+    - arrivals[t][i] / departures[t][i]: chegada/partida da viagem t na i-ésima paragem;
+    - departures_at[i]: partidas de todas as viagens na paragem i (ordenadas, para bisect).
+    """
+
+    __slots__ = ('route_id', 'stops', 'trip_ids', 'arrivals', 'departures', 'departures_at', 'segment_co2')
+
+    def __init__(self, route_id, stops, trip_ids, arrivals, departures, segment_co2):
+        self.route_id = route_id
+        self.stops = stops
+        self.trip_ids = trip_ids
+        self.arrivals = arrivals
+        self.departures = departures
+        self.departures_at = [list(column) for column in zip(*departures)]
+        # CO2 (g) do troço paragem i -> i+1, igual ao da aresta de trânsito do grafo
+        self.segment_co2 = segment_co2
+
+    def __len__(self):
+        return len(self.trip_ids)
+
+
+class RaptorTimetable:
+    """
+    Horário no formato usado pelo RAPTOR, construído a partir de um GraphRoute
+    completo (feed GTFS filtrado + pontos do utilizador).
+
+    As paragens são os índices dos nós do CompactGraph do mesmo GraphRoute, o
+    que permite reutilizar as arestas de caminhada (transferências, acesso e
+    saída) como footpaths e devolver os caminhos com os IDs originais.
+    """
+
+    def __init__(self, cg: CompactGraph, patterns, footpaths):
+        self.cg = cg
+        self.patterns = patterns
+        self.footpaths = footpaths
+
+        # routes_serving[nó] = [(índice do padrão, posição da paragem no padrão), ...]
+        self.routes_serving = defaultdict(list)
+        for r, pattern in enumerate(patterns):
+            for i, stop in enumerate(pattern.stops):
+                self.routes_serving[stop].append((r, i))
+
+    @classmethod
+    def from_graph_route(cls, graph) -> 'RaptorTimetable':
+        cg = graph.compact_graph
+        return cls(cg, cls.build_patterns(graph, cg), build_footpaths(cg))
+
+    @classmethod
+    def as_timetable(cls, G) -> 'RaptorTimetable':
+        """Devolve G se já for um RaptorTimetable; caso contrário usa o de um GraphRoute."""
+        if isinstance(G, cls):
+            return G
+        if hasattr(G, 'raptor_timetable'):
+            return G.raptor_timetable
+        raise TypeError(f"Horário RAPTOR não suportado: {type(G).__name__}")
+
+    @staticmethod
+    def build_patterns(graph, cg: CompactGraph):
+        """
+        Agrupa as viagens do feed em padrões de rota (mesma linha e mesma
+        sequência de paragens). Viagens com horas inconsistentes (tempo de
+        viagem negativo, como os segmentos que build_segments descarta) são
+        ignoradas; viagens que ultrapassam outras do mesmo padrão ficam num
+        padrão à parte.
+        """
+        st = graph.build_stop_times(getattr(graph, 'time_window', None))
+        st = st[st['stop_id'].isin(cg.node_index.keys())]
+
+        trip_id = st['trip_id'].to_numpy()
+        bounds = np.flatnonzero(np.r_[True, trip_id[1:] != trip_id[:-1], True])
+
+        stops = st['stop_id'].map(cg.node_index).to_numpy().tolist()
+        arrival = st['arrival_sec'].to_numpy().tolist()
+        departure = st['departure_sec'].to_numpy().tolist()
+        route_id = st['route_id'].to_numpy()
+
+        grouped = defaultdict(list)
+        for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            if end - start < 2:
+                continue
+
+            arr, dep = arrival[start:end], departure[start:end]
+            if any(dep[i] > arr[i + 1] for i in range(end - start - 1)):
+                continue
+
+            # Em cada paragem a partida não pode ser anterior à chegada
+            dep = [max(a, d) for a, d in zip(arr, dep)]
+            key = (route_id[start], tuple(stops[start:end]))
+            grouped[key].append((dep[0], trip_id[start], arr, dep))
+
+        patterns = []
+        for (route, pattern_stops), trips in grouped.items():
+            trips.sort(key=lambda trip: trip[0])
+
+            segment_co2 = []
+            for u, v in zip(pattern_stops[:-1], pattern_stops[1:]):
+                e = cg.find_edge(u, v)
+                segment_co2.append(cg.co2_cost_g.item(e) if e >= 0 else 0.0)
+
+            # Distribuir as viagens por sub-padrões sem ultrapassagens
+            groups = []
+            for trip in trips:
+                for group in groups:
+                    last = group[-1]
+                    if all(a <= b for a, b in zip(last[2], trip[2])) and all(a <= b for a, b in zip(last[3], trip[3])):
+                        group.append(trip)
+                        break
+                else:
+                    groups.append([trip])
+
+            for group in groups:
+                patterns.append(RoutePattern(
+                    route_id=route,
+                    stops=list(pattern_stops),
+                    trip_ids=[trip[1] for trip in group],
+                    arrivals=[trip[2] for trip in group],
+                    departures=[trip[3] for trip in group],
+                    segment_co2=segment_co2,
+                ))
+
+        return patterns
+
+
+class ConnectionTimetable:
+    """
+    Horário do Connection Scan Algorithm (CSA): um único conjunto de arrays
+    paralelos com todas as ligações elementares (paragem -> paragem seguinte de
+    uma viagem), ordenadas por hora de partida, construído a partir dos
+    segmentos de GraphRoute.build_graph.
+
+    Tal como o RaptorTimetable, as paragens são os índices dos nós do
+    CompactGraph, os footpaths são as arestas de caminhada do grafo e o CO2 de
+    cada ligação é o da aresta de trânsito correspondente.
+    """
+
+    def __init__(self, cg: CompactGraph, departure_sec, arrival_sec, dep_stop, arr_stop, trip, co2_cost_g,
+                 trip_ids, footpaths):
+        self.cg = cg
+        # Array NumPy para a pesquisa binária da primeira ligação; listas para o ciclo de varrimento
+        self.departures = departure_sec
+        self.departure_sec = departure_sec.tolist()
+        self.arrival_sec = arrival_sec.tolist()
+        self.dep_stop = dep_stop.tolist()
+        self.arr_stop = arr_stop.tolist()
+        self.trip = trip.tolist()
+        self.co2_cost_g = co2_cost_g.tolist()
+        self.trip_ids = trip_ids
+        self.footpaths = footpaths
+
+    def __len__(self):
+        return len(self.departure_sec)
+
+    @classmethod
+    def from_graph_route(cls, graph) -> 'ConnectionTimetable':
+        import pandas as pd
+
+        cg = graph.compact_graph
+        segments = graph.segments
+        segments = segments[
+            segments['stop_id'].isin(cg.node_index.keys()) & segments['next_stop_id'].isin(cg.node_index.keys())
+        ]
+
+        dep_stop = segments['stop_id'].map(cg.node_index).to_numpy(dtype=np.int64)
+        arr_stop = segments['next_stop_id'].map(cg.node_index).to_numpy(dtype=np.int64)
+        departure = segments['departure_sec'].to_numpy(dtype=np.int64)
+        arrival = departure + segments['travel_time_sec'].to_numpy(dtype=np.int64)
+        trip, trip_ids = pd.factorize(segments['trip_id'])
+
+        # CO2 de cada par (u, v) distinto, lido da aresta de trânsito do grafo
+        pair_codes, pairs = pd.factorize(pd.MultiIndex.from_arrays([dep_stop, arr_stop]))
+        pair_co2 = np.zeros(len(pairs), dtype=np.float64)
+        for k, (u, v) in enumerate(pairs):
+            e = cg.find_edge(u, v)
+            if e >= 0:
+                pair_co2[k] = cg.co2_cost_g.item(e)
+
+        order = np.lexsort((arrival, departure))
+
+        return cls(
+            cg=cg,
+            departure_sec=departure[order],
+            arrival_sec=arrival[order],
+            dep_stop=dep_stop[order],
+            arr_stop=arr_stop[order],
+            trip=trip[order],
+            co2_cost_g=pair_co2[pair_codes[order]] if len(pairs) else np.empty(0),
+            trip_ids=np.asarray(trip_ids, dtype=object),
+            footpaths=build_footpaths(cg),
+        )
+
+    @classmethod
+    def as_timetable(cls, G) -> 'ConnectionTimetable':
+        """Devolve G se já for um ConnectionTimetable; caso contrário usa o de um GraphRoute."""
+        if isinstance(G, cls):
+            return G
+        if hasattr(G, 'connection_timetable'):
+            return G.connection_timetable
+        raise TypeError(f"Horário CSA não suportado: {type(G).__name__}")
+
+    def first_connection(self, time_sec) -> int:
+        """Índice da primeira ligação que parte em ou depois de time_sec."""
+        return int(self.departures.searchsorted(time_sec))
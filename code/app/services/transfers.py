@@ -0,0 +1,132 @@
+import hashlib
+import os
+import pickle
+from collections import defaultdict
+
+# Versão do formato da tabela de transferências em cache. Incrementar sempre
+# que o cálculo mudar, para invalidar tabelas antigas.
+TRANSFERS_VERSION = 2
+
+# Abaixo deste número de pesquisas (nós OSM de origem), compute_transfer_table
+# corre no processo atual: arrancar um pool custa mais do que as pesquisas
+TRANSFERS_POOL_MIN_TASKS = 500
+
+# Rede pedonal de cada processo do pool (definida em _init_worker)
+_worker_G_walk = None
+
+# Tabelas completas já carregadas neste processo (caminho -> DataFrame)
+_LOADED_TABLES = {}
+
+
+def compute_transfer_table(G_walk, pairs, max_dist_m, processes=None):
+    """
+    Distâncias reais a pé (m) entre pares de paragens, com uma pesquisa
+    Dijkstra limitada a max_dist_m por nó de origem (em vez de uma pesquisa
+    completa por par): cada pesquisa cobre todos os vizinhos dessa origem.
+
+    pairs é uma lista de (paragem u, nó OSM de u, paragem v, nó OSM de v); a
+    distância é medida de u para v. Com processes=None, as pesquisas correm
+    no processo atual se forem menos de TRANSFERS_POOL_MIN_TASKS e, acima
+    disso, num pool com todos os CPUs; processes=1 corre sempre no processo atual.
+
+    Retorna um DataFrame (from_stop, to_stop, distance_m) só com os pares a
+    menos de max_dist_m.
+    """
+    import pandas as pd
+
+    # Agrupar os destinos por nó OSM de origem (paragens no mesmo nó partilham a pesquisa)
+    targets = defaultdict(set)
+    for _, u_osm, _, v_osm in pairs:
+        targets[u_osm].add(v_osm)
+    tasks = [(u_osm, list(v_osms), max_dist_m) for u_osm, v_osms in targets.items()]
+
+    if processes is None:
+        processes = (os.cpu_count() or 1) if len(tasks) >= TRANSFERS_POOL_MIN_TASKS else 1
+    processes = min(processes, len(tasks))
+
+    if processes <= 1:
+        _init_worker(G_walk)
+        try:
+            results = [_search(task) for task in tasks]
+        finally:
+            _init_worker(None)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        chunksize = max(1, len(tasks) // (processes * 4))
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(G_walk,)) as pool:
+            results = list(pool.map(_search, tasks, chunksize=chunksize))
+
+    distances = {}
+    for (u_osm, _, _), lengths in zip(tasks, results):
+        for v_osm, length in lengths.items():
+            distances[(u_osm, v_osm)] = length
+
+    rows = []
+    for u, u_osm, v, v_osm in pairs:
+        length = distances.get((u_osm, v_osm))
+        if length is not None:
+            rows.append((u, v, length))
+
+    return pd.DataFrame(rows, columns=['from_stop', 'to_stop', 'distance_m'])
+
+
+def transfer_cache_key(feed_hashes, street_graph_path, max_dist_m) -> str:
+    """
+    Impressão digital da tabela completa de transferências: o hash dos
+    ficheiros de cada feed (feed.source_hash), o ficheiro da rede pedonal
+    local (caminho, tamanho e data de modificação) e a distância máxima.
+    Não depende da consulta: muda só quando um feed ou a rede pedonal mudam.
+    """
+    stat = os.stat(street_graph_path)
+
+    digest = hashlib.sha1()
+    digest.update(f"{TRANSFERS_VERSION}|{max_dist_m}".encode())
+    digest.update("|".join(feed_hashes).encode())
+    digest.update(f"{os.path.abspath(street_graph_path)}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+
+    return digest.hexdigest()[:16]
+
+
+def load_transfer_table(path):
+    """Tabela de transferências em cache (lida uma vez por processo), ou None se não existir."""
+    transfers = _LOADED_TABLES.get(path)
+    if transfers is not None:
+        return transfers
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        transfers = pickle.load(f)
+    _LOADED_TABLES[path] = transfers
+    return transfers
+
+
+def save_transfer_table(transfers, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        pickle.dump(transfers, f, protocol=pickle.HIGHEST_PROTOCOL)
+    _LOADED_TABLES[path] = transfers
+
+
+def subset_transfer_table(transfers, stop_ids):
+    """Transferências da tabela completa entre paragens de stop_ids (por exemplo as do corredor)."""
+    m = transfers['from_stop'].isin(stop_ids) & transfers['to_stop'].isin(stop_ids)
+    return transfers[m].reset_index(drop=True)
+
+
+def _init_worker(G_walk):
+    global _worker_G_walk
+    _worker_G_walk = G_walk
+
+
+def _search(task):
+    """Distâncias (m) do nó de origem aos destinos pedidos alcançados dentro do limite."""
+    import networkx as nx
+
+    u_osm, v_osms, max_dist_m = task
+    try:
+        lengths = nx.single_source_dijkstra_path_length(_worker_G_walk, u_osm, cutoff=max_dist_m, weight='length')
+    except nx.NodeNotFound:
+        return {}
+
+    return {v_osm: lengths[v_osm] for v_osm in v_osms if v_osm in lengths}
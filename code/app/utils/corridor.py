@@ -0,0 +1,180 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+# Quilómetros por grau de latitude (e de longitude no equador)
+KM_PER_DEG = 111.32
+
+# Desvio máximo face à linha reta aceite pela elipse por omissão: um ponto P
+# entra no corredor se d(O, P) + d(P, D) <= ELLIPSE_DETOUR_FACTOR * d(O, D)
+ELLIPSE_DETOUR_FACTOR = 1.05
+
+# Largura (a cada lado) do corredor em linha, em fração do comprimento da linha
+LINE_BUFFER_RATIO = 0.05
+
+
+class Corridor(ABC):
+    """
+    Região de seleção de uma consulta origem-destino, usada para filtrar as
+    paragens do feed (prepare_sub_df) e recortar a rede pedonal
+    (StreetGraphStore.clip_region).
+
+    Cada corredor define:
+    - envelope(): bbox (lat_min, lat_max, lon_min, lon_max) que o contém, usada
+      para obter os candidatos de um GridIndex;
+    - contains(lats, lons): máscara exata dos pontos dentro do corredor;
+    - grow(margin_km): o mesmo corredor alargado (por exemplo para a rede
+      pedonal, que precisa das caminhadas de acesso).
+
+    As distâncias são calculadas numa projeção equiretangular local (km), com
+    erro desprezável à escala de uma área metropolitana.
+    """
+
+    def __init__(self, origin, destination):
+        self.origin = origin
+        self.destination = destination
+        self.lat0 = origin.y
+        self.lon0 = origin.x
+        self.cos_lat0 = np.cos(np.radians(origin.y))
+
+    @abstractmethod
+    def envelope(self):
+        ...
+
+    @abstractmethod
+    def contains(self, lats, lons) -> np.ndarray:
+        ...
+
+    @abstractmethod
+    def grow(self, margin_km) -> 'Corridor':
+        ...
+
+    def select(self, grid) -> np.ndarray:
+        """Posições (por ordem crescente) dos pontos de um GridIndex dentro do corredor."""
+        positions = grid.candidates_bbox(*self.envelope())
+        inside = self.contains(grid.lats[positions], grid.lons[positions])
+        return np.sort(positions[inside])
+
+    def project(self, lats, lons):
+        """Coordenadas (x, y) em km relativas à origem do corredor."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        return (lons - self.lon0) * KM_PER_DEG * self.cos_lat0, (lats - self.lat0) * KM_PER_DEG
+
+
+class BoxCorridor(Corridor):
+    """
+    Retângulo alinhado com os eixos que contém a origem e o destino, com uma
+    margem de buffer_km (o filtro original de get_filtered_multimodal_feed).
+    Cresce com o quadrado da distância em viagens diagonais.
+    """
+
+    def __init__(self, origin, destination, buffer_km=1.0):
+        super().__init__(origin, destination)
+        self.buffer_km = buffer_km
+
+        buffer_deg = buffer_km / KM_PER_DEG
+        self.bbox = (
+            min(origin.y, destination.y) - buffer_deg,
+            max(origin.y, destination.y) + buffer_deg,
+            min(origin.x, destination.x) - buffer_deg,
+            max(origin.x, destination.x) + buffer_deg,
+        )
+
+    def envelope(self):
+        return self.bbox
+
+    def contains(self, lats, lons) -> np.ndarray:
+        lat_min, lat_max, lon_min, lon_max = self.bbox
+        lats, lons = np.asarray(lats), np.asarray(lons)
+        return (lats >= lat_min) & (lats <= lat_max) & (lons >= lon_min) & (lons <= lon_max)
+
+    def grow(self, margin_km) -> 'BoxCorridor':
+        return BoxCorridor(self.origin, self.destination, self.buffer_km + margin_km)
+
+
+class EllipseCorridor(Corridor):
+    """
+    Elipse com focos na origem e no destino: os pontos P com
+    d(O, P) + d(P, D) <= detour_factor * d(O, D), isto é, os pontos por onde
+    passa um percurso até detour_factor vezes a linha reta, mais os círculos
+    de raio buffer_km à volta da origem e do destino (caminhadas de acesso).
+    A largura cresce com a distância origem-destino, em vez da área do
+    retângulo envolvente.
+    """
+
+    def __init__(self, origin, destination, detour_factor=ELLIPSE_DETOUR_FACTOR, buffer_km=1.0, margin_km=0.0):
+        super().__init__(origin, destination)
+        self.detour_factor = detour_factor
+        self.buffer_km = buffer_km
+        self.margin_km = margin_km
+
+        self.focus_x, self.focus_y = self.project(destination.y, destination.x)
+        distance_km = float(np.hypot(self.focus_x, self.focus_y))
+        self.max_sum_km = detour_factor * distance_km + 2 * margin_km
+
+    def envelope(self):
+        # Todos os pontos estão a menos do semieixo maior (ou do raio dos
+        # círculos mais metade da distância) do centro
+        radius_km = max(self.max_sum_km / 2, float(np.hypot(self.focus_x, self.focus_y)) / 2 + self.buffer_km)
+        center_lat = (self.origin.y + self.destination.y) / 2
+        center_lon = (self.origin.x + self.destination.x) / 2
+        d_lat = radius_km / KM_PER_DEG
+        d_lon = radius_km / (KM_PER_DEG * np.cos(np.radians(abs(center_lat) + d_lat)))
+        return (center_lat - d_lat, center_lat + d_lat, center_lon - d_lon, center_lon + d_lon)
+
+    def contains(self, lats, lons) -> np.ndarray:
+        x, y = self.project(lats, lons)
+        d_origin = np.hypot(x, y)
+        d_destination = np.hypot(x - self.focus_x, y - self.focus_y)
+        return (d_origin + d_destination <= self.max_sum_km) | (np.minimum(d_origin, d_destination) <= self.buffer_km)
+
+    def grow(self, margin_km) -> 'EllipseCorridor':
+        # Um ponto a menos de margin_km da elipse tem a soma das distâncias aos
+        # focos aumentada, no máximo, em 2 * margin_km
+        return EllipseCorridor(
+            self.origin, self.destination, self.detour_factor, self.buffer_km + margin_km, self.margin_km + margin_km
+        )
+
+
+class LineCorridor(Corridor):
+    """
+    Faixa à volta de uma linha (a reta origem-destino ou o traçado de uma
+    rota, como uma lista de shapely Point): os pontos a menos de
+    buffer_km + buffer_ratio * comprimento da linha de algum dos seus troços.
+    """
+
+    def __init__(self, origin, destination, buffer_km=1.0, buffer_ratio=LINE_BUFFER_RATIO, via=()):
+        super().__init__(origin, destination)
+        self.via = list(via)
+        self.buffer_km = buffer_km
+        self.buffer_ratio = buffer_ratio
+
+        points = [origin] + self.via + [destination]
+        self.x, self.y = self.project([p.y for p in points], [p.x for p in points])
+        length_km = float(np.hypot(np.diff(self.x), np.diff(self.y)).sum())
+        self.width_km = buffer_km + buffer_ratio * length_km
+
+        self.lats = np.array([p.y for p in points])
+        self.lons = np.array([p.x for p in points])
+
+    def envelope(self):
+        d_lat = self.width_km / KM_PER_DEG
+        d_lon = self.width_km / (KM_PER_DEG * np.cos(np.radians(np.abs(self.lats).max() + d_lat)))
+        return (self.lats.min() - d_lat, self.lats.max() + d_lat, self.lons.min() - d_lon, self.lons.max() + d_lon)
+
+    def contains(self, lats, lons) -> np.ndarray:
+        x, y = self.project(lats, lons)
+        x, y = x[:, None], y[:, None]
+
+        # Distância de cada ponto a cada troço (projeção limitada ao segmento)
+        x0, y0 = self.x[:-1], self.y[:-1]
+        dx, dy = np.diff(self.x), np.diff(self.y)
+        length_sq = np.maximum(dx * dx + dy * dy, 1e-12)
+        t = np.clip(((x - x0) * dx + (y - y0) * dy) / length_sq, 0.0, 1.0)
+        distance = np.hypot(x - (x0 + t * dx), y - (y0 + t * dy))
+
+        return distance.min(axis=1) <= self.width_km
+
+    def grow(self, margin_km) -> 'LineCorridor':
+        return LineCorridor(self.origin, self.destination, self.buffer_km + margin_km, self.buffer_ratio, self.via)
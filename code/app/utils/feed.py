@@ -1,82 +1,249 @@
 import os
 import sys
+import logging
 module_path = os.path.abspath(os.path.join('..'))
 if module_path not in sys.path:
     sys.path.append(module_path)
 
-import pandas as pd
-import gtfs_kit as gk
+import numpy as np
 
+from app.utils.co2 import CO2_METRO_GPKM, CO2_STCP_GPKM
+from app.utils.service_calendar import ServiceCalendar, to_service_date
+from app.utils.corridor import BoxCorridor
+from app.utils.registry import FeedRegistry, intern_feed_ids
+from app.utils.spatial import GridIndex
+from app.utils.stop_times import StopTimesIndex, StopTimesByStop
 
-FEED_METRO = gk.read_feed(f"{module_path}/feeds/gtfs_metro", dist_units="km")
-FEED_STCP = gk.read_feed(f"{module_path}/feeds/gtfs_stcp", dist_units="km")
+logger = logging.getLogger(__name__)
 
+# Operadores do planeador (a ordem de registo define o código de cada um)
+FEED_REGISTRY = FeedRegistry()
+FEED_REGISTRY.register('METRO', f"{module_path}/feeds/gtfs_metro", co2_gpkm=CO2_METRO_GPKM)
+FEED_REGISTRY.register('STCP', f"{module_path}/feeds/gtfs_stcp", co2_gpkm=CO2_STCP_GPKM)
 
-def get_filtered_multimodal_feed(geo_origem, geo_destino, buffer_km=1.0):
+
+def load_feed(prefix):
     """
-    Combina e filtra dois feeds (Metro e STCP) concatenando os DataFrames do Pandas
-    e garantindo a unicidade dos IDs com prefixos.
+    Feed do operador, lido na primeira utilização (uma vez por processo)
+    através da cache colunar (IDs já prefixados e horas em segundos).
     """
-    # 1. Definir a Bounding Box
-    lat_min = min(geo_origem.y, geo_destino.y) - (buffer_km / 111.0)
-    lat_max = max(geo_origem.y, geo_destino.y) + (buffer_km / 111.0)
-    lon_min = min(geo_origem.x, geo_destino.x) - (buffer_km / 111.0)
-    lon_max = max(geo_origem.x, geo_destino.x) + (buffer_km / 111.0)
+    return FEED_REGISTRY.load(prefix)
+
+
+def __getattr__(name):
+    # FEED_METRO, FEED_STCP, ... só são lidos quando alguém os usa (importar o
+    # módulo não lê nenhum feed)
+    prefix = name.removeprefix('FEED_')
+    if name.startswith('FEED_') and prefix in FEED_REGISTRY:
+        return load_feed(prefix)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_service_calendar(feed) -> ServiceCalendar:
+    """Calendário de serviços do feed, construído uma vez e guardado no próprio feed."""
+    calendar = getattr(feed, 'service_calendar', None)
+    if calendar is None:
+        calendar = ServiceCalendar.from_feed(feed)
+        feed.service_calendar = calendar
+    return calendar
+
+
+def get_stop_times_index(feed) -> StopTimesIndex:
+    """Índice temporal dos stop_times do feed, construído uma vez e guardado no próprio feed."""
+    index = getattr(feed, 'stop_times_index', None)
+    if index is None:
+        index = StopTimesIndex(feed.stop_times)
+        feed.stop_times_index = index
+    return index
+
+
+def get_stop_grid(feed) -> GridIndex:
+    """Índice em grelha das paragens do feed (posições em feed.stops), guardado no próprio feed."""
+    grid = getattr(feed, 'stop_grid', None)
+    if grid is None:
+        grid = GridIndex(feed.stops['stop_lat'].to_numpy(), feed.stops['stop_lon'].to_numpy())
+        feed.stop_grid = grid
+    return grid
 
-    def prepare_sub_df(feed, prefix):
-        # Filtrar paragens geograficamente
-        m_stops = (feed.stops.stop_lat >= lat_min) & (feed.stops.stop_lat <= lat_max) & \
-                  (feed.stops.stop_lon >= lon_min) & (feed.stops.stop_lon <= lon_max)
 
-        stops_df = feed.stops[m_stops].copy()
-        relevant_stops = set(stops_df['stop_id'])
+def get_stop_times_by_stop(feed) -> StopTimesByStop:
+    """stop_times do feed agrupados por paragem (ver StopTimesByStop), guardados no próprio feed."""
+    by_stop = getattr(feed, 'stop_times_by_stop', None)
+    if by_stop is None:
+        by_stop = StopTimesByStop(feed.stops, feed.stop_times, get_stop_times_index(feed))
+        feed.stop_times_by_stop = by_stop
+    return by_stop
 
-        # Filtrar stop_times e trips que passam nestas paragens
-        st_df = feed.stop_times[feed.stop_times['stop_id'].isin(relevant_stops)].copy()
-        relevant_trips = set(st_df['trip_id'])
 
-        trips_df = feed.trips[feed.trips['trip_id'].isin(relevant_trips)].copy()
-        relevant_routes = set(trips_df['route_id'])
+def prepare_sub_df(feed, prefix, bbox=None, service_date=None, time_window=None, corridor=None):
+    """
+    Extrai as tabelas relevantes de um feed, opcionalmente limitadas a uma
+    Bounding Box (lat_min, lat_max, lon_min, lon_max) ou a um corredor (Corridor,
+    por exemplo EllipseCorridor), e aplica o prefixo do operador (exceto se o
+    feed já o tiver, como os lidos de read_feed_cached).
+
+    Com service_date (date, "YYYYMMDD" ou "YYYY-MM-DD"), mantém só as viagens
+    dos serviços ativos nesse dia (calendar.txt e exceções de calendar_dates.txt).
 
-        routes_df = feed.routes[feed.routes['route_id'].isin(relevant_routes)].copy()
+    Com time_window (início, fim) em segundos, mantém só os stop_times dentro
+    desse horizonte, cortados por pesquisa binária nas linhas de cada paragem
+    (ver StopTimesByStop).
 
-        # Aplicar Prefixos para evitar colisões entre Metro e STCP
-        # (Fundamental para o grafo não misturar as redes)
+    As tabelas levam os códigos inteiros dos IDs e o operador de cada paragem
+    (ver intern_feed_ids): os feeds lidos de um FeedRegistry já os trazem; os
+    restantes têm de ser de um operador registado em FEED_REGISTRY.
+    """
+    if getattr(feed, 'operator_code', None) is None:
+        intern_feed_ids(feed, FEED_REGISTRY.operator(prefix).code)
+
+    # Selecionar as paragens pelo índice em grelha e as suas linhas de
+    # stop_times pelas fatias pré-agrupadas por paragem (já cortadas pelo
+    # horizonte temporal), sem percorrer as tabelas completas
+    if corridor is not None:
+        stop_positions = corridor.select(get_stop_grid(feed))
+    elif bbox is not None:
+        stop_positions = get_stop_grid(feed).query_bbox(*bbox)
+    else:
+        stop_positions = np.arange(len(feed.stops))
+
+    stops_df = feed.stops.iloc[stop_positions].copy()
+    stop_times = feed.stop_times.iloc[get_stop_times_by_stop(feed).rows_for_stops(stop_positions, time_window)]
+
+    # Filtrar pelas viagens dos serviços ativos no dia da consulta
+    if service_date is not None:
+        active_services = get_service_calendar(feed).active_services(service_date)
+        active_trips = feed.trips.loc[feed.trips['service_id'].isin(active_services), 'trip_id']
+        m_active = stop_times['trip_id'].isin(active_trips)
+        report_service_date(prefix, feed, service_date, int(m_active.sum()), len(stop_times))
+        stop_times = stop_times[m_active]
+
+    st_df = stop_times.copy()
+    relevant_trips = set(st_df['trip_id'])
+
+    trips_df = feed.trips[feed.trips['trip_id'].isin(relevant_trips)].copy()
+    relevant_routes = set(trips_df['route_id'])
+
+    routes_df = feed.routes[feed.routes['route_id'].isin(relevant_routes)].copy()
+
+    # Aplicar Prefixos para evitar colisões entre operadores
+    # (Fundamental para o grafo não misturar as redes)
+    if getattr(feed, 'id_prefix', None) != prefix:
         stops_df['stop_id'] = prefix + "_" + stops_df['stop_id'].astype(str)
         st_df['stop_id'] = prefix + "_" + st_df['stop_id'].astype(str)
         st_df['trip_id'] = prefix + "_" + st_df['trip_id'].astype(str)
         trips_df['trip_id'] = prefix + "_" + trips_df['trip_id'].astype(str)
         trips_df['route_id'] = prefix + "_" + trips_df['route_id'].astype(str)
         routes_df['route_id'] = prefix + "_" + routes_df['route_id'].astype(str)
-        
-        return {
-            'stops': stops_df,
-            'stop_times': st_df,
-            'trips': trips_df,
-            'routes': routes_df
-        }
-
-    # 2. Obter dicionários de DataFrames filtrados
-    data_metro = prepare_sub_df(FEED_METRO, "METRO")
-    data_stcp = prepare_sub_df(FEED_STCP, "STCP")
-
-    # 3. Concatenar manualmente as tabelas
+
+    return {
+        'stops': stops_df,
+        'stop_times': st_df,
+        'trips': trips_df,
+        'routes': routes_df
+    }
+
+
+def report_service_date(prefix, feed, service_date, n_kept, n_total):
+    """
+    Regista (logging) quantos stop_times ficam depois do filtro por data de
+    serviço: aviso se o dia não tem serviço, informação nos restantes casos.
+    """
+    date_label = to_service_date(service_date)
+    if n_kept == 0 and n_total > 0:
+        date_range = get_service_calendar(feed).date_range()
+        coverage = f" (calendário de {date_range[0]} a {date_range[1]})" if date_range else ""
+        logger.warning("%s: nenhum serviço ativo em %s%s.", prefix, date_label, coverage)
+        return
+
+    reduction = 100 * (1 - n_kept / n_total) if n_total else 0.0
+    logger.info("%s: %d de %d stop_times ativos em %s (-%.0f%%).", prefix, n_kept, n_total, date_label, reduction)
+
+
+def merge_feeds(data_by_prefix, registry=None):
+    """
+    Concatena as tabelas já prefixadas dos operadores ({prefixo: tabelas de
+    prepare_sub_df}) num único gk.Feed. O custo depende só das tabelas
+    recebidas (get_filtered_multimodal_feed deixa de fora os operadores sem
+    paragens no corredor), não do número de operadores registados.
+    """
+    import pandas as pd
+    import gtfs_kit as gk
+
+    registry = registry or FEED_REGISTRY
+    feeds = [registry.load(prefix) for prefix in data_by_prefix]
+
+    # Concatenar manualmente as tabelas
     combined_data = {}
     for table in ['stops', 'stop_times', 'trips', 'routes']:
-        combined_data[table] = pd.concat([data_metro[table], data_stcp[table]], ignore_index=True)
+        combined_data[table] = pd.concat([data[table] for data in data_by_prefix.values()], ignore_index=True)
 
-    # 4. Criar um novo objeto Feed (usando o esqueleto de um dos originais)
+    def concat_feed_table(table):
+        frames = [getattr(feed, table) for feed in feeds if getattr(feed, table, None) is not None]
+        return pd.concat(frames, ignore_index=True) if frames else None
+
+    # Criar um novo objeto Feed (usando o esqueleto de um dos originais)
     # Nota: Criamos um feed vazio ou clonamos um para manter a estrutura do gtfs-kit
-    combined_feed = gk.Feed(
-        dist_units=FEED_METRO.dist_units,
-        agency=pd.concat([FEED_METRO.agency, FEED_STCP.agency], ignore_index=True),
+    return gk.Feed(
+        dist_units=feeds[0].dist_units,
+        agency=concat_feed_table('agency'),
         stops=combined_data['stops'],
         routes=combined_data['routes'],
         trips=combined_data['trips'],
         stop_times=combined_data['stop_times'],
-        calendar=pd.concat([FEED_METRO.calendar, FEED_STCP.calendar], ignore_index=True) if FEED_METRO.calendar is not None else None
+        calendar=concat_feed_table('calendar'),
+        calendar_dates=concat_feed_table('calendar_dates'),
     )
 
-    print(f"Fusão concluída: {len(combined_feed.stops)} paragens no corredor intermodal.")
+
+def get_filtered_multimodal_feed(
+    geo_origem, geo_destino, buffer_km=1.0, service_date=None, time_window=None, corridor=None, registry=None
+):
+    """
+    Combina e filtra os feeds dos operadores registados (por omissão
+    FEED_REGISTRY: Metro e STCP) concatenando os DataFrames do Pandas
+    e garantindo a unicidade dos IDs com prefixos.
+
+    As paragens são as do corredor indicado (ver app.utils.corridor) ou, por
+    omissão, as do retângulo que contém a origem e o destino com buffer_km de margem.
+
+    Com service_date, mantém só as viagens que circulam nesse dia e, com
+    time_window (início, fim) em segundos, só os stop_times desse horizonte
+    (ver prepare_sub_df).
+    """
+    # 1. Definir o corredor (por omissão, a Bounding Box)
+    if corridor is None:
+        corridor = BoxCorridor(geo_origem, geo_destino, buffer_km)
+
+    # 2. Obter dicionários de DataFrames filtrados. Os operadores sem paragens
+    # no corredor (consulta na grelha) não percorrem as suas tabelas
+    registry = registry or FEED_REGISTRY
+    feeds = {operator.prefix: registry.load(operator.prefix) for operator in registry}
+    in_corridor = [prefix for prefix, feed in feeds.items() if len(corridor.select(get_stop_grid(feed)))]
+    data_by_prefix = {
+        prefix: prepare_sub_df(
+            feeds[prefix], prefix, service_date=service_date, time_window=time_window, corridor=corridor
+        )
+        for prefix in in_corridor or feeds
+    }
+
+    # 3. Concatenar as tabelas num único Feed
+    combined_feed = merge_feeds(data_by_prefix, registry)
+
+    logger.info("Fusão concluída: %d paragens no corredor intermodal.", len(combined_feed.stops))
+
+    return combined_feed
+
+
+def get_multimodal_feed():
+    """
+    Combina os feeds completos dos operadores registados (Metro e STCP) de toda
+    a área metropolitana, sem filtro geográfico. Usado na construção do grafo
+    persistente da cidade.
+    """
+    data_by_prefix = {operator.prefix: prepare_sub_df(load_feed(operator.prefix), operator.prefix) for operator in FEED_REGISTRY}
+
+    combined_feed = merge_feeds(data_by_prefix)
+
+    logger.info("Fusão concluída: %d paragens na área metropolitana.", len(combined_feed.stops))
 
     return combined_feed
@@ -0,0 +1,151 @@
+import os
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from app.utils.time import times_to_seconds
+
+module_path = os.path.abspath(os.path.join('..'))
+
+FEED_CACHE_DIR = f"{module_path}/cache/feeds"
+
+# Versão do formato da cache. Incrementar sempre que o conteúdo mudar.
+FEED_CACHE_VERSION = 1
+
+# Tabelas GTFS guardadas (as que o gk.Feed aceita)
+FEED_TABLES = [
+    'agency', 'stops', 'routes', 'trips', 'stop_times', 'calendar', 'calendar_dates',
+    'fare_attributes', 'fare_rules', 'shapes', 'frequencies', 'transfers', 'feed_info', 'attributions',
+]
+
+# Colunas de IDs que levam o prefixo do operador (as mesmas de prepare_sub_df)
+PREFIXED_COLUMNS = {
+    'stops': ['stop_id'],
+    'stop_times': ['stop_id', 'trip_id'],
+    'trips': ['trip_id', 'route_id'],
+    'routes': ['route_id'],
+}
+
+
+def read_feed_cached(path, prefix, dist_units="km"):
+    """
+    Lê um feed GTFS através de uma cache colunar em disco (.npz), construída na
+    primeira leitura com gk.read_feed e identificada pelo hash dos ficheiros de
+    origem: quando o feed muda, é construída uma nova cache.
+
+    Na cache:
+    - colunas de texto guardadas como códigos inteiros + valores únicos (na
+      leitura, cada ID repetido é o mesmo objeto Python);
+    - IDs já com o prefixo do operador (feed.id_prefix; prepare_sub_df não o volta a aplicar);
+    - o hash dos ficheiros de origem em feed.source_hash (chave de outras caches, como a das transferências);
+    - stop_times com as horas em segundos (arrival_sec, departure_sec).
+    """
+    import gtfs_kit as gk
+
+    source_hash = feed_source_hash(path, prefix)
+    cache_path = f"{FEED_CACHE_DIR}/{prefix}_{source_hash}.npz"
+
+    if os.path.exists(cache_path):
+        tables = load_tables(cache_path)
+    else:
+        tables = ingest_feed(path, prefix, dist_units)
+        save_tables(tables, cache_path)
+
+    feed = gk.Feed(dist_units=dist_units, **tables)
+    feed.id_prefix = prefix
+    feed.source_hash = source_hash
+    return feed
+
+
+def feed_source_hash(path, prefix) -> str:
+    """Hash do conteúdo dos ficheiros .txt do feed (e da versão da cache e do prefixo)."""
+    digest = hashlib.sha1(f"{FEED_CACHE_VERSION}|{prefix}".encode())
+    for name in sorted(os.listdir(path)):
+        if name.endswith('.txt'):
+            digest.update(name.encode())
+            with open(os.path.join(path, name), 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def ingest_feed(path, prefix, dist_units="km"):
+    """Lê o feed com gk.read_feed e prepara as tabelas da cache (prefixos e horas em segundos)."""
+    import gtfs_kit as gk
+
+    feed = gk.read_feed(path, dist_units=dist_units)
+
+    tables = {}
+    for table in FEED_TABLES:
+        df = getattr(feed, table, None)
+        if df is None:
+            continue
+
+        df = df.copy()
+        for column in PREFIXED_COLUMNS.get(table, []):
+            df[column] = prefix + "_" + df[column].astype(str)
+
+        if table == 'stop_times':
+            df['arrival_sec'] = times_to_seconds(df['arrival_time'])
+            df['departure_sec'] = times_to_seconds(df['departure_time'])
+
+        tables[table] = df
+
+    return tables
+
+
+def save_tables(tables, cache_path):
+    """
+    Guarda as tabelas num único .npz (sem pickle): por coluna, o array de
+    valores ou, para texto, os códigos (int32) e os valores únicos.
+    """
+    arrays = {}
+    for table, df in tables.items():
+        arrays[f"{table}/__columns__"] = np.array(df.columns, dtype=str)
+        arrays[f"{table}/__dtypes__"] = np.array([str(dtype) for dtype in df.dtypes], dtype=str)
+
+        for column in df.columns:
+            series = df[column]
+            key = f"{table}/{column}"
+            if isinstance(series.dtype, pd.core.dtypes.dtypes.BaseMaskedDtype):
+                # Inteiros com valores em falta (Int32 do gtfs_kit): valores + máscara
+                arrays[key] = series.to_numpy(dtype=series.dtype.numpy_dtype, na_value=0)
+                arrays[f"{key}.mask"] = series.isna().to_numpy()
+            elif pd.api.types.is_numeric_dtype(series.dtype):
+                arrays[key] = series.to_numpy()
+            else:
+                codes, uniques = pd.factorize(series, use_na_sentinel=True)
+                arrays[f"{key}.codes"] = codes.astype(np.int32)
+                arrays[f"{key}.uniques"] = np.array([str(value) for value in uniques], dtype=str)
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    np.savez(cache_path, **arrays)
+
+
+def load_tables(cache_path):
+    """Reconstrói os DataFrames da cache com os dtypes originais do gk.read_feed."""
+    tables = {}
+    with np.load(cache_path, allow_pickle=False) as data:
+        files = set(data.files)
+        names = {key.split('/')[0] for key in files}
+        for table in names:
+            columns = data[f"{table}/__columns__"].tolist()
+            dtypes = data[f"{table}/__dtypes__"].tolist()
+
+            values = {}
+            for column, dtype in zip(columns, dtypes):
+                key = f"{table}/{column}"
+                if f"{key}.codes" in files:
+                    codes = data[f"{key}.codes"]
+                    # Valores únicos como objetos Python (um por valor distinto), com NA no código -1
+                    uniques = np.append(data[f"{key}.uniques"].astype(object), pd.NA)
+                    values[column] = pd.array(uniques[codes], dtype=dtype)
+                elif f"{key}.mask" in files:
+                    array_type = pd.api.types.pandas_dtype(dtype).construct_array_type()
+                    values[column] = array_type(data[key], data[f"{key}.mask"])
+                else:
+                    values[column] = data[key]
+
+            tables[table] = pd.DataFrame(values, columns=columns)
+
+    return tables
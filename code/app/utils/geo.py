@@ -1,20 +1,83 @@
-import osmnx as ox
+import numpy as np
 
-from shapely.geometry import Point
-from geopy.distance import geodesic
+# Raio médio da Terra (IUGG), em metros
+EARTH_RADIUS_M = 6371008.8
 
+# Erro relativo máximo da haversine (esfera) face à geodésica WGS84 (geopy):
+# - área do Porto (lat 40.9-41.5, distâncias de 10 m a 60 km): entre -0.26% e +0.13%;
+# - qualquer par de pontos do globo: até 0.55%.
+# Quem precisa de um minorante (heurísticas admissíveis) deve multiplicar a
+# distância por (1 - HAVERSINE_MAX_REL_ERROR).
+HAVERSINE_MAX_REL_ERROR = 0.0055
+
+
+def get_geocode_by_address(address, city="Porto, Portugal", use_gazetteer=True, use_cache=True):
+    """
+    Coordenadas de uma morada (shapely Point). Por ordem:
+    1. gazetteer offline (nomes de paragens e ruas não ambíguos da cidade,
+       ver get_gazetteer);
+    2. cache persistente das respostas anteriores (ver GeocodeCache);
+    3. Nominatim (ox.geocode), guardando a resposta na cache.
+    """
+    from shapely.geometry import Point
+    from app.utils.geocode import get_gazetteer, get_geocode_cache
+
+    if use_gazetteer:
+        place = get_gazetteer().lookup(address, city)
+        if place is not None:
+            return Point(place[1], place[0])
+
+    query = address + ", " + city
+    if use_cache:
+        cached = get_geocode_cache().get(query)
+        if cached is not None:
+            return Point(cached[1], cached[0])
+
+    import osmnx as ox
 
-def get_geocode_by_address(address, city="Porto, Portugal") -> Point:
     try:
-        point = ox.geocode(address + ", " + city)
-        return Point(point[1], point[0])
+        point = ox.geocode(query)
     except:
         raise ValueError(f"Não foi possivel encontrar: {address}")
 
+    if use_cache:
+        get_geocode_cache().put(query, point[0], point[1])
+    return Point(point[1], point[0])
+
 
-def get_km_distance(origin: Point, destination: Point):
+def get_km_distance(origin, destination):
+    from geopy.distance import geodesic
     return geodesic((origin.y, origin.x), (destination.y, destination.x)).km
 
 
-def get_m_distance(origin: Point, destination: Point):
+def get_m_distance(origin, destination):
+    from geopy.distance import geodesic
     return geodesic((origin.y, origin.x), (destination.y, destination.x)).m
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """
+    Distância haversine em metros. Aceita escalares ou arrays (com broadcasting
+    NumPy), pelo que serve tanto para pares como para vetores de coordenadas.
+    Ver HAVERSINE_MAX_REL_ERROR para o erro face à geodésica.
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def get_m_distances_one_to_many(lat, lon, lats, lons) -> np.ndarray:
+    """Distâncias (m) de um ponto (lat, lon) a um vetor de pontos."""
+    return haversine_m(lat, lon, np.asarray(lats), np.asarray(lons))
+
+
+def get_m_distances_pairwise(lats1, lons1, lats2, lons2) -> np.ndarray:
+    """
+    Matriz de distâncias (m) entre dois conjuntos de pontos:
+    resultado[i, j] = distância entre (lats1[i], lons1[i]) e (lats2[j], lons2[j]).
+    """
+    lats1, lons1 = np.asarray(lats1)[:, None], np.asarray(lons1)[:, None]
+    lats2, lons2 = np.asarray(lats2)[None, :], np.asarray(lons2)[None, :]
+
+    return haversine_m(lats1, lons1, lats2, lons2)
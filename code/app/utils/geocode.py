@@ -0,0 +1,210 @@
+import os
+import math
+import re
+import sqlite3
+import time
+import unicodedata
+from collections import defaultdict
+from difflib import get_close_matches
+from functools import lru_cache
+
+module_path = os.path.abspath(os.path.join('..'))
+
+# Cache persistente das respostas do geocodificador (Nominatim)
+GEOCODE_CACHE_PATH = f"{module_path}/cache/geocode.sqlite"
+GEOCODE_TTL_DAYS = 90
+GEOCODE_MAX_ENTRIES = 10000
+
+# Semelhança mínima (difflib) para aceitar um nome aproximado do gazetteer
+GAZETTEER_FUZZY_CUTOFF = 0.85
+
+# Distância máxima (m) de um ponto de um nome à posição média: nomes mais
+# dispersos (paragens homónimas em zonas diferentes, ruas longas) são
+# ambíguos e ficam para a cache/Nominatim
+GAZETTEER_MAX_SPREAD_M = 500
+
+# Cidades (argumento city de get_geocode_by_address) cobertas pelo gazetteer
+GAZETTEER_CITIES = ("Porto, Portugal",)
+
+
+def normalize_name(text: str) -> str:
+    """Minúsculas, sem acentos nem pontuação e com espaços simples ("Casa da Música" -> "casa da musica")."""
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text).split())
+
+
+class GeocodeCache:
+    """
+    Cache em disco (SQLite) das coordenadas de cada morada, com validade
+    (ttl_days) e limite de entradas: ao exceder max_entries, são removidas as
+    entradas usadas há mais tempo (LRU).
+    """
+
+    def __init__(self, path: str = GEOCODE_CACHE_PATH, ttl_days=GEOCODE_TTL_DAYS, max_entries=GEOCODE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_sec = ttl_days * 86400
+        self.max_entries = max_entries
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            "query TEXT PRIMARY KEY, lat REAL, lon REAL, created_at REAL, last_used REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS geocode_last_used ON geocode (last_used)")
+        self.conn.commit()
+
+    def get(self, query):
+        """(lat, lon) em cache para a consulta, ou None se não existir ou tiver expirado."""
+        row = self.conn.execute(
+            "SELECT lat, lon, created_at FROM geocode WHERE query = ?", (query,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        now = time.time()
+        lat, lon, created_at = row
+        if now - created_at > self.ttl_sec:
+            self.conn.execute("DELETE FROM geocode WHERE query = ?", (query,))
+            self.conn.commit()
+            return None
+
+        self.conn.execute("UPDATE geocode SET last_used = ? WHERE query = ?", (now, query))
+        self.conn.commit()
+        return lat, lon
+
+    def put(self, query, lat, lon):
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO geocode (query, lat, lon, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+            (query, lat, lon, now, now)
+        )
+
+        # Despejo LRU: manter só as max_entries usadas mais recentemente
+        self.conn.execute(
+            "DELETE FROM geocode WHERE query NOT IN "
+            "(SELECT query FROM geocode ORDER BY last_used DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+        self.conn.commit()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+
+
+class Gazetteer:
+    """
+    Dicionário offline de nomes de lugares -> (lat, lon), construído a partir
+    dos stop_name do GTFS e dos nomes das ruas de uma rede pedonal OSM.
+
+    Os nomes são normalizados (normalize_name); nomes repetidos (paragens nos
+    dois sentidos, troços da mesma rua) ficam com a média das coordenadas se
+    todos os pontos estiverem a menos de max_spread_m dela. Os restantes são
+    ambíguos (por exemplo paragens homónimas a vários km): lookup devolve
+    None e a morada segue para a cache e o Nominatim.
+
+    Uma consulta exata é uma pesquisa num dicionário; se falhar, é usada a
+    correspondência aproximada do difflib (resultado guardado em memória),
+    só quando há um único nome acima do limiar e este não é ambíguo, e
+    nunca em moradas com números (porta, código postal), que precisam de
+    mais precisão do que o centro de uma rua. Só responde a consultas das
+    cidades que cobre (cities).
+    """
+
+    def __init__(self, max_spread_m=GAZETTEER_MAX_SPREAD_M, cities=GAZETTEER_CITIES):
+        self.max_spread_m = max_spread_m
+        self.cities = {normalize_name(city) for city in cities}
+        self._points = defaultdict(list)
+        self.places = {}
+        self.ambiguous = set()
+
+    def add(self, name, lat, lon):
+        key = normalize_name(name)
+        if key:
+            self._points[key].append((lat, lon))
+
+    def add_stops(self, stops):
+        """Paragens de um DataFrame GTFS (stop_name, stop_lat, stop_lon)."""
+        for name, lat, lon in stops[['stop_name', 'stop_lat', 'stop_lon']].itertuples(index=False):
+            self.add(name, lat, lon)
+
+    def add_street_graph(self, G_walk):
+        """Ruas com nome de uma rede OSM (posição = média dos nós da rua)."""
+        for u, v, name in G_walk.edges(data='name'):
+            if not name:
+                continue
+            for street in (name if isinstance(name, list) else [name]):
+                for node in (u, v):
+                    data = G_walk.nodes[node]
+                    self.add(street, data['y'], data['x'])
+
+    def build(self) -> 'Gazetteer':
+        """Calcula a posição de cada nome (depois de todas as chamadas a add)."""
+        self.places = {}
+        self.ambiguous = set()
+        for key, points in self._points.items():
+            lat = sum(p[0] for p in points) / len(points)
+            lon = sum(p[1] for p in points) / len(points)
+            if max(spread_m(lat, lon, p[0], p[1]) for p in points) <= self.max_spread_m:
+                self.places[key] = (lat, lon)
+            else:
+                self.ambiguous.add(key)
+
+        # Os nomes ambíguos entram na correspondência aproximada para que um
+        # nome parecido com um deles também seja tratado como ambíguo
+        self._names = list(self.places) + list(self.ambiguous)
+        self.lookup.cache_clear()
+        return self
+
+    @lru_cache(maxsize=4096)
+    def lookup(self, name, city=None):
+        """
+        (lat, lon) do nome (exato ou aproximado), ou None se não for conhecido,
+        for ambíguo ou city não for uma das cidades cobertas.
+        """
+        if city is not None and normalize_name(city) not in self.cities:
+            return None
+
+        key = normalize_name(name)
+        if key in self.places:
+            return self.places[key]
+        if key in self.ambiguous or any(c.isdigit() for c in key):
+            return None
+
+        matches = get_close_matches(key, self._names, n=2, cutoff=GAZETTEER_FUZZY_CUTOFF)
+        if len(matches) != 1:
+            return None
+        return self.places.get(matches[0])
+
+
+def spread_m(lat1, lon1, lat2, lon2):
+    """Distância aproximada (m, equiretangular) entre dois pontos próximos."""
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return 6371000.0 * math.hypot(x, y)
+
+
+@lru_cache(maxsize=None)
+def get_geocode_cache() -> GeocodeCache:
+    return GeocodeCache()
+
+
+@lru_cache(maxsize=None)
+def get_gazetteer() -> Gazetteer:
+    """
+    Gazetteer das paragens dos operadores registados (Metro, STCP, ...) e, se
+    existir a rede pedonal local (STREET_GRAPH_PATH), das suas ruas. Construído
+    uma vez por processo.
+    """
+    from app.utils.feed import FEED_REGISTRY
+    from app.utils.street import STREET_GRAPH_PATH, StreetGraphStore
+
+    gazetteer = Gazetteer()
+    for operator in FEED_REGISTRY:
+        gazetteer.add_stops(FEED_REGISTRY.load(operator.prefix).stops)
+    if os.path.exists(STREET_GRAPH_PATH):
+        gazetteer.add_street_graph(StreetGraphStore.load(STREET_GRAPH_PATH).G)
+
+    return gazetteer.build()
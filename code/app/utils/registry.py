@@ -0,0 +1,129 @@
+import numpy as np
+
+# Bits da posição na tabela do operador nos códigos globais (stop_code,
+# trip_code, route_code): código = operador << LOCAL_BITS | posição
+LOCAL_BITS = 32
+
+
+class Operator:
+    """Operador de um feed GTFS: código inteiro, prefixo dos IDs, pasta e emissões (g CO2/km)."""
+
+    def __init__(self, code, prefix, path, co2_gpkm):
+        self.code = code
+        self.prefix = prefix
+        self.path = path
+        self.co2_gpkm = co2_gpkm
+
+    def __repr__(self):
+        return f"Operator({self.code}, {self.prefix!r})"
+
+
+class FeedRegistry:
+    """
+    Registo dos operadores (feeds GTFS) do planeador, por ordem de registo.
+
+    Cada operador recebe um código inteiro (a sua posição no registo) e o seu
+    feed é lido na primeira utilização (load), uma vez por processo. As
+    paragens, viagens e linhas do feed recebem códigos inteiros globais
+    (intern_feed_ids), a partir dos quais o operador é um deslocamento de
+    bits em vez de separar o prefixo do ID ("METRO_5706".split('_')).
+
+    Um novo operador (por exemplo comboios da CP) só precisa de ser registado:
+        FEED_REGISTRY.register("CP", f"{module_path}/feeds/gtfs_cp", co2_gpkm=...)
+    """
+
+    def __init__(self):
+        self.operators = []
+        self._by_prefix = {}
+        self._feeds = {}
+
+    def register(self, prefix, path=None, co2_gpkm=0.0, feed=None) -> Operator:
+        """
+        Regista um operador. path é a pasta do feed GTFS (lida com a cache
+        colunar); em alternativa, feed é um feed já lido, com os IDs prefixados.
+        """
+        if prefix in self._by_prefix:
+            raise ValueError(f"Operador {prefix} já registado.")
+        if '_' in prefix:
+            raise ValueError(f"Prefixo {prefix!r} inválido: '_' separa o prefixo do ID.")
+        if len(self.operators) >= 2 ** (63 - LOCAL_BITS):
+            raise ValueError("Demasiados operadores registados.")
+
+        operator = Operator(len(self.operators), prefix, path, co2_gpkm)
+        self.operators.append(operator)
+        self._by_prefix[prefix] = operator
+        if feed is not None:
+            intern_feed_ids(feed, operator.code)
+            self._feeds[prefix] = feed
+        return operator
+
+    def __contains__(self, prefix):
+        return prefix in self._by_prefix
+
+    def __iter__(self):
+        return iter(self.operators)
+
+    def __len__(self):
+        return len(self.operators)
+
+    def operator(self, prefix) -> Operator:
+        operator = self._by_prefix.get(prefix)
+        if operator is None:
+            raise KeyError(f"Operador {prefix} não registado (registados: {', '.join(self._by_prefix)}).")
+        return operator
+
+    def load(self, prefix):
+        """Feed do operador, lido na primeira utilização (IDs prefixados e códigos inteiros)."""
+        feed = self._feeds.get(prefix)
+        if feed is None:
+            from app.utils.feed_cache import read_feed_cached
+
+            operator = self.operator(prefix)
+            feed = read_feed_cached(operator.path, prefix, dist_units="km")
+            intern_feed_ids(feed, operator.code)
+            self._feeds[prefix] = feed
+        return feed
+
+    def prefixes(self) -> np.ndarray:
+        """Prefixo de cada operador, indexado pelo código (prefixes()[operator])."""
+        return np.array([operator.prefix for operator in self.operators], dtype=object)
+
+    def co2_gpkm(self) -> np.ndarray:
+        """Emissões (g CO2/km) de cada operador, indexadas pelo código."""
+        return np.array([operator.co2_gpkm for operator in self.operators], dtype=np.float64)
+
+
+def operator_of(codes):
+    """Código do operador de códigos globais (stop_code, trip_code ou route_code)."""
+    return np.asarray(codes, dtype=np.int64) >> LOCAL_BITS
+
+
+def intern_feed_ids(feed, operator_code):
+    """
+    Acrescenta às tabelas do feed os códigos inteiros globais dos IDs
+    (operator << LOCAL_BITS | posição da paragem/viagem/linha na sua tabela)
+    e a coluna operator das paragens. Feito uma vez por feed (feed.operator_code).
+    """
+    import pandas as pd
+
+    if getattr(feed, 'operator_code', None) == operator_code:
+        return
+
+    base = np.int64(operator_code) << LOCAL_BITS
+
+    def codes(ids, table_ids):
+        positions = pd.Index(table_ids).get_indexer(ids)
+        return np.where(positions >= 0, base | positions, -1)
+
+    stops, trips, routes = feed.stops, feed.trips, feed.routes
+    stops['operator'] = np.full(len(stops), operator_code, dtype=np.int16)
+    stops['stop_code'] = base | np.arange(len(stops), dtype=np.int64)
+    routes['route_code'] = base | np.arange(len(routes), dtype=np.int64)
+    trips['trip_code'] = base | np.arange(len(trips), dtype=np.int64)
+    trips['route_code'] = codes(trips['route_id'], routes['route_id'])
+
+    if feed.stop_times is not None:
+        feed.stop_times['stop_code'] = codes(feed.stop_times['stop_id'], stops['stop_id'])
+        feed.stop_times['trip_code'] = codes(feed.stop_times['trip_id'], trips['trip_id'])
+
+    feed.operator_code = operator_code
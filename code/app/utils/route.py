@@ -1,19 +1,71 @@
-def find_next_departure_cost(current_time_sec: int, connections: list):
+import numpy as np
+
+
+class Connections:
+    """
+    Ligações (partidas) de uma aresta de trânsito guardadas em arrays paralelos,
+    ordenados por hora de partida.
+
+    trip_ids e route_ids são tabelas partilhadas por todas as arestas do grafo;
+    trip_idx indexa essas tabelas, evitando guardar strings por ligação.
+    """
+    __slots__ = ('departure_sec', 'travel_time_sec', 'trip_idx', 'co2_cost_g', 'distance_m', 'trip_ids', 'route_ids')
+
+    def __init__(self, departure_sec, travel_time_sec, trip_idx, co2_cost_g, distance_m, trip_ids, route_ids):
+        self.departure_sec = departure_sec
+        self.travel_time_sec = travel_time_sec
+        self.trip_idx = trip_idx
+        self.co2_cost_g = co2_cost_g
+        self.distance_m = distance_m
+        self.trip_ids = trip_ids
+        self.route_ids = route_ids
+
+    def __len__(self):
+        return len(self.departure_sec)
+
+
+def find_next_departure_cost(current_time_sec: int, connections: Connections):
     """
-    Procura a próxima viagem disponível numa aresta de trânsito.
+    Procura a próxima viagem disponível numa aresta de trânsito (pesquisa binária).
     Retorna: (tempo_total_ate_chegada, tempo_de_viagem, custo_co2, trip_id)
     """
-    # Nota: Se 'connections' estiver ordenado por departure_sec, 
-    # podemos usar bisect para ser ainda mais rápido.
-    for conn in connections:
-        if conn['departure_sec'] >= current_time_sec:
-            wait_time = conn['departure_sec'] - current_time_sec
-            travel_time = conn['travel_time_sec']
-            total_time_on_edge = wait_time + travel_time
-            
-            return total_time_on_edge, travel_time, conn['co2_cost_g'], conn['trip_id']
-            
-    return float('inf'), 0, 0.0, None
+    i = int(connections.departure_sec.searchsorted(current_time_sec))
+    if i == len(connections):
+        return float('inf'), 0, 0.0, None
+
+    # .item() devolve escalares Python (aritmética mais rápida que escalares NumPy)
+    departure_sec = connections.departure_sec.item(i)
+    travel_time = connections.travel_time_sec.item(i)
+    wait_time = departure_sec - current_time_sec
+    total_time_on_edge = wait_time + travel_time
+
+    trip_id = connections.trip_ids[connections.trip_idx.item(i)]
+    return total_time_on_edge, travel_time, connections.co2_cost_g.item(i), trip_id
+
+def find_next_departures(current_times_sec, connections: Connections):
+    """
+    Versão em lote de find_next_departure_cost: responde à próxima partida para
+    vários instantes de chegada à paragem de uma só vez.
+
+    Retorna arrays (tempo_total_ate_chegada, tempo_de_viagem, custo_co2, trip_idx),
+    com inf / -1 quando já não há partidas.
+    """
+    current_times_sec = np.asarray(current_times_sec)
+
+    if len(connections) == 0:
+        total_time = np.full(current_times_sec.shape, np.inf)
+        return total_time, np.zeros_like(total_time), np.zeros_like(total_time), np.full(current_times_sec.shape, -1)
+
+    idx = connections.departure_sec.searchsorted(current_times_sec)
+    available = idx < len(connections)
+    safe_idx = np.where(available, idx, 0)
+
+    travel_time = np.where(available, connections.travel_time_sec[safe_idx], 0)
+    total_time = np.where(available, connections.departure_sec[safe_idx] - current_times_sec + travel_time, np.inf)
+    co2_cost = np.where(available, connections.co2_cost_g[safe_idx], 0.0)
+    trip_idx = np.where(available, connections.trip_idx[safe_idx], -1)
+
+    return total_time, travel_time, co2_cost, trip_idx
 
 def get_edge_costs(data, current_time_sec):
     """
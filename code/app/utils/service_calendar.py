@@ -0,0 +1,70 @@
+from datetime import date, datetime
+
+# Colunas de calendar.txt por dia da semana (date.weekday(): 0 = segunda-feira)
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+
+def to_service_date(value) -> str:
+    """Data de serviço no formato GTFS (YYYYMMDD) a partir de date/datetime, "YYYYMMDD" ou "YYYY-MM-DD"."""
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y%m%d')
+
+    text = str(value).replace('-', '')
+    datetime.strptime(text, '%Y%m%d')  # valida a data
+    return text
+
+
+class ServiceCalendar:
+    """
+    Serviços (service_id) ativos em cada data, segundo calendar.txt (dias da
+    semana entre start_date e end_date) e as exceções de calendar_dates.txt
+    (1 = serviço adicionado, 2 = serviço removido nessa data).
+
+    As tabelas são lidas uma vez para estruturas Python; o conjunto de
+    serviços de cada data é calculado na primeira consulta e guardado.
+    """
+
+    def __init__(self, calendar=None, calendar_dates=None):
+        self.services = []
+        if calendar is not None:
+            days = calendar[WEEKDAYS].fillna(0).astype(int).to_numpy()
+            for service_id, start, end, row in zip(calendar['service_id'], calendar['start_date'], calendar['end_date'], days):
+                self.services.append((service_id, str(start), str(end), tuple(bool(d) for d in row)))
+
+        self.added = {}
+        self.removed = {}
+        if calendar_dates is not None:
+            for service_id, day, exception_type in calendar_dates[['service_id', 'date', 'exception_type']].itertuples(index=False):
+                target = self.added if exception_type == 1 else self.removed
+                target.setdefault(str(day), set()).add(service_id)
+
+        self._active = {}
+
+    @classmethod
+    def from_feed(cls, feed) -> 'ServiceCalendar':
+        return cls(getattr(feed, 'calendar', None), getattr(feed, 'calendar_dates', None))
+
+    def active_services(self, service_date) -> frozenset:
+        """service_id ativos na data (date, "YYYYMMDD" ou "YYYY-MM-DD")."""
+        key = to_service_date(service_date)
+        active = self._active.get(key)
+        if active is not None:
+            return active
+
+        weekday = datetime.strptime(key, '%Y%m%d').weekday()
+        active = {
+            service_id for service_id, start, end, days in self.services
+            if days[weekday] and start <= key <= end
+        }
+        active |= self.added.get(key, set())
+        active -= self.removed.get(key, set())
+
+        active = frozenset(active)
+        self._active[key] = active
+        return active
+
+    def date_range(self):
+        """(primeira, última) data coberta pelo calendário, ou None se estiver vazio."""
+        dates = [d for _, start, end, _ in self.services for d in (start, end)]
+        dates += list(self.added)
+        return (min(dates), max(dates)) if dates else None
@@ -0,0 +1,60 @@
+import numpy as np
+
+# Lado de cada célula da grelha (graus; ~1.1 km de latitude e ~0.8 km de longitude no Porto)
+GRID_CELL_DEG = 0.01
+
+
+class GridIndex:
+    """
+    Índice espacial em grelha regular (lat, lon) de um conjunto de pontos,
+    por exemplo as paragens de um feed.
+
+    Os pontos ficam ordenados por célula (linha a linha), com o início de cada
+    célula em offsets (formato CSR). As células de uma linha da grelha são
+    contíguas, pelo que uma bbox corresponde a uma fatia por linha; só os
+    pontos dessas fatias são comparados com os limites exatos.
+    """
+
+    def __init__(self, lats, lons, cell_deg=GRID_CELL_DEG):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.cell_deg = cell_deg
+
+        rows = np.floor(self.lats / cell_deg).astype(np.int64)
+        cols = np.floor(self.lons / cell_deg).astype(np.int64)
+        self.row0 = int(rows.min()) if len(rows) else 0
+        self.col0 = int(cols.min()) if len(cols) else 0
+        self.n_rows = int(rows.max()) - self.row0 + 1 if len(rows) else 0
+        self.n_cols = int(cols.max()) - self.col0 + 1 if len(cols) else 0
+
+        cells = (rows - self.row0) * self.n_cols + (cols - self.col0)
+        self.order = np.argsort(cells, kind='stable')
+        self.offsets = np.searchsorted(cells[self.order], np.arange(self.n_rows * self.n_cols + 1))
+
+    def __len__(self):
+        return len(self.order)
+
+    def query_bbox(self, lat_min, lat_max, lon_min, lon_max) -> np.ndarray:
+        """Posições (por ordem crescente) dos pontos dentro da bbox."""
+        return self.filter(self.candidates_bbox(lat_min, lat_max, lon_min, lon_max), lat_min, lat_max, lon_min, lon_max)
+
+    def candidates_bbox(self, lat_min, lat_max, lon_min, lon_max) -> np.ndarray:
+        """Posições dos pontos nas células que intersetam a bbox (superconjunto da bbox)."""
+        r0 = max(int(np.floor(lat_min / self.cell_deg)) - self.row0, 0)
+        r1 = min(int(np.floor(lat_max / self.cell_deg)) - self.row0, self.n_rows - 1)
+        c0 = max(int(np.floor(lon_min / self.cell_deg)) - self.col0, 0)
+        c1 = min(int(np.floor(lon_max / self.cell_deg)) - self.col0, self.n_cols - 1)
+        if r0 > r1 or c0 > c1:
+            return np.empty(0, dtype=np.int64)
+
+        slices = [
+            self.order[self.offsets[r * self.n_cols + c0]:self.offsets[r * self.n_cols + c1 + 1]]
+            for r in range(r0, r1 + 1)
+        ]
+        return np.concatenate(slices)
+
+    def filter(self, positions, lat_min, lat_max, lon_min, lon_max) -> np.ndarray:
+        """Posições (por ordem crescente) de positions que estão dentro da bbox."""
+        lats, lons = self.lats[positions], self.lons[positions]
+        inside = (lats >= lat_min) & (lats <= lat_max) & (lons >= lon_min) & (lons <= lon_max)
+        return np.sort(positions[inside])
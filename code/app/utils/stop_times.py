@@ -0,0 +1,89 @@
+import numpy as np
+
+from app.utils.time import times_to_seconds
+
+
+class StopTimesIndex:
+    """
+    Índice temporal de uma tabela stop_times: as linhas ordenadas por hora de
+    partida (departure_sec), para que o corte por horizonte temporal seja uma
+    pesquisa binária (np.searchsorted) em vez de uma comparação linha a linha.
+
+    rows_between(start, end) devolve as posições (iloc) das linhas que partem
+    em [start, end + max_dwell_sec]: a margem max_dwell_sec (maior paragem de
+    um veículo numa estação) mantém as chegadas até end cuja partida seguinte
+    já é posterior, e com elas o último segmento dentro do horizonte.
+    """
+
+    def __init__(self, stop_times):
+        if 'departure_sec' in stop_times.columns and 'arrival_sec' in stop_times.columns:
+            departure = stop_times['departure_sec'].to_numpy(dtype=np.int64)
+            arrival = stop_times['arrival_sec'].to_numpy(dtype=np.int64)
+        else:
+            departure = times_to_seconds(stop_times['departure_time'])
+            arrival = times_to_seconds(stop_times['arrival_time'])
+
+        self.order = np.argsort(departure, kind='stable')
+        self.departure_sec = departure[self.order]
+        self.max_dwell_sec = int((departure - arrival).max()) if len(departure) else 0
+
+    def __len__(self):
+        return len(self.order)
+
+    def rows_between(self, start_sec, end_sec) -> np.ndarray:
+        """Posições (iloc, por ordem original) das linhas dentro do horizonte [start_sec, end_sec]."""
+        lo = np.searchsorted(self.departure_sec, start_sec, side='left')
+        hi = np.searchsorted(self.departure_sec, end_sec + self.max_dwell_sec, side='right')
+        return np.sort(self.order[lo:hi])
+
+
+class StopTimesByStop:
+    """
+    stop_times agrupados por paragem: as linhas ordenadas por (paragem, hora
+    de partida), numa única chave inteira (posição da paragem em stops <<
+    TIME_BITS | departure_sec). As linhas de um conjunto de paragens (por
+    exemplo as de um corredor, ver GridIndex) são a concatenação das fatias
+    de cada paragem, sem percorrer a tabela completa; com um horizonte
+    temporal, cada fatia é cortada pela mesma pesquisa binária.
+    """
+
+    # Bits reservados à hora de partida na chave (2^20 s > 290 h)
+    TIME_BITS = 20
+
+    def __init__(self, stops, stop_times, index: StopTimesIndex = None):
+        import pandas as pd
+
+        if index is None:
+            index = StopTimesIndex(stop_times)
+        departure = np.empty(len(index), dtype=np.int64)
+        departure[index.order] = index.departure_sec
+        self.max_dwell_sec = index.max_dwell_sec
+
+        # Posição de cada paragem em stops (linhas de paragens desconhecidas ficam de fora)
+        stop_pos = pd.Index(stops['stop_id']).get_indexer(stop_times['stop_id'])
+        known = np.flatnonzero(stop_pos >= 0)
+
+        key = (stop_pos[known].astype(np.int64) << self.TIME_BITS) | departure[known]
+        order = np.argsort(key, kind='stable')
+        self.key = key[order]
+        self.rows = known[order]
+
+    def rows_for_stops(self, stop_positions, time_window=None) -> np.ndarray:
+        """
+        Posições (iloc, por ordem original) das linhas das paragens indicadas
+        (posições em stops) e, com time_window (início, fim), só as do horizonte.
+        """
+        stops = np.asarray(stop_positions, dtype=np.int64) << self.TIME_BITS
+        if time_window is None:
+            start, end = 0, (1 << self.TIME_BITS) - 1
+        else:
+            start, end = time_window[0], time_window[1] + self.max_dwell_sec
+
+        lo = np.searchsorted(self.key, stops | max(start, 0), side='left')
+        hi = np.searchsorted(self.key, stops | min(end, (1 << self.TIME_BITS) - 1), side='right')
+
+        # Concatenar as fatias [lo, hi) de todas as paragens de uma só vez
+        lengths = hi - lo
+        starts = np.repeat(lo - np.cumsum(lengths) + lengths, lengths)
+        positions = starts + np.arange(lengths.sum())
+        return np.sort(self.rows[positions])
@@ -0,0 +1,123 @@
+import os
+import logging
+import pickle
+
+import numpy as np
+
+module_path = os.path.abspath(os.path.join('..'))
+
+logger = logging.getLogger(__name__)
+
+# Rede pedonal local (formato compacto de StreetGraphStore.save). Se existir,
+# GraphRoute.build_street_graph usa-a em vez de descarregar a rede do Overpass.
+STREET_GRAPH_PATH = f"{module_path}/cache/street_graph_walk.pkl"
+
+# Versão do formato compacto. Incrementar sempre que mudar.
+STREET_GRAPH_VERSION = 1
+
+# Lojas já carregadas neste processo (caminho -> StreetGraphStore)
+_LOADED_STORES = {}
+
+
+class StreetGraphStore:
+    """
+    Rede pedonal local, carregada uma única vez por processo, com as
+    velocidades e tempos de viagem (ox.add_edge_speeds/add_edge_travel_times)
+    já calculados.
+
+    Formatos aceites:
+    - .graphml (ox.save_graphml) e .osm/.xml (exportação do OpenStreetMap);
+    - .pkl: formato compacto de save(), o mais rápido de carregar.
+
+    clip/clip_corridor/clip_region devolvem o subgrafo de uma área (por exemplo
+    o corredor origem-destino de uma consulta) com uma máscara NumPy sobre as
+    coordenadas dos nós, sem pedidos à rede.
+    """
+
+    def __init__(self, G_walk):
+        if not all('travel_time' in data for _, _, data in G_walk.edges(data=True)):
+            import osmnx as ox
+            G_walk = ox.add_edge_speeds(G_walk)
+            G_walk = ox.add_edge_travel_times(G_walk)
+
+        self.G = G_walk
+        self.node_ids = np.array(list(G_walk.nodes), dtype=object)
+        self.x = np.array([data['x'] for _, data in G_walk.nodes(data=True)], dtype=np.float64)
+        self.y = np.array([data['y'] for _, data in G_walk.nodes(data=True)], dtype=np.float64)
+
+    @classmethod
+    def load(cls, path: str = STREET_GRAPH_PATH) -> 'StreetGraphStore':
+        """Carrega a rede pedonal de path (só é lida uma vez por processo)."""
+        store = _LOADED_STORES.get(path)
+        if store is not None:
+            return store
+
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.pkl':
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+            if data.get('version') != STREET_GRAPH_VERSION:
+                raise ValueError(
+                    f"Rede pedonal {path} tem versão {data.get('version')}, esperada {STREET_GRAPH_VERSION}."
+                )
+            store = cls(data['G_walk'])
+        elif extension == '.graphml':
+            import osmnx as ox
+            store = cls(ox.load_graphml(path))
+        elif extension in ('.osm', '.xml'):
+            import osmnx as ox
+            store = cls(ox.graph_from_xml(path))
+        else:
+            raise ValueError(f"Formato de rede pedonal não suportado: {path}")
+
+        _LOADED_STORES[path] = store
+        return store
+
+    @classmethod
+    def download(cls, bbox, path: str = STREET_GRAPH_PATH) -> 'StreetGraphStore':
+        """
+        Descarrega a rede pedonal da bbox (oeste, sul, este, norte) uma única vez
+        e guarda-a no formato compacto. É o único método que usa a rede.
+        """
+        import osmnx as ox
+
+        store = cls(ox.graph_from_bbox(bbox, network_type="walk"))
+        store.save(path)
+        return store
+
+    def save(self, path: str = STREET_GRAPH_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump({'version': STREET_GRAPH_VERSION, 'G_walk': self.G}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        logger.info(
+            "Rede pedonal guardada em %s: %d nós, %d arestas.", path, self.G.number_of_nodes(), self.G.number_of_edges()
+        )
+
+    def clip(self, bbox):
+        """Subgrafo (cópia) com os nós dentro da bbox (oeste, sul, este, norte)."""
+        west, south, east, north = bbox
+        mask = (self.x >= west) & (self.x <= east) & (self.y >= south) & (self.y <= north)
+
+        return self.G.subgraph(self.node_ids[mask].tolist()).copy()
+
+    def clip_corridor(self, origin, destination, buffer_m=1000):
+        """
+        Subgrafo do retângulo que contém a origem e o destino (shapely Point,
+        lon/lat) com uma margem de buffer_m metros.
+        """
+        buffer_lat = buffer_m / 111000.0
+        buffer_lon = buffer_m / (111000.0 * np.cos(np.radians((origin.y + destination.y) / 2)))
+
+        return self.clip((
+            min(origin.x, destination.x) - buffer_lon,
+            min(origin.y, destination.y) - buffer_lat,
+            max(origin.x, destination.x) + buffer_lon,
+            max(origin.y, destination.y) + buffer_lat,
+        ))
+
+    def clip_region(self, corridor):
+        """Subgrafo (cópia) com os nós dentro de um corredor (ver app.utils.corridor)."""
+        mask = corridor.contains(self.y, self.x)
+
+        return self.G.subgraph(self.node_ids[mask].tolist()).copy()
@@ -1,3 +1,4 @@
+import numpy as np
 
 
 def time_to_seconds(time_str: str) -> int:
@@ -8,6 +9,18 @@ def time_to_seconds(time_str: str) -> int:
     except:
         return 0
     
+def times_to_seconds(times) -> np.ndarray:
+    """
+    Versão vetorizada de time_to_seconds para uma coluna de horários GTFS.
+    Como os horários se repetem muito, converte apenas os valores únicos.
+    """
+    import pandas as pd
+
+    codes, uniques = pd.factorize(pd.Series(times), use_na_sentinel=True)
+    # O último elemento serve os valores em falta (código -1), tal como o fallback 0
+    lookup = np.array([time_to_seconds(t) for t in uniques] + [0], dtype=np.int64)
+    return lookup[codes]
+
 def format_time(seconds):
     """Formata segundos totais em HH:MM:SS."""
     h = seconds // 3600